@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark generate_excel_report on a synthetic store
+
+Builds a report with N extracted links (spread over pages of 20 links each)
+and as many link check results, then prints wall time and peak RSS.
+
+Usage:
+    python benchmarks/bench_excel_report.py [--links N] [--dead-ratio R]
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shopify_product_checker import ShopifyPageChecker, Page, LinkCheck
+
+STORE_URL = 'https://bench-store.myshopify.com'
+LINKS_PER_PAGE = 20
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def build_checker(link_count: int, dead_ratio: float) -> ShopifyPageChecker:
+    checker = ShopifyPageChecker(STORE_URL)
+    dead_every = int(1 / dead_ratio) if dead_ratio > 0 else 0
+
+    for page_index in range(0, link_count, LINKS_PER_PAGE):
+        page_number = page_index // LINKS_PER_PAGE
+        handle = f"page-{page_number}"
+        links = [
+            f"https://example-{i % 97}.com/articles/{i}" if i % 3 else f"{STORE_URL}/products/item-{i}"
+            for i in range(page_index, min(page_index + LINKS_PER_PAGE, link_count))
+        ]
+        checker.pages.append(Page(
+            id=f"page_{handle}",
+            title=handle.replace('-', ' ').title(),
+            handle=handle,
+            url=f"{STORE_URL}/pages/{handle}",
+            published=page_number % 10 != 0,
+            published_at='2024-01-01T00:00:00Z',
+            links=links,
+        ))
+        checker.all_links.update(links)
+
+    for i, link in enumerate(checker.all_links):
+        is_dead = bool(dead_every) and i % dead_every == 0
+        checker.link_checks.append(LinkCheck(
+            url=link,
+            status_code=404 if is_dead else 200,
+            is_dead=is_dead,
+            error=None,
+            is_internal=link.startswith(STORE_URL),
+        ))
+    return checker
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Excel report writer.")
+    parser.add_argument('--links', type=int, default=100000, help="Number of extracted links")
+    parser.add_argument('--dead-ratio', type=float, default=0.05, help="Fraction of checked links that are dead")
+    args = parser.parse_args()
+
+    checker = build_checker(args.links, args.dead_ratio)
+    rss_before = peak_rss_mb()
+
+    total = len(checker.pages)
+    published = sum(1 for p in checker.pages if p.published)
+    dead_links = [lc for lc in checker.link_checks if lc.is_dead]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'bench_report.xlsx')
+        start = time.perf_counter()
+        checker.generate_excel_report(filename, total, published, total - published,
+                                      len(checker.all_links), dead_links)
+        elapsed = time.perf_counter() - start
+        size_mb = os.path.getsize(filename) / (1024 * 1024)
+    checker.close()
+
+    print(f"📊 {args.links} links, {total} pages, {len(dead_links)} dead")
+    print(f"⏱️  Report written in {elapsed:.2f}s ({size_mb:.1f} MB)")
+    print(f"🧠 Peak RSS: {peak_rss_mb():.0f} MB ({rss_before:.0f} MB before the report)")
+
+if __name__ == "__main__":
+    main()
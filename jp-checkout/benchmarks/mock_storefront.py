@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Local mock Shopify storefront for benchmarks
+
+Serves a synthetic store on 127.0.0.1, the same server doubling as an
+"external" host under http://localhost:<port>:
+
+    /                            Home page linking every page
+    /sitemap.xml                 Sitemap index listing /sitemap_pages_<n>.xml
+    /sitemap_pages_<n>.xml       Page URLs with lastmod, SITEMAP_PAGE_SIZE per file
+    /api/2024-01/graphql.json    Storefront API: pages(first, after) with cursors, page(handle)
+    /admin/api/2024-10/graphql.json
+                                 Admin API (X-Shopify-Access-Token required): bulkOperationRunQuery,
+                                 currentBulkOperation (RUNNING for bulk_running_polls polls, then COMPLETED)
+    /bulk/<n>.jsonl              A finished bulk operation's JSONL result: every page, drafts included
+    /pages/<handle>              Themed page HTML
+    /l/<n>, /x/<n>               Link targets (store and external): HTML, or 404 / 429 by rate
+    /cart                        Empty cart page
+    anything else                Themed 404 page
+
+Every response waits --latency-ms first. Which targets are dead is fixed by
+the seed, so runs are comparable; 429s are drawn per request.
+
+Usage:
+    python benchmarks/mock_storefront.py [--port 8000] [--pages N] [--latency-ms MS] ...
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, asdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional
+
+SITEMAP_PAGE_SIZE = 1000
+ADMIN_API_PATH = '/admin/api/2024-10'
+
+@dataclass
+class MockConfig:
+    pages: int = 500
+    links_per_page: int = 20
+    link_targets: int = 2000  # Distinct link targets the page links are spread over
+    external_ratio: float = 0.3  # Share of links pointing at the "external" host
+    latency_ms: float = 20
+    page_kb: int = 30
+    error_rate: float = 0.05
+    throttle_rate: float = 0.0
+    retry_after: float = 0.1
+    seed: int = 1
+
+WORDS = ('green', 'tea', 'ceramic', 'handmade', 'kyoto', 'cup', 'bowl', 'glaze', 'gift', 'set',
+         'shipping', 'order', 'store', 'about', 'our', 'the', 'and', 'with', 'for', 'each')
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that doesn't print a traceback when a client drops its connection"""
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+class MockStorefront:
+    """Threaded HTTP server rendering the synthetic store described by a MockConfig"""
+    def __init__(self, config: Optional[MockConfig] = None, port: int = 0):
+        self.config = config or MockConfig()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._throttle_random = random.Random(self.config.seed)
+        self.bulk_running_polls = 0  # currentBulkOperation polls answered RUNNING before COMPLETED
+        self._bulk_operations = 0
+        self._bulk_polls = 0
+        self._server = QuietHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_port
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def external_url(self) -> str:
+        return f"http://localhost:{self.port}"
+
+    @property
+    def admin_api_url(self) -> str:
+        return f"{self.base_url}{ADMIN_API_PATH}"
+
+    def start(self) -> 'MockStorefront':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Content
+
+    def _random(self, key: str) -> random.Random:
+        return random.Random(f"{self.config.seed}:{key}")
+
+    def _text(self, rng: random.Random, words: int) -> str:
+        return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+    def handle(self, index: int) -> str:
+        return f"page-{index}"
+
+    def page_links(self, index: int) -> List[str]:
+        config = self.config
+        rng = self._random(f"links:{index}")
+        links = []
+        for k in range(config.links_per_page):
+            target = (index * config.links_per_page + k) % config.link_targets
+            if rng.random() < config.external_ratio:
+                links.append(f"{self.external_url}/x/{target}")
+            else:
+                links.append(f"{self.base_url}/l/{target}")
+        return links
+
+    def page_body(self, index: int) -> str:
+        """The page's rich-text body, as the Storefront API returns it"""
+        rng = self._random(f"body:{index}")
+        parts = [f"<h2>{self._text(rng, 4).title()}</h2>"]
+        for link in self.page_links(index):
+            parts.append(f"<p>{self._text(rng, 25)} <a href=\"{link}\">{self._text(rng, 3)}</a></p>")
+        return ''.join(parts)
+
+    def is_dead(self, target: str) -> bool:
+        return self._random(f"dead:{target}").random() < self.config.error_rate
+
+    def render(self, template: str, title: str, main: str) -> str:
+        """Theme chrome (head, navigation, footer) around the main content, padded to page_kb"""
+        navigation = ''.join(f'<li><a href="/collections/c{i}">Collection {i}</a></li>' for i in range(30))
+        footer = ''.join(f'<li><a href="/pages/info-{i}">Info {i}</a></li>' for i in range(20))
+        html = (
+            f'<!doctype html><html><head><title>{title}</title>'
+            f'<script>window.theme = {{"template": "{template}"}};</script></head>'
+            f'<body class="template-{template}"><header class="site-header"><nav><ul>{navigation}</ul></nav></header>'
+            f'<main id="MainContent" class="content-for-layout">{main}</main>'
+            f'<footer class="site-footer"><ul>{footer}</ul><p>© Mock Store. Taxes included.</p></footer>'
+        )
+        padding = self.config.page_kb * 1024 - len(html)
+        if padding > 0:
+            # Themes carry a lot of inline JSON and scripts after the content
+            html += f'<script type="application/json">{{"data": "{"x" * padding}"}}</script>'
+        return html + '</body></html>'
+
+    def not_found_page(self) -> str:
+        return self.render('404', 'Page not found', (
+            '<div class="page-width page-404"><h1 class="title">404 Page not found</h1>'
+            '<p>The page you were looking for does not exist.</p>'
+            '<a class="button" href="/collections/all">Continue shopping</a></div>'))
+
+    def target_page(self, target: str) -> str:
+        rng = self._random(f"target:{target}")
+        paragraphs = ''.join(f"<p>{self._text(rng, 40)}</p>" for _ in range(4))
+        return self.render('product', target, (
+            f'<div class="product"><h1 class="product__title">{self._text(rng, 3).title()}</h1>'
+            f'<div class="product__description rte">{paragraphs}</div></div>'))
+
+    # API
+
+    def graphql(self, payload: Dict) -> Dict:
+        query = payload.get('query', '')
+        variables = payload.get('variables') or {}
+        if 'page(handle' in query:
+            match = re.fullmatch(r'page-(\d+)', variables.get('handle', ''))
+            index = int(match.group(1)) if match else -1
+            page = {'body': self.page_body(index)} if 0 <= index < self.config.pages else None
+            return {'data': {'page': page}}
+
+        match = re.search(r'first:\s*(\d+)', query)
+        first = int(match.group(1)) if match else 250
+        start = int(variables.get('cursor') or 0)
+        end = min(start + first, self.config.pages)
+        with_body = re.search(r'\bbody\b', query) is not None
+        edges = []
+        for index in range(start, end):
+            node = {
+                'id': f"gid://shopify/Page/{index}",
+                'title': f"Page {index}",
+                'handle': self.handle(index),
+                'publishedAt': None if index % 10 == 0 else '2024-01-01T00:00:00Z',
+                'updatedAt': '2024-06-01T00:00:00Z',
+            }
+            if with_body:
+                node['body'] = self.page_body(index)
+                node['bodySummary'] = ''
+            edges.append({'node': node})
+        return {
+            'data': {'pages': {'pageInfo': {'hasNextPage': end < self.config.pages, 'endCursor': str(end)},
+                               'edges': edges}},
+            'extensions': {'cost': {'requestedQueryCost': 10, 'throttleStatus': {
+                'maximumAvailable': 1000.0, 'currentlyAvailable': 990.0, 'restoreRate': 50.0}}},
+        }
+
+    def page_node(self, index: int) -> Dict:
+        """A page as the Admin API bulk export writes it"""
+        published = index % 10 != 0
+        return {
+            'id': f"gid://shopify/Page/{index}",
+            'title': f"Page {index}",
+            'handle': self.handle(index),
+            'body': self.page_body(index),
+            'bodySummary': '',
+            'isPublished': published,
+            'publishedAt': '2024-01-01T00:00:00Z' if published else None,
+            'updatedAt': '2024-06-01T00:00:00Z',
+        }
+
+    def admin_graphql(self, payload: Dict) -> Dict:
+        query = payload.get('query', '')
+        with self._lock:
+            if 'bulkOperationRunQuery' in query:
+                self._bulk_operations += 1
+                self._bulk_polls = 0
+                operation = {'id': f"gid://shopify/BulkOperation/{self._bulk_operations}", 'status': 'CREATED'}
+                return {'data': {'bulkOperationRunQuery': {'bulkOperation': operation, 'userErrors': []}}}
+            if 'currentBulkOperation' in query:
+                if not self._bulk_operations:
+                    return {'data': {'currentBulkOperation': None}}
+                self._bulk_polls += 1
+                running = self._bulk_polls <= self.bulk_running_polls
+                operation = {
+                    'id': f"gid://shopify/BulkOperation/{self._bulk_operations}",
+                    'status': 'RUNNING' if running else 'COMPLETED',
+                    'errorCode': None,
+                    'objectCount': str(self.config.pages // 2 if running else self.config.pages),
+                    'url': None if running else f"{self.base_url}/bulk/{self._bulk_operations}.jsonl",
+                }
+                return {'data': {'currentBulkOperation': operation}}
+        return {'errors': [{'message': 'Only bulk page exports are supported by the mock Admin API'}]}
+
+    def bulk_result(self) -> bytes:
+        return ''.join(json.dumps(self.page_node(index)) + '\n' for index in range(self.config.pages)).encode()
+
+    def sitemap(self, path: str) -> Optional[str]:
+        files = (self.config.pages + SITEMAP_PAGE_SIZE - 1) // SITEMAP_PAGE_SIZE
+        if path == '/sitemap.xml':
+            entries = ''.join(f"<sitemap><loc>{self.base_url}/sitemap_pages_{n + 1}.xml</loc></sitemap>"
+                              for n in range(files))
+            return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex>{entries}</sitemapindex>'
+        match = re.fullmatch(r'/sitemap_pages_(\d+)\.xml', path)
+        if match and 1 <= int(match.group(1)) <= files:
+            start = (int(match.group(1)) - 1) * SITEMAP_PAGE_SIZE
+            entries = ''.join(
+                f"<url><loc>{self.base_url}/pages/{self.handle(i)}</loc><lastmod>2024-06-01</lastmod></url>"
+                for i in range(start, min(start + SITEMAP_PAGE_SIZE, self.config.pages)))
+            return f'<?xml version="1.0" encoding="UTF-8"?><urlset>{entries}</urlset>'
+        return None
+
+    def _throttled(self) -> bool:
+        if not self.config.throttle_rate:
+            return False
+        with self._lock:
+            return self._throttle_random.random() < self.config.throttle_rate
+
+    def respond(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None) -> tuple:
+        """(status, content type, body bytes, extra headers) for a request"""
+        with self._lock:
+            self.requests += 1
+        if self.config.latency_ms:
+            time.sleep(self.config.latency_ms / 1000)
+        path = path.split('?', 1)[0]
+
+        if method == 'POST' and path == '/api/2024-01/graphql.json':
+            return 200, 'application/json', json.dumps(self.graphql(json.loads(body or b'{}'))).encode(), {}
+
+        if method == 'POST' and path == f"{ADMIN_API_PATH}/graphql.json":
+            if not (headers or {}).get('X-Shopify-Access-Token'):
+                return 401, 'application/json', b'{"errors": "[API] Invalid API key or access token"}', {}
+            return 200, 'application/json', json.dumps(self.admin_graphql(json.loads(body or b'{}'))).encode(), {}
+
+        match = re.fullmatch(r'/bulk/(\d+)\.jsonl', path)
+        if match and 1 <= int(match.group(1)) <= self._bulk_operations:
+            return 200, 'application/jsonl', self.bulk_result(), {}
+
+        sitemap = self.sitemap(path)
+        if sitemap is not None:
+            return 200, 'application/xml', sitemap.encode(), {}
+
+        match = re.fullmatch(r'/([lx])/(\d+)', path)
+        if match:
+            if self._throttled():
+                return 429, 'text/plain', b'Too Many Requests', {'Retry-After': str(self.config.retry_after)}
+            target = f"{match.group(1)}{match.group(2)}"
+            if self.is_dead(target):
+                return 404, 'text/html', self.not_found_page().encode(), {}
+            return 200, 'text/html; charset=utf-8', self.target_page(target).encode(), {}
+
+        match = re.fullmatch(r'/pages/page-(\d+)', path)
+        if match and int(match.group(1)) < self.config.pages:
+            index = int(match.group(1))
+            return 200, 'text/html; charset=utf-8', self.render('page', f"Page {index}", self.page_body(index)).encode(), {}
+
+        if path == '/':
+            links = ''.join(f'<li><a href="/pages/{self.handle(i)}">Page {i}</a></li>' for i in range(self.config.pages))
+            return 200, 'text/html; charset=utf-8', self.render('index', 'Home', f'<ul>{links}</ul>').encode(), {}
+        
+        if path == '/cart':
+            return 200, 'text/html; charset=utf-8', self.render('cart', 'Cart', (
+                '<div class="cart cart--empty"><h1>Your cart is empty</h1>'
+                '<a class="button" href="/collections/all">Continue shopping</a></div>')).encode(), {}
+        return 404, 'text/html; charset=utf-8', self.not_found_page().encode(), {}
+
+    def _handler(self):
+        storefront = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, method: str, include_body: bool = True):
+                length = int(self.headers.get('Content-Length') or 0)
+                request_body = self.rfile.read(length) if length else None
+                status, content_type, body, headers = storefront.respond(method, self.path, request_body, self.headers)
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if include_body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self._send('GET')
+
+            def do_HEAD(self):
+                self._send('GET', include_body=False)
+
+            def do_POST(self):
+                self._send('POST')
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Shopify storefront locally.")
+    parser.add_argument('--port', type=int, default=8000)
+    defaults = MockConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+    config = MockConfig(**{name: getattr(args, name) for name in asdict(defaults)})
+
+    storefront = MockStorefront(config, args.port).start()
+    print(f"🛍️  Mock storefront on {storefront.base_url} (external host: {storefront.external_url})")
+    print(f"   {config.pages} pages, {config.links_per_page} links each, {config.latency_ms}ms latency")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        storefront.stop()
+
+if __name__ == "__main__":
+    main()
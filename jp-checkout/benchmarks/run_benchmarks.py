@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for shopify_product_checker.py against the local mock storefront
+
+Benchmarks:
+    discovery_storefront   List every page through the Storefront API (paginated)
+    discovery_sitemap      List every page from the sitemap index
+    discovery_admin_bulk   Export every page with an Admin API bulk operation (--admin-api-url);
+                           includes the checker's first 2s status poll wait
+    extract_links          extract_links_from_text over every page body
+    content_check          has_meaningful_content over rendered pages
+    check_links            analyze_pages + check_all_links against the mock link targets
+    crawl                  crawl_site from the home page (two hops, up to --pages pages)
+    report                 generate_report (console + Excel) for the checked store
+
+Each result is printed next to the last stored run with the same parameters
+and appended to benchmarks/results.jsonl (with the git commit), so a
+regression shows up as a slower time against the previous run.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--pages N] [--latency-ms MS] [--only NAME ...] [--no-save]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCHMARK_DIR))
+
+from shopify_product_checker import ShopifyPageChecker
+from mock_storefront import MockConfig, MockStorefront
+
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, 'results.jsonl')
+REGRESSION_THRESHOLD = 0.10  # Slower by more than this fraction is flagged
+
+def quiet():
+    """Swallow the checker's progress output while a benchmark runs"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def best_of(repeat: int, fn: Callable[[], None]) -> float:
+    """Fastest of `repeat` timed runs, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def new_checker(store: MockStorefront, args: argparse.Namespace, **kwargs) -> ShopifyPageChecker:
+    return ShopifyPageChecker(store.base_url, max_workers=args.workers, per_host_limit=args.workers,
+                              store_host_limit=args.workers, analysis_processes=args.analysis_processes,
+                              soft_404=not args.no_soft_404, **kwargs)
+
+def bench_discovery_storefront(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    with quiet(), new_checker(store, args) as checker:
+        start = time.perf_counter()
+        pages = checker.get_pages_from_storefront_api()
+        seconds = time.perf_counter() - start
+    return {'seconds': seconds, 'pages': len(pages), 'pages_per_s': len(pages) / seconds}
+
+def bench_discovery_sitemap(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    with quiet(), new_checker(store, args) as checker:
+        start = time.perf_counter()
+        pages = checker.get_pages_from_sitemap()
+        seconds = time.perf_counter() - start
+    return {'seconds': seconds, 'pages': len(pages), 'pages_per_s': len(pages) / seconds}
+
+def bench_discovery_admin_bulk(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    with quiet(), new_checker(store, args, access_token='mock-token', admin_api_url=store.admin_api_url) as checker:
+        start = time.perf_counter()
+        pages = checker.get_pages_from_admin_bulk()
+        seconds = time.perf_counter() - start
+    return {'seconds': seconds, 'pages': len(pages), 'pages_per_s': len(pages) / seconds}
+
+def bench_extract_links(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    bodies = [store.page_body(i) for i in range(store.config.pages)]
+    size_mb = sum(len(body) for body in bodies) / (1024 * 1024)
+    with quiet(), new_checker(store, args) as checker:
+        seconds = best_of(args.repeat, lambda: [checker.extract_links_from_text(body) for body in bodies])
+    return {'seconds': seconds, 'pages_per_s': len(bodies) / seconds, 'mb_per_s': size_mb / seconds}
+
+def bench_content_check(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    # Real pages (decided early) and 404 pages (read to the end) in the mix the link check sees
+    pages = [store.target_page(f"l{i}") for i in range(200)] + [store.not_found_page()] * 20
+    size_mb = sum(len(page) for page in pages) / (1024 * 1024)
+    with quiet(), new_checker(store, args) as checker:
+        seconds = best_of(args.repeat, lambda: [checker.has_meaningful_content(page) for page in pages])
+    return {'seconds': seconds, 'pages_per_s': len(pages) / seconds, 'mb_per_s': size_mb / seconds}
+
+def bench_check_links(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    with quiet(), new_checker(store, args) as checker:
+        start = time.perf_counter()
+        checker.analyze_pages()
+        analyzed = time.perf_counter()
+        checker.check_all_links(max_links=len(checker.all_links))
+        done = time.perf_counter()
+        dead = sum(1 for check in checker.link_checks if check.is_dead)
+        checked = len(checker.link_checks)
+        throttled = checker.stats['throttled']
+        soft_404 = checker.stats['soft_404']
+        read_kb = checker.stats['bytes_read'] / 1024
+    return {
+        'seconds': done - start,
+        'analyze_seconds': analyzed - start,
+        'links': checked,
+        'links_per_s': checked / (done - analyzed),
+        'dead': dead,
+        'throttled': throttled,
+        'soft_404': soft_404,
+        'read_kb': read_kb,
+    }
+
+def bench_crawl(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    with quiet(), new_checker(store, args) as checker:
+        start = time.perf_counter()
+        checker.crawl_site(max_depth=2, max_pages=store.config.pages)
+        seconds = time.perf_counter() - start
+        pages = len(checker.pages)
+        cpu = checker.stats.cpu_seconds.get('link_extraction', 0.0)
+    return {'seconds': seconds, 'pages': pages, 'pages_per_s': pages / seconds, 'extraction_cpu_seconds': cpu}
+
+def bench_report(store: MockStorefront, args: argparse.Namespace) -> Dict[str, float]:
+    with quiet(), new_checker(store, args) as checker:
+        checker.analyze_pages()
+        checker.check_all_links(max_links=len(checker.all_links))
+        with tempfile.TemporaryDirectory() as tmp:
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            try:
+                start = time.perf_counter()
+                checker.generate_report()
+                seconds = time.perf_counter() - start
+            finally:
+                os.chdir(cwd)
+    return {'seconds': seconds}
+
+BENCHMARKS: Dict[str, Callable[[MockStorefront, argparse.Namespace], Dict[str, float]]] = {
+    'discovery_storefront': bench_discovery_storefront,
+    'discovery_sitemap': bench_discovery_sitemap,
+    'discovery_admin_bulk': bench_discovery_admin_bulk,
+    'extract_links': bench_extract_links,
+    'content_check': bench_content_check,
+    'check_links': bench_check_links,
+    'crawl': bench_crawl,
+    'report': bench_report,
+}
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_results() -> List[Dict]:
+    if not os.path.exists(RESULTS_FILE):
+        return []
+    with open(RESULTS_FILE, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def previous_result(results: List[Dict], params: Dict, name: str) -> Optional[Dict]:
+    """The latest stored result of a benchmark run with the same parameters"""
+    for run in reversed(results):
+        if run['params'] == params and name in run['benchmarks']:
+            return run
+    return None
+
+def main():
+    defaults = MockConfig()
+    parser = argparse.ArgumentParser(description="Benchmark the page checker against a local mock storefront.")
+    parser.add_argument('--pages', type=int, default=defaults.pages, help="Pages in the mock store")
+    parser.add_argument('--links-per-page', type=int, default=defaults.links_per_page)
+    parser.add_argument('--link-targets', type=int, default=defaults.link_targets, help="Distinct link targets")
+    parser.add_argument('--latency-ms', type=float, default=defaults.latency_ms, help="Server latency per response")
+    parser.add_argument('--page-kb', type=int, default=defaults.page_kb, help="Size of rendered pages")
+    parser.add_argument('--error-rate', type=float, default=defaults.error_rate, help="Share of dead link targets")
+    parser.add_argument('--throttle-rate', type=float, default=defaults.throttle_rate,
+                        help="Share of link requests answered with 429")
+    parser.add_argument('--workers', type=int, default=16, help="Checker workers (and per-host limit)")
+    parser.add_argument('--analysis-processes', type=int, default=0,
+                        help="Checker analysis processes (0 = extract links in the main process)")
+    parser.add_argument('--no-soft-404', action='store_true',
+                        help="Check links without matching store pages against the 404 page and empty cart")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of each CPU-bound benchmark (best is kept)")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument('--no-save', action='store_true', help=f"Don't append the results to {RESULTS_FILE}")
+    args = parser.parse_args()
+
+    config = MockConfig(pages=args.pages, links_per_page=args.links_per_page, link_targets=args.link_targets,
+                        latency_ms=args.latency_ms, page_kb=args.page_kb, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate)
+    params = {**asdict(config), 'workers': args.workers}
+    if args.analysis_processes:
+        params['analysis_processes'] = args.analysis_processes
+    if args.no_soft_404:
+        params['soft_404'] = False
+    history = load_results()
+
+    results: Dict[str, Dict[str, float]] = {}
+    with MockStorefront(config) as store:
+        print(f"🛍️  Mock store: {config.pages} pages x {config.links_per_page} links, "
+              f"{config.latency_ms:g}ms latency, {config.page_kb} KB pages")
+        print(f"{'benchmark':<22} {'seconds':>9} {'previous':>9} {'change':>8}  details")
+        for name in args.only or BENCHMARKS:
+            metrics = BENCHMARKS[name](store, args)
+            results[name] = {key: round(value, 4) for key, value in metrics.items()}
+
+            previous = previous_result(history, params, name)
+            change = ''
+            flag = ''
+            if previous is not None:
+                before = previous['benchmarks'][name]['seconds']
+                ratio = metrics['seconds'] / before - 1 if before else 0.0
+                change = f"{ratio:+.0%}"
+                flag = ' ⚠️  slower' if ratio > REGRESSION_THRESHOLD else ''
+                before = f"{before:.3f}"
+            else:
+                before = '-'
+            details = ', '.join(f"{key} {value:g}" for key, value in results[name].items() if key != 'seconds')
+            print(f"{name:<22} {metrics['seconds']:>9.3f} {before:>9} {change:>8}  {details}{flag}")
+
+    if not args.no_save:
+        run = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'params': params,
+            'benchmarks': results,
+        }
+        with open(RESULTS_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run) + '\n')
+        print(f"💾 Results appended to {RESULTS_FILE}")
+
+if __name__ == "__main__":
+    main()
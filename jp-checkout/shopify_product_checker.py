@@ -4,26 +4,86 @@ Shopify Page & Link Checker
 A standalone tool to check for active pages and dead links in a Shopify store.
 
 Usage:
-    python shopify_product_checker.py <store_url>
+    python shopify_product_checker.py <store_url> [access_token] [options]
     
 Example:
     python shopify_product_checker.py https://mystore.myshopify.com
-    python shopify_product_checker.py https://mystore.com
+    python shopify_product_checker.py https://mystore.com --workers 32 --per-host 4
+    python shopify_product_checker.py --report-from results.jsonl
+
+Options:
+    --workers N          Total concurrent link checks (default: 16)
+    --per-host N         Concurrent checks per external host (default: 4)
+    --store-per-host N   Concurrent checks against the store's own domain (default: 8)
+    --max-links N        Maximum number of links to check (default: 100)
+    --exclude-file FILE  Excluded domains/schemes, one per line (replaces the defaults)
+    --check-mode MODE    "stream" (one streamed GET per link, default) or "head-get"
+    --no-soft-404        Skip matching store pages against the store's 404 page and empty cart
+    --link-types LIST    Reference kinds checked as links, comma-separated, or "all"
+                         (anchor, image, srcset, media, script, stylesheet, iframe, link, text;
+                         default: anchor,text)
+    --analysis-processes N  Worker processes for link extraction (default: 0, in the main process)
+    --pool-size N        Keep-alive connections per host (default: larger host limit)
+    --retries N          Retries for connection errors and 500/502/504 responses (default: 2)
+    --rate N             Requests per second per external host (default: unlimited)
+    --store-rate N       Requests per second to the store's domain (default: unlimited)
+    --cache FILE         Persist link check results between runs in FILE
+    --cache-ttl DAYS     Days a cached result is reused before revalidation (default: 7)
+    --cache-size N       Maximum number of cached results (default: 50000)
+    --metadata-only      List pages without bodies; fetch each body only when needed
+    --admin-api-url URL  Admin API base URL used with an access token (bulk page export)
+    --incremental FILE   Re-scan only pages changed since the run that wrote FILE
+    --db FILE            Store pages, links and results in a SQLite database (kept across runs)
+    --results FILE       Stream pages and link results to FILE (.jsonl or .csv) as they finish
+    --report-from FILE   Build the report from a --results file without checking anything
+    --crawl              Crawl the storefront breadth-first from the home page
+    --crawl-depth N      Link hops followed when crawling (default: 3)
+    --crawl-pages N      Maximum URLs fetched when crawling (default: 5000)
+    --yes, -y            Check the extracted links without asking
+    --trace FILE         Write phase timings and per-host latency percentiles to FILE (JSON)
+    --batch FILE         Check every store in FILE ("store_url [access_token]" per line)
+    --batch-stores N     Stores checked at the same time in batch mode (default: 4)
 """
 
+import io
+import os
 import sys
 import re
+import gzip
+import csv
 import json
+import hashlib
+import random
+import math
+import heapq
+import functools
+import itertools
+import inspect
+import sqlite3
+import codecs
+import asyncio
+import argparse
+import threading
+import multiprocessing
 import requests
-from urllib.parse import urlparse, urljoin
-from typing import List, Dict, Set, Optional
-from dataclasses import dataclass
-from html.parser import HTMLParser
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse, urljoin, urlunparse, urlsplit, urlunsplit, urlencode, parse_qsl
+from typing import List, Dict, Set, Optional, Tuple, Iterable, Iterator, AsyncIterator, Callable, Union
+from dataclasses import dataclass, asdict, fields, field, replace
+from html import unescape
+import xml.etree.ElementTree as ET
 import time
 
 try:
     from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
     from openpyxl.utils import get_column_letter
     OPENPYXL_AVAILABLE = True
 except ImportError:
@@ -49,30 +109,1915 @@ class LinkCheck:
     is_dead: bool
     error: Optional[str]
     is_internal: bool
+    redirect_chain: List[str] = field(default_factory=list)  # URLs after the original, ending at the final target
+
+@dataclass
+class Reference:
+    """A URL found in a document: its kind (anchor, image, script...) and where it starts"""
+    url: str
+    kind: str
+    line: int  # 1-based
+    column: int  # 0-based offset in the line
+
+USER_AGENT = 'Mozilla/5.0 (compatible; ShopifyChecker/1.0)'
+
+def build_session(pool_size: int = 10, retries: int = 2, backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Build a keep-alive session shared by every request of a run
+    
+    Args:
+        pool_size: Connections kept open per host
+        retries: Retries for connection errors and transient 500/502/504 responses to HEAD/GET
+        backoff_factor: Exponential backoff base (seconds) between retries
+    """
+    # 429 and 503 are left to the checker, which backs off per host (see HostRateLimiter).
+    # POST is never resent: a retried bulkOperationRunQuery could start a second operation.
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(500, 502, 504),
+        allowed_methods=frozenset({'HEAD', 'GET', 'OPTIONS'}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=100, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+# Redirect hops followed before a link is reported as a redirect loop
+MAX_REDIRECTS = 10
+
+# Statuses that mean "slow down" rather than "broken"; retried with backoff instead of reported dead
+RETRY_STATUSES = (429, 503)
+
+# Longest Retry-After honoured before giving up on a request
+MAX_RETRY_AFTER = 300
+
+def retry_after_seconds(response: Optional[requests.Response]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date), or None if there is none"""
+    value = response.headers.get('Retry-After', '').strip() if response is not None else ''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+# Paths with these extensions are never HTML, so a HEAD request is enough
+NON_HTML_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp',
+    '.mp4', '.mov', '.webm', '.mp3', '.wav', '.zip', '.gz', '.css', '.js',
+    '.woff', '.woff2', '.ttf', '.otf', '.csv', '.xls', '.xlsx', '.doc', '.docx',
+)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+def decodable_charset(encoding: Optional[str]) -> str:
+    """The declared charset if Python knows it, otherwise UTF-8 (as requests falls back for .text)"""
+    if encoding:
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+# Storefront paths that are never worth crawling (session-specific or endless)
+CRAWL_SKIP_PATHS = ('/cart', '/checkout', '/checkouts', '/account', '/search', '/password', '/admin', '/apps')
+
+# Query parameters kept when crawling; everything else (variant, sort_by, filters) is dropped
+CRAWL_QUERY_PARAMS = ('page',)
+
+class LatencyHistogram:
+    """
+    Log-scale latency histogram with bounded memory
+    
+    Buckets grow by 2**(1/8) (about 9%) from 1ms, so percentiles are accurate
+    to within half a bucket however many samples are recorded.
+    """
+    BASE = 0.001
+    GROWTH = 2 ** (1 / 8)
+    
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float):
+        index = max(0, math.ceil(math.log(max(seconds, self.BASE) / self.BASE, self.GROWTH)))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+    
+    def percentile(self, fraction: float) -> float:
+        """Latency below which `fraction` of the samples fall (bucket midpoint, in seconds)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, self.BASE * self.GROWTH ** (index - 0.5)) if index else self.BASE
+        return self.max
+    
+    def summary(self) -> Dict[str, float]:
+        return {
+            'requests': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 1),
+            'p95_ms': round(self.percentile(0.95) * 1000, 1),
+            'p99_ms': round(self.percentile(0.99) * 1000, 1),
+            'max_ms': round(self.max * 1000, 1),
+        }
 
-class LinkExtractor(HTMLParser):
-    """Extract links from HTML content"""
+class RunStats:
+    """
+    Thread-safe counters and timings for a single run
+    
+    Besides request and byte counters this keeps the wall time of each phase
+    (see timed_phase), per-host request latency histograms and the CPU time
+    spent in content analysis.
+    """
     def __init__(self):
-        super().__init__()
-        self.links = []
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            'requests': 0,
+            'requests_saved': 0,
+            'bytes_read': 0,
+            'bytes_saved': 0,
+        }
+        self.started = time.time()
+        self._started_clock = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self.phases: List[Tuple[str, float, float, str]] = []  # (name, start offset, seconds, thread)
+        self.cpu_seconds: Dict[str, float] = {}
+        self.host_latency: Dict[str, LatencyHistogram] = {}
+    
+    def add(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def __getitem__(self, name: str) -> int:
+        return self.counters.get(name, 0)
+    
+    def record_request(self, url: str, seconds: float, response: Optional[requests.Response] = None):
+        """Count a request and its time to response headers; transport retries are counted too"""
+        host = urlsplit(url).netloc.lower()
+        retries = getattr(getattr(response, 'raw', None), 'retries', None)
+        with self._lock:
+            self.counters['requests'] += 1
+            histogram = self.host_latency.get(host)
+            if histogram is None:
+                histogram = self.host_latency[host] = LatencyHistogram()
+            histogram.record(seconds)
+            if retries is not None and retries.history:
+                self.counters['retries'] = self.counters.get('retries', 0) + len(retries.history)
+    
+    @contextmanager
+    def phase(self, name: str):
+        """Record the wall time of the block as a run phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.phases.append((name, start - self._started_clock, end - start, threading.current_thread().name))
+    
+    @contextmanager
+    def cpu(self, name: str):
+        """Add the calling thread's CPU time in the block to a named total"""
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_cpu(name, time.thread_time() - start)
+    
+    def add_cpu(self, name: str, seconds: float):
+        """Add CPU seconds measured elsewhere (e.g. in an analysis process) to a named total"""
+        with self._lock:
+            self.cpu_seconds[name] = self.cpu_seconds.get(name, 0.0) + seconds
+    
+    def phase_totals(self) -> Dict[str, float]:
+        """Wall seconds per phase name, in the order phases first finished"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for name, _, seconds, _ in self.phases:
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+    
+    def host_summaries(self) -> Dict[str, Dict[str, float]]:
+        """Latency summary per host, hosts with the most total request time first"""
+        with self._lock:
+            ranked = sorted(self.host_latency.items(), key=lambda item: item[1].total, reverse=True)
+            return {host: histogram.summary() for host, histogram in ranked}
+    
+    def summary(self) -> Dict:
+        """Everything recorded so far, as plain JSON-serialisable data"""
+        with self._lock:
+            counters = dict(self.counters)
+            cpu_seconds = {name: round(seconds, 3) for name, seconds in self.cpu_seconds.items()}
+        return {
+            'wall_seconds': round(time.perf_counter() - self._started_clock, 3),
+            'cpu_seconds': round(time.process_time() - self._started_cpu, 3),
+            'phases': {name: round(seconds, 3) for name, seconds in self.phase_totals().items()},
+            'analysis_cpu_seconds': cpu_seconds,
+            'counters': counters,
+            'hosts': self.host_summaries(),
+        }
+    
+    def trace_events(self) -> List[Dict]:
+        """Phases as Chrome trace 'complete' events (chrome://tracing, Perfetto)"""
+        with self._lock:
+            return [
+                {'name': name, 'ph': 'X', 'ts': round(start * 1e6), 'dur': round(seconds * 1e6), 'pid': 1, 'tid': thread}
+                for name, start, seconds, thread in self.phases
+            ]
+
+def timed_phase(name: str):
+    """Decorator recording a checker method's wall time as a phase of the run (for generators, until they finish)"""
+    def decorate(method):
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator_wrapper(self, *args, **kwargs):
+                with self.stats.phase(name):
+                    yield from method(self, *args, **kwargs)
+            return generator_wrapper
+        
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.stats.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+def analysis_cpu(name: str):
+    """Decorator adding a checker method's CPU time to a named content-analysis total"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.stats.cpu(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a cache key (lowercase scheme/host, default port and fragment dropped)"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, parsed.query, ''))
+
+# Query parameters that only carry campaign or click tracking and never change the target
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'gclsrc', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'srsltid', '_pos', '_sid', '_ss',
+}
+TRACKING_PARAM_PREFIXES = ('utm_',)
+
+def canonicalize_url(url: str, base: Optional[str] = None, store_host: Optional[str] = None) -> str:
+    """
+    Canonical form of a link, used to deduplicate links before checking
+    
+    Resolves the link against base, lowercases scheme and host, drops default
+    ports, fragments and tracking parameters. Trailing slashes are stripped
+    from non-root paths on the store's own host only, where Shopify serves
+    both forms; elsewhere "/docs/" and "/docs" can be different resources.
+    Non-HTTP links are returned as given.
+    
+    Args:
+        store_host: Hostname of the store (no trailing-slash stripping without it)
+    """
+    url = url.strip()
+    try:
+        if base:
+            url = urljoin(base, url)
+        parsed = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parsed.scheme.lower()
+    if scheme not in ('http', 'https'):
+        return url
+    
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rsplit(':', 1)[-1]) in (('http', '80'), ('https', '443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    path = parsed.path or '/'
+    if store_host and (parsed.hostname or '').lower() == store_host.lower():
+        path = path.rstrip('/') or '/'
+    query = parsed.query
+    if query:
+        params = parse_qsl(query, keep_blank_values=True)
+        kept = [(key, value) for key, value in params
+                if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)]
+        if len(kept) != len(params):
+            query = urlencode(kept)
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+class LinkCheckCache:
+    """
+    On-disk cache of link check results keyed by normalized URL
+    
+    Entries younger than the TTL are reused as-is. Expired entries keep their
+    ETag/Last-Modified validators so they can be revalidated with a conditional
+    request; the least recently used entries are evicted beyond max_entries.
+    """
+    VERSION = 1
+    
+    def __init__(self, path: str, ttl: float = 7 * 86400, max_entries: int = 50000,
+                 log: Callable[[str], None] = print):
+        self.path = path
+        self.log = log
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._validators: Dict[str, Dict[str, str]] = {}
+        self._dirty = False
+        self._load()
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self._entries = data.get('entries', {})
+        except (OSError, ValueError) as e:
+            self.log(f"⚠️  Could not read link cache {self.path}: {e}")
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cache entry for a URL (fresh or expired), or None"""
+        with self._lock:
+            entry = self._entries.get(normalize_url(url))
+            if entry is not None:
+                entry['last_used'] = time.time()
+            return entry
+    
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry['checked_at'] < self.ttl
+    
+    @staticmethod
+    def conditional_headers(entry: Dict) -> Dict[str, str]:
+        """Request headers that let the server answer 304 if the target is unchanged"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    @staticmethod
+    def to_link_check(url: str, entry: Dict) -> LinkCheck:
+        result = entry['result']
+        return LinkCheck(url, result['status_code'], result['is_dead'], result['error'], result['is_internal'],
+                         result.get('redirect_chain') or [])
+    
+    def remember_validators(self, url: str, headers):
+        """Hold on to a response's validators until its result is stored with put()"""
+        validators = {
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+        }
+        with self._lock:
+            self._validators[normalize_url(url)] = validators
+    
+    def put(self, url: str, check: LinkCheck):
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            validators = self._validators.pop(key, {})
+            result = asdict(check)
+            del result['url']
+            self._entries[key] = {
+                'result': result,
+                'checked_at': now,
+                'last_used': now,
+                'etag': validators.get('etag'),
+                'last_modified': validators.get('last_modified'),
+            }
+            self._dirty = True
+            if len(self._entries) > self.max_entries * 1.1:
+                self._evict()
+    
+    def refresh(self, url: str):
+        """Mark an entry as just verified (the server answered 304 Not Modified)"""
+        key = normalize_url(url)
+        with self._lock:
+            self._validators.pop(key, None)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['checked_at'] = time.time()
+                self._dirty = True
+    
+    def _evict(self):
+        """Drop least recently used entries down to max_entries (lock must be held)"""
+        if len(self._entries) <= self.max_entries:
+            return
+        keep = sorted(self._entries.items(), key=lambda item: item[1]['last_used'], reverse=True)
+        self._entries = dict(keep[:self.max_entries])
+    
+    def save(self):
+        """Write the cache to disk atomically"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._evict()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'entries': self._entries}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+class ScanState:
+    """
+    Per-page fingerprints saved by the previous run, for incremental re-scans
+    
+    A page is unchanged when its updatedAt matches the stored one or, for
+    sources without updatedAt, when its body hashes the same. Unchanged pages
+    reuse the links extracted last time instead of being fetched again.
+    """
+    VERSION = 1
+    
+    def __init__(self, path: str, log: Callable[[str], None] = print):
+        self.path = path
+        self.log = log
+        self._previous: Dict[str, Dict] = {}
+        self._current: Dict[str, Dict] = {}
+        self._load()
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self._previous = data.get('pages', {})
+        except (OSError, ValueError) as e:
+            self.log(f"⚠️  Could not read scan state {self.path}: {e}")
+    
+    def __len__(self) -> int:
+        return len(self._previous)
+    
+    @staticmethod
+    def content_hash(body: str) -> str:
+        return hashlib.sha256(body.encode('utf-8', 'replace')).hexdigest()
+    
+    def unchanged_links(self, page_data: Dict, body_hash: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Links stored for an unchanged page, or None if the page is new or changed
+        
+        Without updatedAt the page can only be compared once its body hash is known.
+        """
+        entry = self._previous.get(page_data['id'])
+        if entry is None:
+            return None
+        updated_at = page_data.get('updatedAt')
+        if updated_at:
+            unchanged = updated_at == entry.get('updated_at')
+        else:
+            unchanged = body_hash is not None and body_hash == entry.get('hash')
+        return list(entry['links']) if unchanged else None
+    
+    def record(self, page_id: str, updated_at: Optional[str], body_hash: Optional[str], links: List[str]):
+        """Store a page's fingerprint for the next run; a missing hash carries over the previous one"""
+        if body_hash is None:
+            body_hash = self._previous.get(page_id, {}).get('hash')
+        self._current[page_id] = {'updated_at': updated_at, 'hash': body_hash, 'links': links}
+    
+    def save(self):
+        """Write this run's fingerprints atomically (pages no longer in the store are dropped)"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'pages': self._current}, f)
+        os.replace(tmp_path, self.path)
+
+class ResultStore:
+    """
+    SQLite store for pages, links and link check results, one row set per run
+    
+    Rows are buffered and written in batches; every read flushes first. The
+    database runs in WAL mode so reports can query it while a crawl writes.
+    """
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        store_url TEXT NOT NULL,
+        started_at REAL NOT NULL,
+        finished_at REAL
+    );
+    CREATE TABLE IF NOT EXISTS links (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS pages (
+        run_id INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        page_id TEXT NOT NULL,
+        title TEXT,
+        handle TEXT,
+        url TEXT,
+        published INTEGER NOT NULL,
+        published_at TEXT,
+        PRIMARY KEY (run_id, seq)
+    );
+    CREATE TABLE IF NOT EXISTS page_links (
+        run_id INTEGER NOT NULL,
+        page_seq INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        link_id INTEGER NOT NULL,
+        PRIMARY KEY (run_id, page_seq, position)
+    );
+    CREATE INDEX IF NOT EXISTS page_links_by_link ON page_links (link_id, run_id);
+    CREATE TABLE IF NOT EXISTS run_links (
+        run_id INTEGER NOT NULL,
+        link_id INTEGER NOT NULL,
+        PRIMARY KEY (run_id, link_id)
+    );
+    CREATE TABLE IF NOT EXISTS link_checks (
+        run_id INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        link_id INTEGER NOT NULL,
+        status_code INTEGER,
+        is_dead INTEGER NOT NULL,
+        error TEXT,
+        is_internal INTEGER NOT NULL,
+        redirect_chain TEXT,
+        PRIMARY KEY (run_id, seq)
+    );
+    CREATE INDEX IF NOT EXISTS link_checks_by_link ON link_checks (link_id, run_id);
+    CREATE INDEX IF NOT EXISTS link_checks_dead ON link_checks (run_id, is_dead);
+    """
+    
+    LINK_ID_CACHE_SIZE = 100000
+    
+    def __init__(self, path: str, store_url: str, batch_size: int = 1000):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(link_checks)")]
+        if 'redirect_chain' not in columns:
+            # Databases written before redirect chains were recorded
+            self._conn.execute("ALTER TABLE link_checks ADD COLUMN redirect_chain TEXT")
+        self._link_ids: Dict[str, int] = {}
+        self._pending: Dict[str, List[tuple]] = {'pages': [], 'page_links': [], 'run_links': [], 'link_checks': []}
+        self._counts = {'pages': 0, 'link_checks': 0}
+        with self._conn:
+            cursor = self._conn.execute("INSERT INTO runs (store_url, started_at) VALUES (?, ?)",
+                                        (store_url, time.time()))
+        self.run_id = cursor.lastrowid
+        self.store_url = store_url
+    
+    def _link_id(self, url: str) -> int:
+        """Row id for a link URL, inserting it if needed (lock must be held)"""
+        link_id = self._link_ids.get(url)
+        if link_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO links (url) VALUES (?)", (url,))
+            link_id = self._conn.execute("SELECT id FROM links WHERE url = ?", (url,)).fetchone()[0]
+            if len(self._link_ids) >= self.LINK_ID_CACHE_SIZE:
+                self._link_ids.clear()  # Keep memory bounded on very large crawls
+            self._link_ids[url] = link_id
+        return link_id
+    
+    def _queue(self, table: str, rows: List[tuple]):
+        """Buffer rows and write them once a batch is full (lock must be held)"""
+        self._pending[table].extend(rows)
+        if sum(len(pending) for pending in self._pending.values()) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Write all buffered rows in one transaction"""
+        with self._lock, self._conn:
+            if self._pending['pages']:
+                self._conn.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._pending['pages'])
+            if self._pending['page_links']:
+                self._conn.executemany("INSERT INTO page_links VALUES (?, ?, ?, ?)", self._pending['page_links'])
+            if self._pending['run_links']:
+                self._conn.executemany("INSERT OR IGNORE INTO run_links VALUES (?, ?)", self._pending['run_links'])
+            if self._pending['link_checks']:
+                self._conn.executemany("INSERT INTO link_checks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._pending['link_checks'])
+            for pending in self._pending.values():
+                pending.clear()
+    
+    def add_page(self, page: Page):
+        with self._lock:
+            seq = self._counts['pages']
+            self._counts['pages'] += 1
+            link_rows = [(self.run_id, seq, position, self._link_id(link)) for position, link in enumerate(page.links)]
+            self._queue('page_links', link_rows)
+            self._queue('pages', [(self.run_id, seq, page.id, page.title, page.handle, page.url,
+                                   int(page.published), page.published_at)])
+    
+    def add_links(self, links: Iterable[str]):
+        with self._lock:
+            # Duplicates are dropped by the (run_id, link_id) key when the batch is written
+            self._queue('run_links', [(self.run_id, self._link_id(link)) for link in links])
+    
+    def has_link(self, link: str) -> bool:
+        return next(self._select(
+            "SELECT 1 FROM run_links r JOIN links l ON l.id = r.link_id WHERE r.run_id = ? AND l.url = ?",
+            (self.run_id, link)), None) is not None
+    
+    def add_link_checks(self, checks: Iterable[LinkCheck]):
+        with self._lock:
+            rows = []
+            for check in checks:
+                rows.append((self.run_id, self._counts['link_checks'], self._link_id(check.url),
+                             check.status_code, int(check.is_dead), check.error, int(check.is_internal),
+                             json.dumps(check.redirect_chain) if check.redirect_chain else None))
+                self._counts['link_checks'] += 1
+            self._queue('link_checks', rows)
+    
+    def count(self, table: str) -> int:
+        if table == 'run_links':
+            return next(self._select("SELECT COUNT(*) FROM run_links WHERE run_id = ?", (self.run_id,)))[0]
+        return self._counts[table]
+    
+    def _select(self, sql: str, params: tuple = ()) -> Iterator[tuple]:
+        """Run a query after flushing, yielding rows in chunks rather than all at once"""
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            yield from rows
+    
+    def iter_pages(self) -> Iterator[Page]:
+        current: Optional[Page] = None
+        current_seq = None
+        for row in self._select(
+                "SELECT p.seq, p.page_id, p.title, p.handle, p.url, p.published, p.published_at, l.url "
+                "FROM pages p LEFT JOIN page_links pl ON pl.run_id = p.run_id AND pl.page_seq = p.seq "
+                "LEFT JOIN links l ON l.id = pl.link_id "
+                "WHERE p.run_id = ? ORDER BY p.seq, pl.position", (self.run_id,)):
+            if row[0] != current_seq:
+                if current is not None:
+                    yield current
+                current_seq = row[0]
+                current = Page(row[1], row[2], row[3], row[4], bool(row[5]), row[6], [])
+            if row[7] is not None:
+                current.links.append(row[7])
+        if current is not None:
+            yield current
+    
+    def iter_links(self, by_url: bool = False, limit: Optional[int] = None) -> Iterator[str]:
+        """This run's links in the order they were found, or sorted by URL; at most limit of them"""
+        sql = ("SELECT l.url FROM run_links r JOIN links l ON l.id = r.link_id "
+               f"WHERE r.run_id = ? ORDER BY {'l.url' if by_url else 'r.rowid'}")
+        params: tuple = (self.run_id,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        for (url,) in self._select(sql, params):
+            yield url
+    
+    def _link_check_filter(self, dead: Optional[bool], internal: Optional[bool],
+                           redirected: Optional[bool]) -> Tuple[str, tuple]:
+        """WHERE clause and parameters selecting this run's link checks"""
+        sql = "c.run_id = ?"
+        params: tuple = (self.run_id,)
+        if dead is not None:
+            sql += " AND c.is_dead = ?"
+            params += (int(dead),)
+        if internal is not None:
+            sql += " AND c.is_internal = ?"
+            params += (int(internal),)
+        if redirected is not None:
+            sql += " AND c.redirect_chain IS NOT NULL" if redirected else " AND c.redirect_chain IS NULL"
+        return sql, params
+    
+    def iter_link_checks(self, dead: Optional[bool] = None, internal: Optional[bool] = None,
+                         redirected: Optional[bool] = None) -> Iterator[LinkCheck]:
+        """This run's link checks in the order they were stored (redirected ones: longest chain first)"""
+        where, params = self._link_check_filter(dead, internal, redirected)
+        order = "json_array_length(c.redirect_chain) DESC, c.seq" if redirected else "c.seq"
+        for url, status_code, is_dead, error, is_internal, chain in self._select(
+                "SELECT l.url, c.status_code, c.is_dead, c.error, c.is_internal, c.redirect_chain FROM link_checks c "
+                f"JOIN links l ON l.id = c.link_id WHERE {where} ORDER BY {order}", params):
+            yield LinkCheck(url, status_code, bool(is_dead), error, bool(is_internal), json.loads(chain) if chain else [])
+    
+    def count_link_checks(self, dead: Optional[bool] = None, internal: Optional[bool] = None,
+                          redirected: Optional[bool] = None) -> int:
+        where, params = self._link_check_filter(dead, internal, redirected)
+        return next(self._select(f"SELECT COUNT(*) FROM link_checks c WHERE {where}", params))[0]
+    
+    def previous_run_id(self) -> Optional[int]:
+        """Most recent earlier run of the same store that checked links"""
+        row = next(self._select(
+            "SELECT MAX(r.id) FROM runs r WHERE r.store_url = ? AND r.id < ? "
+            "AND EXISTS (SELECT 1 FROM link_checks c WHERE c.run_id = r.id)",
+            (self.store_url, self.run_id)), (None,))
+        return row[0]
     
-    def handle_starttag(self, tag, attrs):
-        if tag == 'a':
-            for attr, value in attrs:
-                if attr == 'href' and value:
-                    self.links.append(value)
+    def link_changes(self, previous_run_id: int) -> Dict[str, List[str]]:
+        """Links that became dead or recovered since an earlier run (checked in both runs)"""
+        changes: Dict[str, List[str]] = {'newly_dead': [], 'recovered': []}
+        for url, was_dead, is_dead in self._select(
+                "SELECT l.url, MAX(old.is_dead), MAX(new.is_dead) FROM link_checks new "
+                "JOIN link_checks old ON old.link_id = new.link_id AND old.run_id = ? "
+                "JOIN links l ON l.id = new.link_id WHERE new.run_id = ? "
+                "GROUP BY new.link_id HAVING MAX(old.is_dead) != MAX(new.is_dead) ORDER BY l.url",
+                (previous_run_id, self.run_id)):
+            changes['newly_dead' if is_dead else 'recovered'].append(url)
+        return changes
+    
+    def close(self):
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), self.run_id))
+        self._conn.close()
+
+class StoredPages:
+    """List-like view of the current run's pages in a ResultStore"""
+    def __init__(self, store: ResultStore):
+        self.store = store
+    
+    def append(self, page: Page):
+        self.store.add_page(page)
+    
+    def __len__(self) -> int:
+        return self.store.count('pages')
+    
+    def __iter__(self) -> Iterator[Page]:
+        return self.store.iter_pages()
+
+class StoredLinks:
+    """Set-like view of the current run's links in a ResultStore (insertion ordered)"""
+    def __init__(self, store: ResultStore):
+        self.store = store
+    
+    def add(self, link: str):
+        self.store.add_links([link])
+    
+    def update(self, links: Iterable[str]):
+        self.store.add_links(links)
+    
+    def __contains__(self, link: str) -> bool:
+        return self.store.has_link(link)
+    
+    def __len__(self) -> int:
+        return self.store.count('run_links')
+    
+    def __iter__(self) -> Iterator[str]:
+        return self.store.iter_links()
+
+class StoredLinkChecks:
+    """List-like view of the current run's link check results in a ResultStore, optionally filtered"""
+    def __init__(self, store: ResultStore, dead: Optional[bool] = None, internal: Optional[bool] = None,
+                 redirected: Optional[bool] = None):
+        self.store = store
+        self.filters = {'dead': dead, 'internal': internal, 'redirected': redirected}
+    
+    def where(self, **filters: Optional[bool]) -> 'StoredLinkChecks':
+        """View of the checks that also match these filters (dead, internal, redirected)"""
+        return StoredLinkChecks(self.store, **dict(self.filters, **filters))
+    
+    def append(self, check: LinkCheck):
+        self.store.add_link_checks([check])
+    
+    def extend(self, checks: Iterable[LinkCheck]):
+        self.store.add_link_checks(checks)
+    
+    def __len__(self) -> int:
+        if all(value is None for value in self.filters.values()):
+            return self.store.count('link_checks')
+        return self.store.count_link_checks(**self.filters)
+    
+    def __iter__(self) -> Iterator[LinkCheck]:
+        return self.store.iter_link_checks(**self.filters)
+
+class ResultSink(ABC):
+    """
+    Append-only record stream of a run's pages and link checks
+    
+    Records are written as soon as they are produced so an interrupted run keeps
+    everything finished so far. Writes are buffered and fsync'ed in batches
+    (every fsync_every records or fsync_interval seconds, whichever comes first).
+    """
+    def __init__(self, path: str, fsync_every: int = 200, fsync_interval: float = 5.0):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def start(self, store_url: str):
+        """Record which store the run belongs to"""
+        self._write({'type': 'run', 'store_url': store_url, 'started_at': time.time()})
+    
+    def write_page(self, page: Page):
+        self._write(dict(asdict(page), type='page'))
+    
+    def write_link_check(self, check: LinkCheck):
+        self._write(dict(asdict(check), type='link_check'))
+    
+    def _write(self, record: Dict):
+        with self._lock:
+            self._encode(record)
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+    
+    @abstractmethod
+    def _encode(self, record: Dict):
+        """Write one record to self._file (the lock is held)"""
+    
+    def _sync(self):
+        """Push buffered records to disk (lock must be held)"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync()
+                self._file.close()
+
+class JsonLinesSink(ResultSink):
+    """One JSON object per line"""
+    def _encode(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write('\n')
+
+class CsvSink(ResultSink):
+    """CSV with one row per record; page links and redirect chains are stored as JSON lists"""
+    FIELDS = ['type', 'store_url', 'started_at', 'id', 'title', 'handle', 'url', 'published', 'published_at',
+              'links', 'status_code', 'is_dead', 'error', 'is_internal', 'redirect_chain']
+    
+    def __init__(self, path: str, fsync_every: int = 200, fsync_interval: float = 5.0):
+        super().__init__(path, fsync_every, fsync_interval)
+        self._writer = csv.DictWriter(self._file, fieldnames=self.FIELDS)
+        self._writer.writeheader()
+    
+    def _encode(self, record: Dict):
+        for key in ('links', 'redirect_chain'):
+            if key in record:
+                record[key] = json.dumps(record[key], ensure_ascii=False)
+        self._writer.writerow(record)
+
+def open_result_sink(path: str) -> ResultSink:
+    """Pick the sink format from the file extension (.csv, otherwise JSON Lines)"""
+    return CsvSink(path) if path.lower().endswith('.csv') else JsonLinesSink(path)
+
+def read_results(path: str) -> Iterator[Dict]:
+    """Read back records written by a ResultSink, in order, as dicts with their original types"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if not path.lower().endswith('.csv'):
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        break  # A run killed mid-write leaves a partial last line
+            return
+        
+        # A run killed mid-write leaves a partial last row, which may still parse:
+        # it only counts when the file ends with a row terminator
+        complete = _ends_with_newline(path)
+        rows = csv.DictReader(f)
+        try:
+            row = next(rows, None)
+            while row is not None:
+                following = next(rows, None)
+                if following is None and not complete:
+                    break
+                if None in row.values():
+                    break  # Columns missing: every complete row has all of them
+                record = {key: value for key, value in row.items() if value}
+                if record.get('type') == 'page':
+                    record['links'] = json.loads(record.get('links') or '[]')
+                    record['published'] = record.get('published') == 'True'
+                elif record.get('type') == 'link_check':
+                    record['status_code'] = int(record['status_code']) if record.get('status_code') else None
+                    record['is_dead'] = record.get('is_dead') == 'True'
+                    record['is_internal'] = record.get('is_internal') == 'True'
+                    record['redirect_chain'] = json.loads(record.get('redirect_chain') or '[]')
+                yield record
+                row = following
+        except (ValueError, csv.Error):
+            return
+
+def _ends_with_newline(path: str) -> bool:
+    """Whether a file is empty or its last byte is a newline"""
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+# Domains to exclude (common external services), plus excluded schemes and "#" for in-page anchors
+DEFAULT_EXCLUDED_DOMAINS = [
+    'google.com', 'googleapis.com', 'gstatic.com', 'googleusercontent.com',
+    'shopify.com', 'shopifycdn.com', 'myshopify.com',
+    'facebook.com', 'fb.com', 'facebook.net',
+    'instagram.com',
+    'twitter.com', 'x.com',
+    'youtube.com', 'youtu.be',
+    'pinterest.com',
+    'linkedin.com',
+    'tiktok.com',
+    'snapchat.com',
+    'whatsapp.com',
+    'mailto:', 'tel:',
+    'javascript:', '#',
+]
+
+def load_excluded_domains(path: str) -> List[str]:
+    """Read exclusion entries from a file: one per line, '#'-prefixed lines are comments ('#' alone is the anchor rule)"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not (line.startswith('#') and line != '#'):
+                entries.append(line)
+    return entries
+
+# Scheme and hostname of a URL in one match (urlsplit costs more than the lookups themselves)
+URL_HOST_RE = re.compile(r'\s*(?:([a-zA-Z][a-zA-Z0-9+.-]*):)?(?://(?:[^@/?#]*@)?(\[[^\]/?#]*\]|[^:/?#]*))?')
+
+class ExclusionFilter:
+    """
+    Compiled link exclusions
+    
+    Domains go into a set and a link's hostname is matched by suffix, one
+    lookup per label (so 'cdn.shopify.com' matches 'shopify.com' but
+    'notgoogle.com.example' doesn't match 'google.com'). Entries ending in ':'
+    exclude a URL scheme, and '#' excludes in-page anchor links.
+    """
+    def __init__(self, entries: Iterable[str], allowed_hosts: Iterable[str] = ()):
+        self.domains: Set[str] = set()
+        self.schemes: Set[str] = set()
+        self.exclude_anchors = False
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        for entry in entries:
+            entry = entry.strip().lower()
+            if entry == '#':
+                self.exclude_anchors = True
+            elif entry.endswith(':'):
+                self.schemes.add(entry[:-1])
+            elif entry:
+                # Accept 'example.com', '*.example.com', '.example.com' or a full URL
+                host = urlsplit(entry).hostname if '//' in entry else entry.split('/')[0]
+                self.domains.add((host or '').lstrip('*.'))
+        self.domains.discard('')
+        # Pages repeat the same few hosts, so remember each host's verdict
+        self._host_verdicts: Dict[str, bool] = {}
+    
+    def excludes(self, link: str) -> bool:
+        scheme, host = URL_HOST_RE.match(link).groups()
+        if scheme is None and host is None:
+            return self.exclude_anchors and link.lstrip().startswith('#')
+        if scheme is not None and scheme.lower() in self.schemes:
+            return True
+        if not host:
+            return False
+        verdict = self._host_verdicts.get(host)
+        if verdict is None:
+            verdict = self._host_verdicts[host] = self._excludes_host(host.lower())
+        return verdict
+    
+    def __getstate__(self):
+        # Analysis processes receive the filter with every document; they rebuild their own verdicts
+        return {**self.__dict__, '_host_verdicts': {}}
+    
+    def _excludes_host(self, host: str) -> bool:
+        if host in self.allowed_hosts:
+            return False
+        if host in self.domains:
+            return True
+        dot = host.find('.')
+        while dot != -1:
+            if host[dot + 1:] in self.domains:
+                return True
+            dot = host.find('.', dot + 1)
+        return False
+
+# Navigation/footer/cart text that doesn't count as page content
+NAVIGATION_PATTERNS = [
+    r'\bhome\b', r'\bshop\b', r'\bcart\b', r'\blogin\b', r'\bsearch\b',
+    r'\bmenu\b', r'\bfooter\b', r'\bheader\b', r'\bfacebook\b',
+    r'\binstagram\b', r'\btwitter\b', r'\byoutube\b', r'\btiktok\b',
+    r'\babout\b', r'\bcontact\b', r'\bvisit our stores\b', r'\bstore hours\b',
+    r'\bphone number\b', r'\bcustomer service\b', r'\bjoin our\b',
+    r'\bpowered by shopify\b', r'\brefund policy\b', r'\bprivacy policy\b',
+    r'\bterms of service\b', r'\bshipping policy\b', r'\b©\s*\d{4}',
+    r'\bhave an account\b', r'\blog in\b', r'\bcontinue shopping\b',
+    r'\bcheck out\b', r'\bestimated total\b', r'\btaxes.*calculated\b'
+]
+# Applied one after another (a removal can join text into a match for a later pattern),
+# each behind the literal it can't match without
+NAVIGATION_RES = [(re.sub(r'\\b|\\s\*.*|\.\*.*', '', pattern), re.compile(pattern, re.IGNORECASE))
+                  for pattern in NAVIGATION_PATTERNS]
+# "taxes.*calculated" can erase everything from the first "taxes" to the last
+# "calculated" in the document, so text after a "taxes" is never certain early on
+TAXES_RE = re.compile(r'\btaxes', re.IGNORECASE)
+
+# Markup that suggests a real content area
+CONTENT_INDICATORS = (
+    '<article',
+    '<main',
+    '<section',
+    'class="content"',
+    'class="post"',
+    'class="article"',
+    'class="blog-post"',
+    'class="page-content"',
+    'id="content"',
+    'id="main-content"',
+    'class="blog-content"',
+    'class="post-content"',
+)
+
+# Elements dropped before measuring page text, in stripping order: an element
+# only hides openers of elements that come later in this tuple
+DROPPED_TAGS = ('script', 'style', 'nav', 'footer', 'header')
+
+TAG_RE = re.compile(r'<[^>]+>')
+
+def _dropped_events(dead: int, depth: int):
+    """
+    Openers of elements stripped before DROPPED_TAGS[depth], plus that element's closer
+    
+    Openers of the first `dead` tags are left out: they are known to have no
+    closer, so their strip passes wouldn't remove anything.
+    """
+    events = []
+    if depth > dead:
+        events.append(f"<(?P<open>{'|'.join(DROPPED_TAGS[dead:depth])})[^>]*>")
+    if depth < len(DROPPED_TAGS):
+        events.append(f"(?P<close></{DROPPED_TAGS[depth]}>)")
+    return re.compile('|'.join(events), re.IGNORECASE) if events else None
+
+# Indexed by dead openers, then by the innermost open dropped element (len(DROPPED_TAGS) when none is open)
+DROPPED_EVENT_RES = [[_dropped_events(dead, depth) for depth in range(len(DROPPED_TAGS) + 1)]
+                     for dead in range(len(DROPPED_TAGS) + 1)]
+
+def _safe_end(buffer: str, start: int) -> int:
+    """End of the buffer prefix that can't hold the start of an unfinished tag"""
+    last_close = buffer.rfind('>', start)
+    unfinished = buffer.find('<', max(start, last_close + 1))
+    return len(buffer) if unfinished == -1 else unfinished
+
+class _ElementCapture:
+    """Collects the raw inner markup of every opener...closer match, across chunk boundaries"""
+    def __init__(self, open_re, close_re):
+        self.open_re = open_re
+        self.close_re = close_re
+        self.matched = []
+        self.pos = 0
+        self._inside = False
+        self._current: List[str] = []
+    
+    def scan(self, buffer: str, final: bool):
+        while True:
+            if not self._inside:
+                match = self.open_re.search(buffer, self.pos)
+                if match is None:
+                    self.pos = len(buffer) if final else _safe_end(buffer, self.pos)
+                    return
+                self._inside = True
+                self._current = []
+                self.pos = match.end()
+            match = self.close_re.search(buffer, self.pos)
+            if match is None:
+                end = len(buffer) if final else _safe_end(buffer, self.pos)
+                self._current.append(buffer[self.pos:end])
+                self.pos = end
+                return
+            self._current.append(buffer[self.pos:match.start()])
+            self.matched.append(''.join(self._current))
+            self._inside = False
+            self.pos = match.end()
+
+class ContentClassifier:
+    """
+    Incremental, single-pass page content check
+    
+    Feed decoded HTML in chunks. Page text outside script/style/nav/footer/header,
+    heading text and paragraph text are collected as the chunks arrive. Tags
+    are matched the way sequential regex strip passes match them (`<[^>]+>`,
+    first closing tag wins), without a pass per element type. With early_stop,
+    `decided` becomes True as soon as the page certainly has meaningful
+    content and callers can stop reading.
+    """
+    EARLY_MARGIN = 40  # trailing chars a later chunk could still turn into navigation text
+    
+    def __init__(self, early_stop: bool = True):
+        self.early_stop = early_stop
+        self.decided = False
+        self._buffer = ''
+        self._pos = 0
+        self._dropped: List[Tuple[int, List[str]]] = []
+        self._dead = 0  # Leading DROPPED_TAGS whose openers no longer start an element
+        self._text: List[str] = []
+        self._text_length = 0
+        self._next_check = 1024
+        self._headings = _ElementCapture(
+            re.compile(r'<h[1-6][^>]*>', re.IGNORECASE), re.compile(r'</h[1-6]>', re.IGNORECASE))
+        self._paragraphs = _ElementCapture(
+            re.compile(r'<p[^>]*>', re.IGNORECASE), re.compile(r'</p>', re.IGNORECASE))
+        self._indicators: Set[str] = set()
+        self._tail = ''
+        self._closed = False
+    
+    @property
+    def has_headings(self) -> bool:
+        return bool(self._headings.matched)
+    
+    @property
+    def has_paragraphs(self) -> bool:
+        return bool(self._paragraphs.matched)
+    
+    def feed(self, data: str):
+        if self.decided or not data:
+            return
+        # Indicators are plain substrings; keep a tail so ones split across chunks are found
+        lowered = self._tail + data.lower()
+        for indicator in CONTENT_INDICATORS:
+            if indicator not in self._indicators and indicator in lowered:
+                self._indicators.add(indicator)
+        self._tail = lowered[-(max(map(len, CONTENT_INDICATORS)) - 1):]
+        
+        self._buffer += data
+        self._scan(final=False)
+        
+        if self.early_stop and self._text_length >= self._next_check:
+            self._next_check = self._text_length + max(1024, self._text_length // 4)
+            self.decided = self._is_certainly_meaningful()
+    
+    def _keep(self, text: str):
+        if self._dropped:
+            self._dropped[-1][1].append(text)
+        else:
+            self._text.append(text)
+            self._text_length += len(text)
+    
+    def _scan_dropped(self, buffer: str, pos: int, final: bool) -> int:
+        """Sort buffer text from pos into page text and held-back dropped elements; returns the end consumed"""
+        while True:
+            depth = self._dropped[-1][0] if self._dropped else len(DROPPED_TAGS)
+            events = DROPPED_EVENT_RES[self._dead][depth]
+            match = events.search(buffer, pos) if events is not None else None
+            if match is None:
+                break
+            self._keep(buffer[pos:match.start()])
+            pos = match.end()
+            if match.lastgroup == 'open':
+                # Held back (opening tag included) until the element closes
+                self._dropped.append((DROPPED_TAGS.index(match.group('open').lower()), [match.group(0)]))
+            else:
+                self._dropped.pop()
+        end = len(buffer) if final else _safe_end(buffer, pos)
+        self._keep(buffer[pos:end])
+        return end
+    
+    def _scan(self, final: bool):
+        buffer = self._buffer
+        self._pos = self._scan_dropped(buffer, self._pos, final)
+        
+        self._headings.scan(buffer, final)
+        self._paragraphs.scan(buffer, final)
+        
+        # Drop what every scanner has consumed
+        consumed = min(self._pos, self._headings.pos, self._paragraphs.pos)
+        if consumed:
+            self._buffer = buffer[consumed:]
+            self._pos -= consumed
+            self._headings.pos -= consumed
+            self._paragraphs.pos -= consumed
+    
+    def close(self, complete: bool = True):
+        """
+        Finish the scan
+        
+        Args:
+            complete: False when the document was cut short; elements still open
+                      are then dropped, as their closers are most likely past the cut
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._scan(final=True)
+        while self._dropped:
+            index, held_back = self._dropped.pop()
+            if complete:
+                # No closer follows, so this strip pass (and every later opener of its kind)
+                # removes nothing: rescan the element as text of whatever encloses it
+                self._dead = index + 1
+                self._scan_dropped(''.join(held_back), 0, final=True)
+    
+    @staticmethod
+    def _strip_navigation(text: str) -> str:
+        text = ' '.join(text.split())
+        lowered = text.lower()
+        for literal, pattern in NAVIGATION_RES:
+            if literal in lowered:
+                text, removed = pattern.subn('', text)
+                if removed:
+                    lowered = text.lower()
+        return ' '.join(text.split())
+    
+    @staticmethod
+    def _markup_text(raw: str) -> str:
+        return ' '.join(TAG_RE.sub(' ', raw).split())
+    
+    @staticmethod
+    def _certain_length(text: str) -> int:
+        """Length of navigation-free text that no later input can remove"""
+        taxes = TAXES_RE.search(text)
+        if taxes:
+            text = text[:taxes.start()]
+        return len(ContentClassifier._strip_navigation(text)) - ContentClassifier.EARLY_MARGIN
+    
+    def _is_certainly_meaningful(self) -> bool:
+        """Whether content seen so far already guarantees a positive verdict"""
+        meaningful_length = self._certain_length(self._markup_text(''.join(self._text)))
+        if meaningful_length > 500:
+            return True
+        if len(self._indicators) >= 2 and meaningful_length > 200:
+            return True
+        # Later headings are joined ahead of all paragraph text, so only heading text is certain
+        if self.has_headings and self.has_paragraphs:
+            return self._certain_length(self._markup_text(' '.join(self._headings.matched))) > 150
+        return False
+    
+    def is_meaningful(self, complete: bool = True) -> bool:
+        """Final verdict; call after the last chunk has been fed (complete=False if the document was cut short)"""
+        if self.decided:
+            return True
+        self.close(complete)
+        meaningful_length = len(self._strip_navigation(self._markup_text(''.join(self._text))))
+        
+        # If we have content indicators and substantial text, it's meaningful
+        if len(self._indicators) >= 2 and meaningful_length > 200:
+            return True
+        
+        # If we have headings with actual text and paragraphs
+        if self.has_headings and self.has_paragraphs:
+            heading_text = self._markup_text(' '.join(self._headings.matched))
+            paragraph_text = self._markup_text(' '.join(self._paragraphs.matched))
+            if len(self._strip_navigation(heading_text + ' ' + paragraph_text)) > 150:
+                return True
+        
+        # If we have substantial text even without specific content tags
+        return meaningful_length > 500
+
+# Page fingerprint tokens: skipped blocks, comments, opening tags, closing tags, text
+FINGERPRINT_TOKEN_RE = re.compile(
+    r'<(script|style|svg|template|noscript)\b.*?</\1\s*>|<!--.*?-->|<([a-zA-Z][\w:-]*)([^>]*)>'
+    r'|</([a-zA-Z][\w:-]*)[^>]*>|([^<]+)',
+    re.IGNORECASE | re.DOTALL)
+CLASS_ATTR_RE = re.compile(r'''\bclass\s*=\s*["']([^"']*)''', re.IGNORECASE)
+WORD_RE = re.compile(r'\w{2,}')
+DIGITS_RE = re.compile(r'\d+')
+
+# Estimated shingle overlap above which a page counts as the store's 404 page or empty cart
+SOFT_404_SIMILARITY = 0.8
+
+class PageFingerprint:
+    """
+    Structural fingerprint of a page's main content
+    
+    The content of <main> (or the whole page when there is none) becomes a
+    stream of tag tokens (name plus classes, digits folded) and words. The
+    fingerprint keeps the SIZE smallest hashes of its overlapping shingles
+    (bottom-k MinHash), so two fingerprints estimate how much of their
+    structure and text two pages share. Feed decoded HTML in chunks;
+    `complete` becomes True once </main> has arrived and the rest of the page
+    isn't needed.
+    """
+    SIZE = 64
+    SHINGLE = 4
+    
+    def __init__(self):
+        self.complete = False
+        self.hashes: List[int] = []
+        self._chunks: List[str] = []
+        self._tail = ''
+        self._closed = False
+    
+    @classmethod
+    def from_html(cls, html: str) -> 'PageFingerprint':
+        fingerprint = cls()
+        fingerprint.feed(html)
+        return fingerprint.close()
+    
+    def feed(self, data: str):
+        if self.complete or not data:
+            return
+        self._chunks.append(data)
+        lowered = self._tail + data.lower()
+        self.complete = '</main' in lowered
+        self._tail = lowered[-5:]
+    
+    def close(self) -> 'PageFingerprint':
+        """Compute the fingerprint from everything fed so far"""
+        if self._closed:
+            return self
+        self._closed = True
+        html = ''.join(self._chunks)
+        self._chunks = []
+        
+        tokens = []
+        for match in FINGERPRINT_TOKEN_RE.finditer(html):
+            if match.group(2):
+                tag = match.group(2).lower()
+                if tag == 'main':
+                    tokens = []  # Only the main content counts when the page has one
+                classes = CLASS_ATTR_RE.search(match.group(3))
+                if classes:
+                    # Section ids like template--1234__main differ between otherwise identical renders
+                    tag += '.' + '.'.join(sorted(DIGITS_RE.sub('#', classes.group(1).lower()).split()))
+                tokens.append('<' + tag)
+            elif match.group(4):
+                if match.group(4).lower() == 'main':
+                    break
+            elif match.group(5):
+                tokens.extend(WORD_RE.findall(match.group(5).lower()))
+        
+        shingles = {' '.join(tokens[i:i + self.SHINGLE]) for i in range(max(1, len(tokens) - self.SHINGLE + 1))}
+        self.hashes = heapq.nsmallest(self.SIZE, {
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+            for shingle in shingles if shingle
+        })
+        return self
+    
+    def similarity(self, other: 'PageFingerprint') -> float:
+        """Estimated share of shingles the two pages have in common (0-1)"""
+        if not self.hashes or not other.hashes:
+            return float(self.hashes == other.hashes)
+        mine, theirs = set(self.hashes), set(other.hashes)
+        union = heapq.nsmallest(self.SIZE, mine | theirs)
+        return sum(1 for h in union if h in mine and h in theirs) / len(union)
+
+class QueryCostThrottle:
+    """Pace GraphQL requests from the query cost and throttle status Shopify reports"""
+    def __init__(self, default_wait: float = 1.0):
+        self._lock = threading.Lock()
+        self.default_wait = default_wait
+        self.maximum: Optional[float] = None
+        self.available: Optional[float] = None
+        self.restore_rate: Optional[float] = None
+        self.last_cost = 0.0
+        self._updated = 0.0
+        self._in_flight = 0
+    
+    def update(self, payload: Dict):
+        """Settle a spend() with the GraphQL response's extensions.cost, if the API sent one"""
+        cost = (payload.get('extensions') or {}).get('cost') or {}
+        status = cost.get('throttleStatus') or {}
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if cost.get('requestedQueryCost') is not None:
+                self.last_cost = float(cost['requestedQueryCost'])
+            if status.get('currentlyAvailable') is not None:
+                now = time.monotonic()
+                reported = float(status['currentlyAvailable'])
+                # While other queries are in flight the server's figure misses their
+                # reservations, so only ever lower the local estimate with it
+                if self.available is not None and self.restore_rate and self._in_flight:
+                    reported = min(reported, self._projected(now))
+                self.available = reported
+                self.maximum = float(status.get('maximumAvailable') or reported)
+                self.restore_rate = float(status.get('restoreRate') or 0) or None
+                self._updated = now
+    
+    def _projected(self, now: float) -> float:
+        """Budget available at `now`, counting what has restored since the last update"""
+        return min(self.maximum, self.available + self.restore_rate * (now - self._updated))
+    
+    def delay(self, cost: Optional[float] = None) -> float:
+        """Seconds until a query of this cost fits in the budget (0 without throttle info)"""
+        with self._lock:
+            if self.available is None or not self.restore_rate:
+                return 0.0
+            needed = self.last_cost if cost is None else cost
+            return max(0.0, (needed - self._projected(time.monotonic())) / self.restore_rate)
+    
+    def spend(self, cost: Optional[float] = None):
+        """Reserve a query's cost and wait until the budget covers it"""
+        wait_for = 0.0
+        with self._lock:
+            self._in_flight += 1
+            if self.available is not None and self.restore_rate:
+                # Reserving under the lock lets concurrent callers queue behind each other
+                now = time.monotonic()
+                needed = self.last_cost if cost is None else cost
+                self.available = self._projected(now) - needed
+                self._updated = now
+                if self.available < 0:
+                    wait_for = -self.available / self.restore_rate
+        if wait_for:
+            time.sleep(wait_for)
+    
+    def backoff(self, response: Optional[requests.Response], attempt: int) -> float:
+        """Seconds to wait after a 429 or THROTTLED error: Retry-After, the restore time, or jittered exponential"""
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, MAX_RETRY_AFTER)
+        return self.delay() or backoff_delay(attempt, self.default_wait)
+
+# Reference tokens: comments, script/style blocks (tag attributes, content), other markup, tags, text.
+# A ">" inside a quoted attribute value doesn't end the tag.
+TAG_ATTRS_PATTERN = r'''([^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*)'''
+REFERENCE_TOKEN_RE = re.compile(
+    rf'<!--.*?-->|<(script|style)\b{TAG_ATTRS_PATTERN}>(.*?)</\1\s*>|</[^>]*>|<[!?][^>]*>'
+    rf'|<([a-zA-Z][\w:-]*){TAG_ATTRS_PATTERN}>|([^<]+|<)',
+    re.IGNORECASE | re.DOTALL)
+ATTR_RE = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?''')
+PLAIN_URL_RE = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+# srcset candidates: a URL (trailing commas belong to the separator) and optional descriptors
+SRCSET_CANDIDATE_RE = re.compile(r'([^\s,]\S*)(?:\s[^,]*)?')
+
+# Reference kind of each URL attribute, per tag (<link> is decided by its rel)
+REFERENCE_ATTRS = {
+    'a': {'href': 'anchor'},
+    'area': {'href': 'anchor'},
+    'img': {'src': 'image', 'data-src': 'image', 'srcset': 'srcset', 'data-srcset': 'srcset'},
+    'source': {'src': 'media', 'srcset': 'srcset', 'data-srcset': 'srcset'},
+    'video': {'src': 'media', 'poster': 'image'},
+    'audio': {'src': 'media'},
+    'embed': {'src': 'media'},
+    'script': {'src': 'script'},
+    'iframe': {'src': 'iframe'},
+    'frame': {'src': 'iframe'},
+    'link': {'href': 'link'},
+}
+LINK_REL_KINDS = {'stylesheet': 'stylesheet', 'icon': 'image', 'apple-touch-icon': 'image'}
+LINK_REL_SKIPPED = {'preconnect', 'dns-prefetch'}  # Origins, not resources
+
+REFERENCE_KINDS = ('anchor', 'image', 'srcset', 'media', 'script', 'stylesheet', 'iframe', 'link', 'text')
+DEFAULT_REFERENCE_KINDS = ('anchor', 'text')  # <a href> and every absolute http(s) URL
+CRAWL_REFERENCE_KINDS = ('anchor', 'text')  # References the crawler follows
+
+def _unescape(value: str) -> str:
+    return unescape(value) if '&' in value else value
+
+def iter_references(document: str) -> Iterator[Reference]:
+    """
+    Typed URL references of an HTML document, in document order, in one pass
+    
+    Link attributes of anchors, images (src and srcset candidates), media,
+    scripts, stylesheets, iframes and <link> tags, plus bare http(s) URLs in
+    text, script content and every attribute value. An absolute URL in a
+    typed attribute is reported twice, under its kind and as 'text', so
+    'text' covers every http(s) URL in the markup. URLs are returned as
+    written (entities decoded, not resolved); comments are skipped.
+    """
+    line, line_start, counted = 1, 0, 0
+    
+    def reference(url: str, kind: str, offset: int) -> Reference:
+        # Offsets only grow, so lines are counted once across the document
+        nonlocal line, line_start, counted
+        newlines = document.count('\n', counted, offset)
+        if newlines:
+            line += newlines
+            line_start = document.rfind('\n', counted, offset) + 1
+        counted = offset
+        return Reference(url, kind, line, offset - line_start)
+    
+    def plain_urls(text: str, offset: int) -> Iterator[Reference]:
+        if '://' in text:
+            for match in PLAIN_URL_RE.finditer(text):
+                yield reference(_unescape(match.group()), 'text', offset + match.start())
+    
+    for token in REFERENCE_TOKEN_RE.finditer(document):
+        if token.group(6) is not None:
+            yield from plain_urls(token.group(6), token.start(6))
+            continue
+        if token.group(1) is not None:
+            tag, attrs_group = 'script' if token.group(1).lower() == 'script' else 'style', 2
+        elif token.group(4) is not None:
+            tag, attrs_group = token.group(4).lower(), 5
+        else:
+            continue
+        attrs, attrs_start = token.group(attrs_group), token.start(attrs_group)
+        
+        reference_attrs = REFERENCE_ATTRS.get(tag)
+        if reference_attrs is None:
+            yield from plain_urls(attrs, attrs_start)
+        else:
+            values = []
+            rel = ''
+            for attr in ATTR_RE.finditer(attrs):
+                value_group = next((g for g in (2, 3, 4) if attr.group(g) is not None), None)
+                if value_group is None:
+                    continue
+                name = attr.group(1).lower()
+                if name == 'rel':
+                    rel = attr.group(value_group).lower()
+                values.append((name, attr.group(value_group), attrs_start + attr.start(value_group)))
+            
+            if tag == 'link':
+                rels = set(rel.split())
+                if rels & LINK_REL_SKIPPED:
+                    reference_attrs = {'href': None}
+                else:
+                    kind = next((LINK_REL_KINDS[r] for r in rels if r in LINK_REL_KINDS), 'link')
+                    reference_attrs = {'href': kind}
+            
+            for name, value, offset in values:
+                kind = reference_attrs.get(name)
+                if kind is None and name in reference_attrs:
+                    continue
+                if kind == 'srcset':
+                    for candidate in SRCSET_CANDIDATE_RE.finditer(value):
+                        yield reference(_unescape(candidate.group(1).rstrip(',')), kind, offset + candidate.start())
+                elif kind is not None:
+                    stripped = value.strip()
+                    if stripped:
+                        yield reference(_unescape(stripped), kind, offset + value.find(stripped[0]))
+                yield from plain_urls(value, offset)
+        
+        if token.group(1) is not None:
+            yield from plain_urls(token.group(3), token.start(3))
+
+def links_of(references: Iterable[Reference], kinds: Iterable[str]) -> List[str]:
+    """URLs of the references of these kinds, once each, in the order they first appear"""
+    kinds = set(kinds)
+    seen = set()
+    links = []
+    for ref in references:
+        if ref.kind in kinds and ref.url not in seen:
+            seen.add(ref.url)
+            links.append(ref.url)
+    return links
+
+TITLE_RE = re.compile(r'<title[^>]*>([^<]+)</title>', re.IGNORECASE)
+
+# Documents queued for or in analysis per analysis process, before fetching pauses
+ANALYSIS_QUEUE_PER_PROCESS = 4
+
+# Seconds between checks for cancel() and the time budget while waiting on workers
+STOP_POLL_INTERVAL = 0.2
+
+@dataclass
+class PageAnalysis:
+    """Links found in one document"""
+    links: List[str]  # References of the checked kinds
+    followed: List[str]  # References a crawl follows
+    title: Optional[str]
+    cpu_seconds: float
+
+class PageAnalyzer:
+    """
+    Reference extraction settings of one store: store root, exclusions and checked kinds
+    
+    Small and picklable, so a document is analysed the same way inline and
+    in a process-pool worker (see analyze_document).
+    """
+    def __init__(self, base_url: str, exclusions: ExclusionFilter, kinds: Iterable[str]):
+        self.base_url = base_url
+        self.store_host = urlsplit(base_url).hostname
+        self.exclusions = exclusions
+        self.kinds = frozenset(kinds)
+    
+    def references(self, text: str, page_url: Optional[str] = None,
+                   kinds: Optional[Iterable[str]] = None) -> List[Reference]:
+        """Relevant references of a document, canonicalized, every occurrence in document order"""
+        kinds = set(kinds) if kinds is not None else None
+        base = page_url or f"{self.base_url}/"
+        resolved: Dict[str, Optional[str]] = {}
+        references = []
+        for ref in iter_references(text):
+            if kinds is not None and ref.kind not in kinds:
+                continue
+            if ref.url not in resolved:
+                link = ref.url.strip()
+                # Filter before resolving: "#team" or "mailto:" must not turn into a page URL
+                resolved[ref.url] = canonicalize_url(link, base, self.store_host) if link and not self.exclusions.excludes(link) else None
+            url = resolved[ref.url]
+            if url is not None:
+                references.append(replace(ref, url=url))
+        return references
+
+def analyze_document(analyzer: PageAnalyzer, body: Union[bytes, str], encoding: Optional[str],
+                     page_url: Optional[str] = None) -> PageAnalysis:
+    """
+    Decode a document and extract its links; runs inline or in an analysis process
+    
+    Args:
+        body: Response bytes as read (decoded here, in the worker) or an already decoded body
+        encoding: Charset of body bytes (UTF-8 when missing or unknown)
+    """
+    start = time.thread_time()
+    text = body.decode(decodable_charset(encoding), errors='replace') if isinstance(body, bytes) else body
+    references = analyzer.references(text, page_url)
+    title_match = TITLE_RE.search(text)
+    return PageAnalysis(
+        links=links_of(references, analyzer.kinds),
+        followed=links_of(references, CRAWL_REFERENCE_KINDS),
+        title=title_match.group(1).strip() if title_match else None,
+        cpu_seconds=time.thread_time() - start,
+    )
+
+class RedirectCache:
+    """
+    Results of redirect hops and targets checked during this run
+    
+    Links that redirect into an already checked URL (old handles, http->https,
+    www) reuse its result instead of fetching and analysing it again.
+    """
+    def __init__(self, store_host: Optional[str] = None):
+        self.store_host = store_host
+        self._results: Dict[str, LinkCheck] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, url: str) -> Optional[LinkCheck]:
+        with self._lock:
+            return self._results.get(canonicalize_url(url, store_host=self.store_host))
+    
+    def remember(self, check: LinkCheck):
+        """Record a link's result for the link itself and for every hop of its redirect chain"""
+        chain = check.redirect_chain
+        with self._lock:
+            self._results[canonicalize_url(check.url, store_host=self.store_host)] = check
+            for i, hop in enumerate(chain):
+                self._results[canonicalize_url(hop, store_host=self.store_host)] = replace(check, url=hop, redirect_chain=chain[i + 1:])
+
+class FairScheduler:
+    """
+    Worker threads shared by several stores, taking work round-robin from their lanes
+    
+    Each fan-out (page probes, link checks, crawl fetches) submits to its own
+    SchedulerLane. Workers take one task from the next lane with work in turn,
+    so a store with 10,000 links to check can't starve one with 50; when
+    only one store has work, it gets every worker.
+    """
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max(1, max_workers)
+        self._ready: deque = deque()  # Lanes with queued tasks, in turn order
+        self.lock = threading.Lock()
+        self._work_ready = threading.Condition(self.lock)
+        self._threads = [threading.Thread(target=self._work, daemon=True, name=f"scheduler-{i}")
+                         for i in range(self.max_workers)]
+        for thread in self._threads:
+            thread.start()
+    
+    def lane(self) -> 'SchedulerLane':
+        return SchedulerLane(self)
+    
+    def _enqueue(self, lane: 'SchedulerLane'):
+        """Put a lane that just received work in the rotation (lock must be held)"""
+        if not lane.queued:
+            self._ready.append(lane)
+        self._work_ready.notify()
+    
+    def _work(self):
+        while True:
+            with self.lock:
+                while not self._ready:
+                    self._work_ready.wait()
+                lane = self._ready.popleft()
+                future, fn, args, kwargs = lane.pending.popleft()
+                lane.queued = bool(lane.pending)
+                if lane.queued:
+                    self._ready.append(lane)  # Back of the line until the other lanes had a turn
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            lane.task_done()
+
+class SchedulerLane(Executor):
+    """One fan-out's share of a FairScheduler, usable wherever a ThreadPoolExecutor is"""
+    def __init__(self, scheduler: FairScheduler):
+        self.scheduler = scheduler
+        self.pending: deque = deque()
+        self.queued = False
+        self._outstanding = 0
+        self._shutdown = False
+        self._idle = threading.Condition(scheduler.lock)
+    
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        with self.scheduler.lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self.pending.append((future, fn, args, kwargs))
+            self._outstanding += 1
+            self.scheduler._enqueue(self)
+            self.queued = True
+        return future
+    
+    def task_done(self):
+        with self.scheduler.lock:
+            self._outstanding -= 1
+            if not self._outstanding:
+                self._idle.notify_all()
+    
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self.scheduler.lock:
+            self._shutdown = True
+            if cancel_futures:
+                # Cancelled tasks are skipped when a worker reaches them
+                for future, *_ in self.pending:
+                    future.cancel()
+            if wait:
+                while self._outstanding:
+                    self._idle.wait()
+
+class HostLimiter:
+    """Cap concurrent requests per host, with a separate limit for the store's own domain"""
+    def __init__(self, store_domain: str, store_limit: int, external_limit: int):
+        self.store_domain = store_domain.lower()
+        self.store_limit = max(1, store_limit)
+        self.external_limit = max(1, external_limit)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+    
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                limit = self.store_limit if host == self.store_domain else self.external_limit
+                semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[host] = semaphore
+            return semaphore
+    
+    @contextmanager
+    def slot(self, url: str):
+        """Hold one of the URL host's concurrency slots for the duration of the block"""
+        semaphore = self._semaphore(urlparse(url).netloc.lower())
+        with semaphore:
+            yield
+
+class HostRateLimiter:
+    """
+    Per-host token buckets, plus host-wide pauses after 429/503 responses
+    
+    A rate of 0 means no limit for that host class; pauses still apply.
+    """
+    def __init__(self, store_domain: str, store_rate: float = 0, external_rate: float = 0, burst: float = 1):
+        self.store_domain = store_domain.lower()
+        self.store_rate = max(0.0, store_rate)
+        self.external_rate = max(0.0, external_rate)
+        # A burst of 1 spaces requests evenly instead of sending a volley after every idle spell
+        self.burst = max(1.0, burst)
+        self._hosts: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    def _state(self, host: str, now: float) -> Dict[str, float]:
+        """Bucket for a host (lock must be held)"""
+        state = self._hosts.get(host)
+        if state is None:
+            rate = self.store_rate if host == self.store_domain else self.external_rate
+            state = self._hosts[host] = {'rate': rate, 'tokens': self.burst, 'updated': now, 'paused_until': 0.0}
+        return state
+    
+    def wait(self, url: str):
+        """Block until the URL's host may receive another request"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(host, now)
+            delay = max(0.0, state['paused_until'] - now)
+            rate = state['rate']
+            if rate:
+                # Reserve a token now; a negative balance is the queue ahead of us
+                state['tokens'] = min(self.burst, state['tokens'] + (now - state['updated']) * rate) - 1
+                state['updated'] = now
+                if state['tokens'] < 0:
+                    delay = max(delay, -state['tokens'] / rate)
+        if delay:
+            time.sleep(delay)
+    
+    def pause(self, url: str, seconds: float):
+        """Hold back every request to the URL's host for the given time"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(host, now)
+            state['paused_until'] = max(state['paused_until'], now + seconds)
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set for crawl deduplication
+    
+    Memory depends only on capacity and error rate, never on how many URLs are
+    added. A false positive means a URL is wrongly treated as already seen.
+    """
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+    
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8', 'replace'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+    
+    def add(self, item: str) -> bool:
+        """Add an item; returns False if it was (probably) already present"""
+        added = False
+        with self._lock:
+            for position in self._positions(item):
+                byte, bit = divmod(position, 8)
+                if not self._bits[byte] & (1 << bit):
+                    self._bits[byte] |= 1 << bit
+                    added = True
+        return added
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position // 8] & (1 << (position % 8)) for position in self._positions(item))
 
 class ShopifyPageChecker:
     """Main checker class"""
     
-    def __init__(self, store_url: str, access_token: Optional[str] = None):
+    def __init__(self, store_url: str, access_token: Optional[str] = None,
+                 max_workers: int = 16, per_host_limit: int = 4, store_host_limit: int = 8,
+                 check_mode: str = 'stream', max_content_bytes: int = 1024 * 1024,
+                 pool_size: Optional[int] = None, retries: int = 2,
+                 cache_path: Optional[str] = None, cache_ttl: float = 7 * 86400,
+                 cache_max_entries: int = 50000, excluded_domains: Optional[List[str]] = None,
+                 metadata_only: bool = False, max_throttle_retries: int = 5,
+                 admin_api_url: Optional[str] = None, state_path: Optional[str] = None,
+                 db_path: Optional[str] = None, result_sink: Optional[ResultSink] = None,
+                 store_rate: float = 0, host_rate: float = 0, soft_404: bool = True,
+                 session: Optional[requests.Session] = None, scheduler: Optional[FairScheduler] = None,
+                 reference_kinds: Iterable[str] = DEFAULT_REFERENCE_KINDS, analysis_processes: int = 0,
+                 analysis_pool: Optional[Executor] = None, logger: Optional[Callable[[str], None]] = None):
         """
         Initialize the checker
         
         Args:
             store_url: Shopify store URL (e.g., https://mystore.myshopify.com or https://mystore.com)
             access_token: Optional Admin API access token for full page details
+            max_workers: Total number of links checked concurrently
+            per_host_limit: Concurrent checks allowed against any single external host
+            store_host_limit: Concurrent checks allowed against the store's own domain
+            check_mode: 'stream' makes one streamed GET per link; 'head-get' sends a HEAD
+                        and then a full GET for every 200
+            max_content_bytes: Maximum body bytes read per link for the content check
+            pool_size: Keep-alive connections per host (defaults to the larger host limit)
+            retries: Retries for connection errors and transient 500/502/504 responses
+            cache_path: Optional JSON file for persisting link check results between runs
+            cache_ttl: Seconds a cached result is reused before it is revalidated
+            cache_max_entries: Maximum number of cached results kept on disk
+            excluded_domains: Exclusion entries (domains, 'scheme:' or '#'); defaults to DEFAULT_EXCLUDED_DOMAINS
+            metadata_only: List pages without their bodies and fetch each body only when links are extracted
+            max_throttle_retries: Retries for rate-limited requests (429/503, THROTTLED), with backoff
+            admin_api_url: Admin API base URL override (e.g. a local stand-in server)
+            state_path: Optional JSON file of page fingerprints for incremental re-scans;
+                        also enables the link cache (next to it) when cache_path is not set
+            db_path: Optional SQLite file that holds pages, links and results instead of memory
+            result_sink: Optional sink that receives every page and link check as it finishes
+            store_rate: Requests per second to the store's own domain (0 = unlimited)
+            host_rate: Requests per second to any single external host (0 = unlimited)
+            soft_404: Compare store pages against fingerprints of the store's 404 page and empty cart
+            session: Optional session to send requests through (shared by batch runs; not closed by close())
+            scheduler: Optional FairScheduler whose workers run this checker's concurrent work
+            reference_kinds: Kinds of page references checked as links (see REFERENCE_KINDS);
+                             the default is anchors and bare URLs
+            analysis_processes: Worker processes for link extraction (0 = in the calling thread);
+                                the size of analysis_pool when one is given
+            analysis_pool: Optional process pool for link extraction (shared by batch runs; not shut down by close())
+            logger: Optional callable receiving each line of progress and report output
+                    (e.g. logging.getLogger(...).info) instead of stdout
         """
+        self.logger = logger
+        self._cancelled = threading.Event()
+        
         # Normalize store URL
         parsed = urlparse(store_url)
         if 'myshopify.com' in parsed.netloc:
@@ -85,74 +2030,418 @@ class ShopifyPageChecker:
         
         self.base_url = f"{parsed.scheme}://{parsed.netloc}"
         self.storefront_api_url = f"{self.base_url}/api/2024-01/graphql.json"
-        self.admin_api_url = f"https://{self.store_name}.myshopify.com/admin/api/2024-01" if self.store_name else None
+        if admin_api_url:
+            self.admin_api_url = admin_api_url.rstrip('/')
+        else:
+            # The Admin GraphQL pages query needs 2024-10 or later
+            self.admin_api_url = f"https://{self.store_name}.myshopify.com/admin/api/2024-10" if self.store_name else None
         self.access_token = access_token
         
-        self.pages: List[Page] = []
-        self.all_links: Set[str] = set()
-        self.link_checks: List[LinkCheck] = []
+        # Results live in memory, or in SQLite (one run per invocation) when db_path is given
+        self.store = ResultStore(db_path, self.base_url) if db_path else None
+        if self.store is not None:
+            self.pages = StoredPages(self.store)
+            self.all_links = StoredLinks(self.store)
+            self.link_checks = StoredLinkChecks(self.store)
+        else:
+            self.pages: List[Page] = []
+            self.all_links: Set[str] = set()
+            self.link_checks: List[LinkCheck] = []
+        
+        self.sink = result_sink
+        if self.sink is not None:
+            self.sink.start(self.base_url)
+        
+        # Link-check concurrency
+        self.max_workers = max(1, max_workers)
+        self.host_limiter = HostLimiter(self.store_domain, store_host_limit, per_host_limit)
+        self.rate_limiter = HostRateLimiter(self.store_domain, store_rate, host_rate)
+        self.redirects = RedirectCache(parsed.hostname)
+        
+        if check_mode not in ('stream', 'head-get'):
+            raise ValueError(f"Unknown check mode: {check_mode}")
+        self.check_mode = check_mode
+        self.max_content_bytes = max_content_bytes
+        self.stats = RunStats()
+        
+        # Fingerprints of the store's 404 page and empty cart, fetched on first use
+        self.soft_404 = soft_404
+        self.reference_kinds = frozenset(reference_kinds)
+        self._soft_404_baselines: Optional[Dict[str, PageFingerprint]] = None
+        self._baseline_lock = threading.Lock()
+        
+        # One pooled session for every request (sitemap, Storefront API, pages, links)
+        self._owns_session = session is None
+        self.session = session or build_session(
+            pool_size=pool_size or max(store_host_limit, per_host_limit),
+            retries=retries,
+        )
+        self.scheduler = scheduler
+        
+        # Storefront API pacing follows the cost budget reported with each response
+        self.throttle = QueryCostThrottle()
+        self.max_throttle_retries = max(0, max_throttle_retries)
+        self.metadata_only = metadata_only
+        
+        # Incremental runs skip unchanged pages and need prior link results to merge in
+        self.state = ScanState(state_path, log=self.log) if state_path else None
+        if self.state is not None and not cache_path:
+            cache_path = f"{os.path.splitext(state_path)[0]}.links.json"
+        
+        self.cache = LinkCheckCache(cache_path, cache_ttl, cache_max_entries, log=self.log) if cache_path else None
         
         # Domains to exclude (common external services)
-        self.excluded_domains = [
-            'google.com', 'googleapis.com', 'gstatic.com', 'googleusercontent.com',
-            'shopify.com', 'shopifycdn.com', 'myshopify.com',
-            'facebook.com', 'fb.com', 'facebook.net',
-            'instagram.com',
-            'twitter.com', 'x.com',
-            'youtube.com', 'youtu.be',
-            'pinterest.com',
-            'linkedin.com',
-            'tiktok.com',
-            'snapchat.com',
-            'whatsapp.com',
-            'mailto:', 'tel:',
-            'javascript:', '#',
-        ]
+        self.excluded_domains = list(excluded_domains) if excluded_domains is not None else list(DEFAULT_EXCLUDED_DOMAINS)
+        self.exclusions = ExclusionFilter(self.excluded_domains, allowed_hosts=[parsed.hostname or ''])
+        self.analyzer = PageAnalyzer(self.base_url, self.exclusions, self.reference_kinds)
+        
+        # Link extraction is pure Python, so with worker processes it runs outside the GIL
+        # of the fetching threads; started on first use
+        self._owns_analysis_pool = analysis_pool is None
+        self._analysis_pool = analysis_pool
+        self.analysis_processes = max(0, analysis_processes)
+        self.analysis_queue = max(1, self.analysis_processes * ANALYSIS_QUEUE_PER_PROCESS)
+        
+        # Crawl mode (crawl_site) stays on the store's own host
+        self.store_hostname = (parsed.hostname or '').lower()
+        self.max_crawl_bytes = 5 * 1024 * 1024
+    
+    def close(self):
+        """Close pooled connections and persist the link cache and result store"""
+        if self.cache is not None:
+            self.cache.save()
+        if self.store is not None:
+            self.store.close()
+        if self.sink is not None:
+            self.sink.close()
+        if self._owns_session:
+            self.session.close()
+        if self._owns_analysis_pool and self._analysis_pool is not None:
+            self._analysis_pool.shutdown()
+            self._analysis_pool = None
+    
+    def _executor(self) -> Executor:
+        """Workers for one fan-out: a lane of the shared scheduler, or a private thread pool"""
+        if self.scheduler is not None:
+            return self.scheduler.lane()
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+    
+    @contextmanager
+    def _fan_out(self) -> Iterator[Executor]:
+        """
+        Workers for one streamed fan-out, shut down when the block ends
+        
+        A block that runs to the end has consumed every future. One that ends
+        early (budget, cancel(), a closed generator) drops the queued work and
+        doesn't wait for checks still running.
+        """
+        executor = self._executor()
+        try:
+            yield executor
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def log(self, message: str = '', end: str = '\n'):
+        """Progress and report output: printed, or passed line by line to the logger (progress updates skipped)"""
+        if self.logger is None:
+            print(message, end=end)
+        elif end == '\n' and message.strip():
+            self.logger(message.strip('\n'))
+    
+    def cancel(self):
+        """Stop the run from any thread: iterators end after the current result and queued work is dropped"""
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+    
+    def _should_stop(self, deadline: Optional[float] = None) -> bool:
+        return self._cancelled.is_set() or (deadline is not None and time.monotonic() >= deadline)
+    
+    def run(self, max_links: Optional[int] = 100, max_seconds: Optional[float] = None, crawl: bool = False,
+            crawl_depth: int = 3, crawl_pages: int = 5000) -> Iterator[Union[Page, LinkCheck]]:
+        """
+        Find the store's pages and check their links, yielding each Page and LinkCheck as it is produced
+        
+        The library counterpart of main(): nothing is asked, and results reach
+        the caller (and the result sink) while the run goes on. Pages come
+        first, then link checks in completion order. Stop early by leaving the
+        loop, calling cancel() from another thread, or with the budgets; the
+        results so far are kept in pages/link_checks for generate_report().
+        
+        Args:
+            max_links: Maximum number of links checked (None = every extracted link)
+            max_seconds: Wall-clock budget for the whole run (None = unlimited)
+            crawl: Crawl the storefront from the home page instead of listing /pages/
+            crawl_depth: Link hops followed when crawling
+            crawl_pages: Maximum URLs fetched when crawling
+        """
+        deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+        if crawl:
+            yield from self.iter_crawl_pages(crawl_depth, crawl_pages, deadline=deadline)
+        else:
+            yield from self.iter_pages(deadline)
+        if not self._should_stop(deadline):
+            yield from self.iter_link_checks(len(self.all_links) if max_links is None else max_links, deadline)
+    
+    async def arun(self, **kwargs) -> AsyncIterator[Union[Page, LinkCheck]]:
+        """
+        run() as an async iterator, for event-loop services
+        
+        The run advances in the loop's default executor. Cancelling the
+        consuming task cancels the run. Leaving an async for loop early only
+        closes the run once the event loop finalizes the generator; iterate
+        inside contextlib.aclosing() (or await aclose()) to close it - and fill
+        link_checks - as soon as the loop exits. Takes the same keyword
+        arguments as run().
+        """
+        loop = asyncio.get_running_loop()
+        results = self.run(**kwargs)
+        finished = object()
+        step = None
+        try:
+            while True:
+                step = loop.run_in_executor(None, next, results, finished)
+                item = await asyncio.shield(step)  # Cancelling the task must not abandon a running step
+                if item is finished:
+                    return
+                yield item
+        finally:
+            if step is not None and not step.done():
+                # The run can only be closed once the step in progress has returned
+                self.cancel()
+                await asyncio.wait([step])
+            results.close()
+    
+    def _submit_analysis(self, body: Union[bytes, str], encoding: Optional[str] = None,
+                         page_url: Optional[str] = None) -> Future:
+        """Queue a document for link extraction; without analysis processes it is analysed right away"""
+        if self._analysis_pool is None and self.analysis_processes:
+            # Spawned, not forked: this process already runs request threads
+            self._analysis_pool = ProcessPoolExecutor(max_workers=self.analysis_processes,
+                                                      mp_context=multiprocessing.get_context('spawn'))
+        if self._analysis_pool is not None:
+            return self._analysis_pool.submit(analyze_document, self.analyzer, body, encoding, page_url)
+        future = Future()
+        future.set_result(analyze_document(self.analyzer, body, encoding, page_url))
+        return future
+    
+    def _analysis_result(self, future: Future) -> PageAnalysis:
+        analysis = future.result()
+        self.stats.add_cpu('link_extraction', analysis.cpu_seconds)
+        return analysis
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    @classmethod
+    def from_results(cls, path: str, **kwargs) -> 'ShopifyPageChecker':
+        """
+        Rebuild a checker's pages, links and link checks from a result stream
+        
+        Nothing is fetched or re-checked, so generate_report() can be run on the
+        output of an earlier (possibly interrupted) run.
+        """
+        records = read_results(path)
+        header = next(records, None)
+        if header is None or header.get('type') != 'run':
+            raise ValueError(f"{path} is not a page checker result stream")
+        
+        checker = cls(header['store_url'], **kwargs)
+        page_fields = [f.name for f in fields(Page)]
+        check_fields = [f.name for f in fields(LinkCheck)]
+        for record in records:
+            if record.get('type') == 'page':
+                page = Page(**{name: record.get(name) for name in page_fields})
+                checker.pages.append(page)
+                checker.all_links.update(page.links)
+            elif record.get('type') == 'link_check':
+                check = LinkCheck(**{name: record.get(name) for name in check_fields})
+                check.redirect_chain = check.redirect_chain or []  # Streams written before chains were recorded
+                checker.link_checks.append(check)
+        return checker
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session, paced by the host's rate limit
+        
+        429 and 503 responses are retried after Retry-After or a jittered
+        exponential backoff, and the whole host is paused for that long so
+        other workers don't keep hitting it.
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.wait(url)
+            response = self.session.request(method, url, **kwargs)
+            self.stats.record_request(url, response.elapsed.total_seconds(), response)
+            if (response.status_code not in RETRY_STATUSES or attempt >= self.max_throttle_retries
+                    or self._cancelled.is_set()):
+                return response
+            
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                return response
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            response.close()
+            self.stats.add('throttled')
+            self.rate_limiter.pause(url, delay)
+            attempt += 1
+    
+    def _fetch_sitemap(self, sitemap_url: str) -> Tuple[List[str], List[Tuple[str, Optional[str]]]]:
+        """
+        Stream-parse one sitemap file (plain or gzipped)
+        
+        Returns:
+            (child sitemap URLs, [(page URL, lastmod)]) - a sitemap index only has children
+        """
+        children = []
+        urls = []
+        try:
+            with self._request('GET', sitemap_url, timeout=30, stream=True) as response:
+                if response.status_code != 200:
+                    return children, urls
+                
+                response.raw.decode_content = True
+                response.raw.auto_close = False  # let the buffered reader see EOF instead of a closed file
+                stream = io.BufferedReader(response.raw, buffer_size=65536)
+                if stream.peek(2)[:2] == b'\x1f\x8b':  # .xml.gz served as a file
+                    stream = gzip.GzipFile(fileobj=stream)
+                
+                root = None
+                entry: Dict[str, Optional[str]] = {}
+                for event, elem in ET.iterparse(stream, events=('start', 'end')):
+                    tag = elem.tag.rsplit('}', 1)[-1]
+                    if event == 'start':
+                        if root is None:
+                            root = elem
+                        continue
+                    if tag in ('loc', 'lastmod'):
+                        entry[tag] = (elem.text or '').strip()
+                    elif tag in ('url', 'sitemap'):
+                        if entry.get('loc'):
+                            if tag == 'sitemap':
+                                children.append(entry['loc'])
+                            else:
+                                urls.append((entry['loc'], entry.get('lastmod')))
+                        entry = {}
+                        # Finished entries are dropped so memory stays flat on 50k-URL files
+                        root.clear()
+        except Exception as e:
+            self.log(f"⚠️  Could not parse sitemap {sitemap_url}: {e}")
+        return children, urls
+    
+    def iter_sitemap_urls(self, sitemap_url: str, max_depth: int = 3,
+                          follow: Optional[Callable[[str], bool]] = None) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Yield (URL, lastmod) from a sitemap, recursing into sitemap indexes
+        
+        Child sitemaps are fetched concurrently and their URLs are yielded as
+        each child finishes.
+        
+        Args:
+            sitemap_url: Sitemap or sitemap index URL
+            max_depth: How many levels of nested indexes to follow
+            follow: Optional filter deciding which child sitemaps to fetch
+        """
+        seen = {sitemap_url}
+        executor = self._executor()
+        try:
+            pending = {executor.submit(self._fetch_sitemap, sitemap_url): 0}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = pending.pop(future)
+                    children, urls = future.result()
+                    for child in children:
+                        if depth < max_depth and child not in seen and (follow is None or follow(child)):
+                            seen.add(child)
+                            pending[executor.submit(self._fetch_sitemap, child)] = depth + 1
+                    yield from urls
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def iter_sitemap_pages(self) -> Iterator[Dict]:
+        """Stream page records for /pages/ URLs found in the store's sitemap"""
+        # Shopify indexes list sitemap_products_1.xml, sitemap_blogs_1.xml, ...; only pages matter here
+        def follow(child_url: str) -> bool:
+            kind = re.search(r'/sitemap_([a-z]+)_\d+\.xml', child_url)
+            return kind is None or kind.group(1) == 'pages'
+        
+        seen_handles = set()
+        for sitemap_url in (f"{self.base_url}/sitemap.xml", f"{self.base_url}/sitemap_pages.xml"):
+            self.log(f"🔍 Trying sitemap: {sitemap_url}")
+            for url, lastmod in self.iter_sitemap_urls(sitemap_url, follow=follow):
+                # Check if it's a page URL
+                if '/pages/' not in url:
+                    continue
+                handle = url.split('/pages/')[-1].split('?')[0].rstrip('/')
+                if handle and handle not in seen_handles:
+                    seen_handles.add(handle)
+                    yield {
+                        'id': f"page_{handle}",
+                        'title': handle.replace('-', ' ').title(),
+                        'handle': handle,
+                        'published': True,
+                        'publishedAt': None,
+                        'updatedAt': lastmod,
+                        'body': '',
+                        'bodySummary': ''
+                    }
+            if seen_handles:
+                return
     
     def get_pages_from_sitemap(self) -> List[Dict]:
-        """Try to get pages from sitemap.xml"""
-        pages = []
-        sitemap_urls = [
-            f"{self.base_url}/sitemap.xml",
-            f"{self.base_url}/sitemap_pages.xml",
-        ]
+        """Try to get pages from sitemap.xml (following sitemap indexes)"""
+        pages = list(self.iter_sitemap_pages())
+        if pages:
+            self.log(f"✅ Found {len(pages)} pages in sitemap")
+        return pages
+    
+    def _storefront_query(self, query: str, variables: Dict) -> Dict:
+        """
+        POST a Storefront API query, pacing it against the reported cost budget
         
-        for sitemap_url in sitemap_urls:
+        Requests also wait for the store's rate limit (--store-rate). 429
+        responses and THROTTLED errors are retried after Retry-After (or the
+        time the budget needs to restore), pausing the store's other requests
+        for as long; other HTTP errors are raised.
+        """
+        for attempt in range(self.max_throttle_retries + 1):
+            self.throttle.spend()
+            self.rate_limiter.wait(self.storefront_api_url)
             try:
-                print(f"🔍 Trying sitemap: {sitemap_url}")
-                response = requests.get(sitemap_url, timeout=10)
-                if response.status_code == 200:
-                    # Parse XML sitemap
-                    import xml.etree.ElementTree as ET
-                    root = ET.fromstring(response.content)
-                    
-                    # Handle different sitemap formats
-                    for url_elem in root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url'):
-                        loc_elem = url_elem.find('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                        if loc_elem is not None:
-                            url = loc_elem.text
-                            # Check if it's a page URL
-                            if '/pages/' in url:
-                                handle = url.split('/pages/')[-1].rstrip('/')
-                                if handle:
-                                    pages.append({
-                                        'id': f"page_{handle}",
-                                        'title': handle.replace('-', ' ').title(),
-                                        'handle': handle,
-                                        'published': True,
-                                        'publishedAt': None,
-                                        'body': '',
-                                        'bodySummary': ''
-                                    })
-                    
-                    if pages:
-                        print(f"✅ Found {len(pages)} pages in sitemap")
-                        break
-            except Exception as e:
-                print(f"⚠️  Could not parse sitemap: {e}")
+                response = self.session.post(
+                    self.storefront_api_url,
+                    json={"query": query, "variables": variables},
+                    headers={"Content-Type": "application/json"},
+                    timeout=30
+                )
+            except requests.exceptions.RequestException:
+                self.throttle.update({})
+                raise
+            self.stats.record_request(self.storefront_api_url, response.elapsed.total_seconds(), response)
+            if response.status_code != 200:
+                self.throttle.update({})
+            if response.status_code in RETRY_STATUSES and attempt < self.max_throttle_retries:
+                self.stats.add('throttled')
+                self.rate_limiter.pause(self.storefront_api_url, self.throttle.backoff(response, attempt))
                 continue
-        
-        return pages
+            response.raise_for_status()
+            data = response.json()
+            self.throttle.update(data)
+            
+            throttled = any((error.get('extensions') or {}).get('code') == 'THROTTLED'
+                            for error in data.get('errors') or [])
+            if throttled and attempt < self.max_throttle_retries:
+                self.stats.add('throttled')
+                self.rate_limiter.pause(self.storefront_api_url, self.throttle.backoff(None, attempt))
+                continue
+            return data
+        return data
     
     def get_pages_from_storefront_api(self) -> List[Dict]:
         """Fetch pages using Storefront API (public, no auth needed)"""
@@ -160,6 +2449,10 @@ class ShopifyPageChecker:
         cursor = None
         has_next_page = True
         
+        # Metadata-only runs leave body out and fetch it per page later (see fetch_page_body)
+        content_fields = "" if self.metadata_only else """
+                body
+                bodySummary"""
         query = """
         query getPages($cursor: String) {
           pages(first: 250, after: $cursor) {
@@ -171,31 +2464,23 @@ class ShopifyPageChecker:
               node {
                 id
                 title
-                handle
-                body
-                bodySummary
+                handle%s
                 publishedAt
+                updatedAt
               }
             }
           }
         }
-        """
+        """ % content_fields
         
         while has_next_page:
             variables = {"cursor": cursor} if cursor else {}
             
             try:
-                response = requests.post(
-                    self.storefront_api_url,
-                    json={"query": query, "variables": variables},
-                    headers={"Content-Type": "application/json"},
-                    timeout=30
-                )
-                response.raise_for_status()
-                data = response.json()
+                data = self._storefront_query(query, variables)
                 
                 if 'errors' in data:
-                    print(f"⚠️  GraphQL Error: {data['errors']}")
+                    self.log(f"⚠️  GraphQL Error: {data['errors']}")
                     break
                 
                 pages_data = data.get('data', {}).get('pages', {})
@@ -207,310 +2492,345 @@ class ShopifyPageChecker:
                         'id': node['id'],
                         'title': node['title'],
                         'handle': node['handle'],
-                        'published': node.get('publishedAt') is not None,
+                        'published': node.get('publishedAt') is not None,
+                        'publishedAt': node.get('publishedAt'),
+                        'updatedAt': node.get('updatedAt'),
+                        # None marks a body that has not been fetched yet
+                        'body': None if self.metadata_only else node.get('body', ''),
+                        'bodySummary': None if self.metadata_only else node.get('bodySummary', '')
+                    })
+                
+                page_info = pages_data.get('pageInfo', {})
+                has_next_page = page_info.get('hasNextPage', False)
+                cursor = page_info.get('endCursor')
+                
+                self.log(f"📄 Fetched {len(pages)} pages so far...")
+                
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code == 403:
+                    self.log(f"⚠️  Storefront API access forbidden (403). Trying alternative methods...")
+                    return []  # Return empty to try alternatives
+                else:
+                    self.log(f"❌ Error fetching pages: {e}")
+                    return []
+            except requests.exceptions.RequestException as e:
+                self.log(f"⚠️  Error with Storefront API: {e}")
+                return []
+        
+        return pages
+    
+    def fetch_page_body(self, page_handle: str) -> str:
+        """Fetch one page's body through the Storefront API (used by metadata-only runs)"""
+        query = """
+        query getPageBody($handle: String!) {
+          page(handle: $handle) {
+            body
+          }
+        }
+        """
+        try:
+            with self.host_limiter.slot(self.storefront_api_url):
+                data = self._storefront_query(query, {"handle": page_handle})
+        except requests.exceptions.RequestException as e:
+            self.log(f"⚠️  Could not fetch body for {page_handle}: {e}")
+            return ''
+        page = (data.get('data') or {}).get('page') or {}
+        return page.get('body') or ''
+    
+    @staticmethod
+    def _needs_body(page_data: Dict) -> bool:
+        """True when a page record's body was left out and links still have to be extracted from it"""
+        return page_data.get('body') is None and bool(page_data.get('handle'))
+    
+    def _admin_query(self, query: str, variables: Optional[Dict] = None) -> Dict:
+        """POST an Admin GraphQL query authenticated with the access token, paced by the host's rate limit"""
+        self.rate_limiter.wait(self.admin_api_url)
+        response = self.session.post(
+            f"{self.admin_api_url}/graphql.json",
+            json={"query": query, "variables": variables or {}},
+            headers={"Content-Type": "application/json", "X-Shopify-Access-Token": self.access_token},
+            timeout=30
+        )
+        self.stats.record_request(self.admin_api_url, response.elapsed.total_seconds(), response)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('errors'):
+            raise RuntimeError(f"GraphQL Error: {data['errors']}")
+        return data.get('data') or {}
+    
+    def run_bulk_operation(self, bulk_query: str, poll_interval: float = 2.0,
+                           timeout: float = 1800) -> Optional[str]:
+        """
+        Start an Admin API bulk query and wait for it to finish
+        
+        Args:
+            bulk_query: Query to run (connections are flattened to JSONL by Shopify)
+            poll_interval: Seconds between status polls (grows up to 15s on long operations)
+            timeout: Seconds to wait before giving up
+            
+        Returns:
+            URL of the JSONL result, or None if the operation failed or returned nothing
+        """
+        mutation = """
+        mutation runBulk($query: String!) {
+          bulkOperationRunQuery(query: $query) {
+            bulkOperation { id status }
+            userErrors { field message }
+          }
+        }
+        """
+        result = self._admin_query(mutation, {"query": bulk_query})['bulkOperationRunQuery']
+        if result.get('userErrors'):
+            self.log(f"⚠️  Bulk operation rejected: {result['userErrors']}")
+            return None
+        operation_id = result['bulkOperation']['id']
+        
+        status_query = """
+        query {
+          currentBulkOperation { id status errorCode objectCount url }
+        }
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            operation = self._admin_query(status_query).get('currentBulkOperation') or {}
+            if operation.get('id') != operation_id:
+                self.log(f"⚠️  Bulk operation {operation_id} is no longer the current operation")
+                return None
+            status = operation.get('status')
+            if status == 'COMPLETED':
+                self.log(f"✅ Bulk operation finished ({operation.get('objectCount')} objects)")
+                return operation.get('url')  # None when the query matched nothing
+            if status in ('FAILED', 'CANCELED', 'EXPIRED'):
+                self.log(f"⚠️  Bulk operation {status.lower()}: {operation.get('errorCode')}")
+                return None
+            self.log(f"⏳ Bulk operation {status.lower()}: {operation.get('objectCount')} objects so far...", end='\r')
+            poll_interval = min(poll_interval * 1.5, 15)
+        self.log(f"⚠️  Bulk operation timed out after {timeout:.0f}s")
+        return None
+    
+    def iter_bulk_results(self, result_url: str) -> Iterator[Dict]:
+        """Stream a bulk operation's JSONL result one object at a time"""
+        # The result URL is pre-signed; the access token must not be sent to it
+        self.rate_limiter.wait(result_url)
+        with self.session.get(result_url, timeout=60, stream=True) as response:
+            self.stats.record_request(result_url, response.elapsed.total_seconds(), response)
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    
+    def get_pages_from_admin_bulk(self) -> List[Dict]:
+        """Fetch every page (published or not) with an Admin API bulk operation"""
+        bulk_query = """
+        {
+          pages {
+            edges {
+              node {
+                id
+                title
+                handle
+                body
+                bodySummary
+                isPublished
+                publishedAt
+                updatedAt
+              }
+            }
+          }
+        }
+        """
+        self.log("🔍 Running Admin API bulk operation for pages...")
+        pages = []
+        try:
+            result_url = self.run_bulk_operation(bulk_query)
+            if result_url:
+                for node in self.iter_bulk_results(result_url):
+                    if '__parentId' in node:
+                        continue  # Nested connection rows; pages have none
+                    pages.append({
+                        'id': node['id'],
+                        'title': node['title'],
+                        'handle': node['handle'],
+                        'published': node.get('isPublished', node.get('publishedAt') is not None),
                         'publishedAt': node.get('publishedAt'),
-                        'body': node.get('body', ''),
-                        'bodySummary': node.get('bodySummary', '')
+                        'updatedAt': node.get('updatedAt'),
+                        'body': node.get('body') or '',
+                        'bodySummary': node.get('bodySummary') or ''
                     })
-                
-                page_info = pages_data.get('pageInfo', {})
-                has_next_page = page_info.get('hasNextPage', False)
-                cursor = page_info.get('endCursor')
-                
-                print(f"📄 Fetched {len(pages)} pages so far...")
-                time.sleep(0.5)  # Rate limiting
-                
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 403:
-                    print(f"⚠️  Storefront API access forbidden (403). Trying alternative methods...")
-                    return []  # Return empty to try alternatives
-                else:
-                    print(f"❌ Error fetching pages: {e}")
-                    return []
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️  Error with Storefront API: {e}")
-                return []
+        except (requests.exceptions.RequestException, RuntimeError, KeyError, ValueError) as e:
+            self.log(f"⚠️  Admin API bulk operation failed: {e}")
+            return []
         
+        if pages:
+            self.log(f"✅ Fetched {len(pages)} pages from the Admin API")
         return pages
     
     def scrape_page_content(self, page_handle: str) -> str:
         """Scrape page content directly from the store"""
         page_url = f"{self.base_url}/pages/{page_handle}"
         try:
-            response = requests.get(page_url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (compatible; ShopifyChecker/1.0)'
-            })
+            response = self._request('GET', page_url, timeout=10)
             if response.status_code == 200:
                 return response.text
         except:
             pass
         return ""
     
+    @timed_phase('get_storefront_pages')
     def get_storefront_pages(self) -> List[Dict]:
         """Try multiple methods to get pages"""
-        print("🔍 Attempting to fetch pages...")
+        self.log("🔍 Attempting to fetch pages...")
+        
+        # Method 1: Admin API bulk operation (needs an access token)
+        if self.access_token and self.admin_api_url:
+            pages = self.get_pages_from_admin_bulk()
+            if pages:
+                return pages
         
-        # Method 1: Try Storefront API
+        # Method 2: Try Storefront API
         pages = self.get_pages_from_storefront_api()
         if pages:
             return pages
         
-        # Method 2: Try sitemap
-        print("🔍 Storefront API not available. Trying sitemap...")
+        # Method 3: Try sitemap
+        self.log("🔍 Storefront API not available. Trying sitemap...")
         pages = self.get_pages_from_sitemap()
         if pages:
             return pages
         
-        # Method 3: Try common page handles
-        print("🔍 Trying common page handles...")
+        # Method 4: Try common page handles
+        self.log("🔍 Trying common page handles...")
         common_handles = ['about', 'about-us', 'contact', 'privacy-policy', 'terms-of-service', 
                          'shipping', 'returns', 'faq', 'help', 'blog']
         
         found_pages = []
-        for handle in common_handles:
-            page_url = f"{self.base_url}/pages/{handle}"
-            try:
-                response = requests.head(page_url, timeout=5, allow_redirects=True)
-                if response.status_code == 200:
-                    # Try to get the page title
-                    content = self.scrape_page_content(handle)
-                    title = handle.replace('-', ' ').title()
-                    if content:
-                        # Try to extract title from HTML
-                        title_match = re.search(r'<title[^>]*>([^<]+)</title>', content, re.IGNORECASE)
-                        if title_match:
-                            title = title_match.group(1).strip()
-                    
-                    found_pages.append({
-                        'id': f"page_{handle}",
-                        'title': title,
-                        'handle': handle,
-                        'published': True,
-                        'publishedAt': None,
-                        'body': content,
-                        'bodySummary': ''
-                    })
-                    print(f"  ✅ Found: {title} ({handle})")
-            except:
-                continue
+        # Probes run concurrently; map() keeps results in common_handles order
+        with self._executor() as executor:
+            for page_data in executor.map(self._probe_common_handle, common_handles):
+                if page_data:
+                    found_pages.append(page_data)
+                    self.log(f"  ✅ Found: {page_data['title']} ({page_data['handle']})")
         
         if found_pages:
-            print(f"✅ Found {len(found_pages)} pages using common handles")
+            self.log(f"✅ Found {len(found_pages)} pages using common handles")
             return found_pages
         
         return []
     
-    def is_relevant_link(self, link: str) -> bool:
-        """Check if a link is relevant (not a common external service)"""
-        link_lower = link.lower()
+    def _probe_common_handle(self, handle: str) -> Optional[Dict]:
+        """Return a page record if /pages/<handle> exists, otherwise None"""
+        page_url = f"{self.base_url}/pages/{handle}"
+        try:
+            with self.host_limiter.slot(page_url):
+                response = self._request('HEAD', page_url, timeout=5, allow_redirects=True)
+                if response.status_code != 200:
+                    return None
+                # Try to get the page title
+                content = self.scrape_page_content(handle)
+        except:
+            return None
         
-        # Skip excluded domains
-        for excluded in self.excluded_domains:
-            if excluded in link_lower:
-                return False
+        title = handle.replace('-', ' ').title()
+        if content:
+            # Try to extract title from HTML
+            title_match = re.search(r'<title[^>]*>([^<]+)</title>', content, re.IGNORECASE)
+            if title_match:
+                title = title_match.group(1).strip()
         
-        # Skip mailto and tel links
-        if link_lower.startswith('mailto:') or link_lower.startswith('tel:'):
-            return False
+        return {
+            'id': f"page_{handle}",
+            'title': title,
+            'handle': handle,
+            'published': True,
+            'publishedAt': None,
+            'body': content,
+            'bodySummary': ''
+        }
+    
+    def is_relevant_link(self, link: str) -> bool:
+        """Check if a link is relevant (not a common external service, mailto:, tel:, etc.)"""
+        return not self.exclusions.excludes(link)
+    
+    @analysis_cpu('link_extraction')
+    def extract_references(self, text: str, page_url: Optional[str] = None,
+                           kinds: Optional[Iterable[str]] = None) -> List[Reference]:
+        """
+        Typed references of an HTML/text document, filtering out irrelevant ones
         
-        return True
-    
-    def extract_links_from_text(self, text: str) -> List[str]:
-        """Extract links from HTML/text content, filtering out irrelevant ones"""
-        links = []
-        
-        # Extract from HTML
-        parser = LinkExtractor()
-        parser.feed(text)
-        links.extend(parser.links)
-        
-        # Also extract plain URLs
-        url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        plain_urls = re.findall(url_pattern, text)
-        links.extend(plain_urls)
-        
-        # Clean and normalize links
-        cleaned_links = []
-        for link in links:
-            link = link.strip()
-            if link:
-                # Convert relative URLs to absolute
-                if link.startswith('/'):
-                    link = urljoin(self.base_url, link)
-                
-                # Filter out irrelevant links
-                if self.is_relevant_link(link):
-                    cleaned_links.append(link)
+        Every occurrence is returned in document order, its URL canonicalized
+        (relative ones resolved against page_url, or the store root).
         
-        return list(set(cleaned_links))  # Remove duplicates
+        Args:
+            kinds: Reference kinds to keep (default: all)
+        """
+        return self.analyzer.references(text, page_url, kinds)
+    
+    def extract_links_from_text(self, text: str, page_url: Optional[str] = None) -> List[str]:
+        """
+        Extract the links to check from HTML/text content (references of the configured kinds)
+        
+        Links are canonicalized and returned once each, in the order they first appear.
+        """
+        return links_of(self.extract_references(text, page_url, self.reference_kinds), self.reference_kinds)
     
+    @analysis_cpu('content_check')
     def has_meaningful_content(self, html_content: str) -> bool:
         """Check if HTML has meaningful content (not just navigation/footer/cart)"""
         if not html_content:
             return False
         
-        html_lower = html_content.lower()
-        
-        # Common indicators of empty/no-content pages
-        empty_indicators = [
-            'your cart is empty',
-            'skip to content',
-            'loading...',
-            'estimated total',
-            '₱0.00',
-            '$0.00',
-            'no content',
-            'page not found',
-            '404',
-            'this page does not exist',
-            'continue shopping',
-            'check out',
-            'log in to check out faster'
-        ]
-        
-        # Check if page is mostly empty indicators (especially cart-related)
-        empty_count = sum(1 for indicator in empty_indicators if indicator in html_lower)
-        if empty_count >= 3:  # Multiple empty indicators suggest no content
-            # But check if there's actual content beyond navigation
-            pass
-        
-        # Extract text content (rough estimate)
-        # Remove script and style tags
-        text_content = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
-        text_content = re.sub(r'<style[^>]*>.*?</style>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
-        # Remove common navigation/footer elements
-        text_content = re.sub(r'<nav[^>]*>.*?</nav>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
-        text_content = re.sub(r'<footer[^>]*>.*?</footer>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
-        text_content = re.sub(r'<header[^>]*>.*?</header>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Extract text between tags
-        text_only = re.sub(r'<[^>]+>', ' ', text_content)
-        text_only = ' '.join(text_only.split())  # Normalize whitespace
-        
-        # Remove common navigation/footer text patterns
-        navigation_patterns = [
-            r'\bhome\b', r'\bshop\b', r'\bcart\b', r'\blogin\b', r'\bsearch\b', 
-            r'\bmenu\b', r'\bfooter\b', r'\bheader\b', r'\bfacebook\b', 
-            r'\binstagram\b', r'\btwitter\b', r'\byoutube\b', r'\btiktok\b',
-            r'\babout\b', r'\bcontact\b', r'\bvisit our stores\b', r'\bstore hours\b',
-            r'\bphone number\b', r'\bcustomer service\b', r'\bjoin our\b',
-            r'\bpowered by shopify\b', r'\brefund policy\b', r'\bprivacy policy\b',
-            r'\bterms of service\b', r'\bshipping policy\b', r'\b©\s*\d{4}',
-            r'\bhave an account\b', r'\blog in\b', r'\bcontinue shopping\b',
-            r'\bcheck out\b', r'\bestimated total\b', r'\btaxes.*calculated\b'
-        ]
-        
-        meaningful_text = text_only
-        for pattern in navigation_patterns:
-            meaningful_text = re.sub(pattern, '', meaningful_text, flags=re.IGNORECASE)
-        
-        # Clean up extra whitespace
-        meaningful_text = ' '.join(meaningful_text.split())
-        
-        # Look for meaningful content indicators
-        content_indicators = [
-            '<article',
-            '<main',
-            '<section',
-            'class="content"',
-            'class="post"',
-            'class="article"',
-            'class="blog-post"',
-            'class="page-content"',
-            'id="content"',
-            'id="main-content"',
-            'class="blog-content"',
-            'class="post-content"',
-        ]
-        
-        # Count content indicators
-        content_count = sum(1 for indicator in content_indicators if indicator in html_lower)
-        
-        # Check for headings and paragraphs with actual text
-        has_headings = bool(re.search(r'<h[1-6][^>]*>.*?</h[1-6]>', html_content, flags=re.DOTALL | re.IGNORECASE))
-        has_paragraphs = bool(re.search(r'<p[^>]*>.*?</p>', html_content, flags=re.DOTALL | re.IGNORECASE))
-        
-        # Extract heading and paragraph text to verify they have content
-        heading_text = ' '.join(re.findall(r'<h[1-6][^>]*>(.*?)</h[1-6]>', html_content, flags=re.DOTALL | re.IGNORECASE))
-        paragraph_text = ' '.join(re.findall(r'<p[^>]*>(.*?)</p>', html_content, flags=re.DOTALL | re.IGNORECASE))
-        
-        # Clean extracted text
-        heading_text = re.sub(r'<[^>]+>', ' ', heading_text)
-        paragraph_text = re.sub(r'<[^>]+>', ' ', paragraph_text)
-        heading_text = ' '.join(heading_text.split())
-        paragraph_text = ' '.join(paragraph_text.split())
-        
-        # If we have content indicators and substantial text, it's meaningful
-        if content_count >= 2 and len(meaningful_text.strip()) > 200:
-            return True
-        
-        # If we have headings with actual text and paragraphs
-        if has_headings and has_paragraphs:
-            combined_content = heading_text + ' ' + paragraph_text
-            # Remove navigation words from combined content
-            for pattern in navigation_patterns:
-                combined_content = re.sub(pattern, '', combined_content, flags=re.IGNORECASE)
-            combined_content = ' '.join(combined_content.split())
-            if len(combined_content.strip()) > 150:  # At least 150 chars of actual content
-                return True
+        classifier = ContentClassifier()
+        for start in range(0, len(html_content), 65536):
+            classifier.feed(html_content[start:start + 65536])
+            if classifier.decided:
+                break
+        return classifier.is_meaningful()
+    
+    def check_link(self, url: str, timeout: int = 10) -> LinkCheck:
+        """Check if a link is dead or alive, using the link cache when one is configured"""
+        if self.cache is None:
+            return self._check_link_uncached(url, timeout)
         
-        # If we have substantial text even without specific content tags
-        if len(meaningful_text.strip()) > 500:
-            return True
+        entry = self.cache.get(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.stats.add('cache_hits')
+            return self.cache.to_link_check(url, entry)
         
-        # Special case: Blog pages should have article/blog content
-        is_blog_page = '/blog' in html_lower or 'blog' in html_lower
-        if is_blog_page:
-            # Blog pages need actual article content, not just navigation
-            if len(meaningful_text.strip()) < 200:
-                return False
-            # Should have at least some headings or paragraphs with content
-            if not has_headings and not has_paragraphs:
-                return False
+        # Expired entries are revalidated; a 304 means the cached result still holds
+        headers = self.cache.conditional_headers(entry) if entry else {}
+        check = self._check_link_uncached(url, timeout, headers)
+        if entry is not None and check.status_code == 304:
+            self.stats.add('cache_revalidated')
+            self.cache.refresh(url)
+            return self.cache.to_link_check(url, entry)
         
-        return False
+        self.stats.add('cache_misses')
+        # Only definitive answers are worth keeping; timeouts and 5xx/429 get retried next run
+        if check.status_code is not None and check.status_code < 500 and check.status_code != 429:
+            self.cache.put(url, check)
+        return check
     
-    def check_link(self, url: str, timeout: int = 10) -> LinkCheck:
+    def _check_link_uncached(self, url: str, timeout: int = 10, headers: Optional[Dict[str, str]] = None) -> LinkCheck:
         """Check if a link is dead or alive, including content validation"""
         is_internal = self.store_domain in url or url.startswith('/')
         
+        # Already checked, or reached as a redirect hop, earlier in this run
+        known = self.redirects.get(url)
+        if known is not None:
+            return self._reuse_redirect(url, [], known, is_internal)
+        
         try:
-            # Use HEAD request first (faster)
-            response = requests.head(
-                url,
-                timeout=timeout,
-                allow_redirects=True,
-                headers={'User-Agent': 'Mozilla/5.0 (compatible; ShopifyChecker/1.0)'}
-            )
-            status_code = response.status_code
-            
-            # If status is 200, check for meaningful content
-            if status_code == 200:
-                try:
-                    # Fetch full page to check content
-                    content_response = requests.get(
-                        url,
-                        timeout=timeout,
-                        allow_redirects=True,
-                        headers={'User-Agent': 'Mozilla/5.0 (compatible; ShopifyChecker/1.0)'}
-                    )
-                    
-                    if content_response.status_code == 200:
-                        # Check if page has meaningful content
-                        if not self.has_meaningful_content(content_response.text):
-                            return LinkCheck(
-                                url, 
-                                status_code, 
-                                True, 
-                                "No meaningful content (empty page)", 
-                                is_internal
-                            )
-                except Exception as e:
-                    # If content check fails, still consider it working (status 200)
-                    pass
-            
-            is_dead = status_code >= 400
-            
+            if self.check_mode == 'head-get':
+                check = self._check_link_head_get(url, timeout, is_internal, headers)
+            else:
+                check = self._check_link_streamed(url, timeout, is_internal, headers)
+            if check.status_code == 429:
+                # Still rate limited after every retry: the link is unverified, not broken
+                return LinkCheck(url, 429, False, "Rate limited (429), not verified", is_internal, check.redirect_chain)
+            if check.status_code != 304:
+                self.redirects.remember(check)
+            return check
         except requests.exceptions.Timeout:
             return LinkCheck(url, None, True, "Timeout", is_internal)
         except requests.exceptions.ConnectionError:
@@ -519,154 +2839,732 @@ class ShopifyPageChecker:
             return LinkCheck(url, None, True, str(e), is_internal)
         except Exception as e:
             return LinkCheck(url, None, True, f"Unexpected error: {str(e)}", is_internal)
+    
+    def _check_link_head_get(self, url: str, timeout: int, is_internal: bool,
+                             headers: Optional[Dict[str, str]] = None) -> LinkCheck:
+        """Legacy check: HEAD request, then a full GET of every 200 for the content check"""
+        response = self._request('HEAD', url, timeout=timeout, allow_redirects=True, headers=headers)
+        status_code = response.status_code
+        self._remember_validators(url, response)
+        chain = [hop.url for hop in response.history[1:]] + [response.url] if response.history else []
+        
+        # If status is 200, check for meaningful content
+        if status_code == 200:
+            try:
+                # Fetch full page to check content
+                content_response = self._request('GET', url, timeout=timeout, allow_redirects=True)
+                self.stats.add('bytes_read', len(content_response.content))
+                
+                if content_response.status_code == 200:
+                    if self._compares_soft_404(url, is_internal):
+                        match = self._soft_404_match(PageFingerprint.from_html(content_response.text))
+                        if match:
+                            return LinkCheck(url, status_code, True, f"Soft 404: looks like {match}", is_internal, chain)
+                    # Check if page has meaningful content
+                    if not self.has_meaningful_content(content_response.text):
+                        return LinkCheck(url, status_code, True, "No meaningful content (empty page)", is_internal, chain)
+            except Exception:
+                # If content check fails, still consider it working (status 200)
+                pass
+        
+        return LinkCheck(url, status_code, status_code >= 400, None, is_internal, chain)
+    
+    def _follow_redirects(self, method: str, url: str, timeout: int,
+                          headers: Optional[Dict[str, str]] = None
+                          ) -> Tuple[Optional[requests.Response], List[str], Optional[LinkCheck]]:
+        """
+        Send a streamed request and follow its redirects one hop at a time
+        
+        Returns:
+            (final response, redirect chain, None), or (None, chain, known result)
+            as soon as a hop has already been checked in this run
+        """
+        chain = []
+        current = url
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._request(method, current, timeout=timeout, allow_redirects=False,
+                                     stream=True, headers=headers)
+            if not response.is_redirect:
+                return response, chain, None
+            response.close()
+            current = urljoin(current, response.headers['Location'])
+            if current == url or current in chain:
+                raise requests.exceptions.TooManyRedirects(f"Redirect loop at {current}")
+            chain.append(current)
+            known = self.redirects.get(current)
+            if known is not None:
+                return None, chain, known
+        raise requests.exceptions.TooManyRedirects(f"Exceeded {MAX_REDIRECTS} redirects")
+    
+    def _reuse_redirect(self, url: str, chain: List[str], known: LinkCheck, is_internal: bool) -> LinkCheck:
+        """Result for a link whose redirects lead to an already checked URL"""
+        self.stats.add('redirects_reused')
+        return LinkCheck(url, known.status_code, known.is_dead, known.error, is_internal, chain + known.redirect_chain)
+    
+    def _check_link_streamed(self, url: str, timeout: int, is_internal: bool,
+                             headers: Optional[Dict[str, str]] = None) -> LinkCheck:
+        """Single round trip: one streamed GET, reading only what the content check needs"""
+        # Known non-HTML assets only need their status
+        if urlparse(url).path.lower().endswith(NON_HTML_EXTENSIONS):
+            response, chain, known = self._follow_redirects('HEAD', url, timeout, headers)
+            if known is not None:
+                return self._reuse_redirect(url, chain, known, is_internal)
+            response.close()
+            self._remember_validators(url, response)
+            # Some servers reject HEAD; fall through to a streamed GET for those
+            if response.status_code not in (405, 501):
+                if response.status_code == 200:
+                    # head-get mode would also have downloaded the whole file
+                    self.stats.add('requests_saved')
+                    self._count_unread_bytes(response, 0)
+                return LinkCheck(url, response.status_code, response.status_code >= 400, None, is_internal, chain)
+        
+        response, chain, known = self._follow_redirects('GET', url, timeout, headers)
+        if known is not None:
+            return self._reuse_redirect(url, chain, known, is_internal)
+        with response:
+            status_code = response.status_code
+            self._remember_validators(url, response)
+            if status_code != 200:
+                return LinkCheck(url, status_code, status_code >= 400, None, is_internal, chain)
+            
+            # head-get mode spends a HEAD before this GET
+            self.stats.add('requests_saved')
+            
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type and not content_type.startswith(HTML_CONTENT_TYPES):
+                # Not a web page: status is all we need, skip the body
+                self._count_unread_bytes(response, 0)
+                return LinkCheck(url, status_code, False, None, is_internal, chain)
+            
+            fingerprint = PageFingerprint() if self._compares_soft_404(url, is_internal) else None
+            try:
+                meaningful, match = self._classify_stream(response, fingerprint)
+                if match:
+                    return LinkCheck(url, status_code, True, f"Soft 404: looks like {match}", is_internal, chain)
+                if not meaningful:
+                    return LinkCheck(url, status_code, True, "No meaningful content (empty page)", is_internal, chain)
+            except requests.exceptions.RequestException:
+                # If content check fails, still consider it working (status 200)
+                pass
+        
+        return LinkCheck(url, status_code, False, None, is_internal, chain)
+    
+    def _remember_validators(self, url: str, response: requests.Response):
+        """Keep ETag/Last-Modified so the cached result can be revalidated later"""
+        if self.cache is not None:
+            self.cache.remember_validators(url, response.headers)
+    
+    def _classify_stream(self, response: requests.Response,
+                         fingerprint: Optional[PageFingerprint] = None) -> Tuple[bool, Optional[str]]:
+        """
+        Feed a streamed body to the content classifier (and fingerprint), stopping once both have what they need
+        
+        The fingerprint is matched as soon as it is complete: a soft 404 is
+        decided there, without reading the rest of the page or finishing the
+        content check. Returns whether the page has meaningful content and
+        the name of the soft-404 baseline it matched, if any.
+        """
+        decoder = codecs.getincrementaldecoder(decodable_charset(response.encoding))(errors='replace')
+        classifier = ContentClassifier()
+        size = 0
+        saw_body = False
+        complete = True
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                saw_body = saw_body or bool(chunk)
+                size += len(chunk)
+                with self.stats.cpu('content_check'):
+                    text = decoder.decode(chunk)
+                    classifier.feed(text)
+                    if fingerprint is not None:
+                        fingerprint.feed(text)
+                if fingerprint is not None and fingerprint.complete:
+                    match = self._soft_404_match(fingerprint)
+                    if match:
+                        return False, match
+                    fingerprint = None  # Not a soft 404: only the content check is left
+                if classifier.decided and fingerprint is None:
+                    break
+                if size >= self.max_content_bytes:
+                    complete = False
+                    break
+            else:
+                with self.stats.cpu('content_check'):
+                    text = decoder.decode(b'', final=True)
+                    classifier.feed(text)
+                    if fingerprint is not None:
+                        fingerprint.feed(text)
+            
+            # A page without </main> is fingerprinted as a whole (or as far as it was read)
+            if fingerprint is not None:
+                match = self._soft_404_match(fingerprint)
+                if match:
+                    return False, match
+            with self.stats.cpu('content_check'):
+                return saw_body and classifier.is_meaningful(complete), None
+        finally:
+            self.stats.add('bytes_read', size)
+            self._count_unread_bytes(response, size)
+    
+    def _compares_soft_404(self, url: str, is_internal: bool) -> bool:
+        """Whether a link's page is compared against the store's 404 and empty cart fingerprints"""
+        # The cart itself is one of the baselines
+        return self.soft_404 and is_internal and urlsplit(url).path.rstrip('/') != '/cart'
+    
+    @analysis_cpu('soft_404_fingerprint')
+    def _soft_404_match(self, fingerprint: PageFingerprint) -> Optional[str]:
+        """Name of the baseline page this fingerprint matches, if any"""
+        fingerprint.close()
+        for name, baseline in self._load_soft_404_baselines().items():
+            if fingerprint.similarity(baseline) >= SOFT_404_SIMILARITY:
+                self.stats.add('soft_404')
+                return name
+        return None
+    
+    def _load_soft_404_baselines(self) -> Dict[str, PageFingerprint]:
+        """Fetch and fingerprint the store's 404 page and empty cart, once per run"""
+        with self._baseline_lock:
+            if self._soft_404_baselines is None:
+                self._soft_404_baselines = {}
+                missing_handle = f"page-checker-missing-{random.getrandbits(48):012x}"
+                baselines = {
+                    "the store's 404 page": f"{self.base_url}/pages/{missing_handle}",
+                    "the empty cart": f"{self.base_url}/cart",
+                }
+                for name, url in baselines.items():
+                    try:
+                        response = self._request('GET', url, timeout=15)
+                    except requests.exceptions.RequestException:
+                        continue
+                    self.stats.add('bytes_read', len(response.content))
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    if response.text and (not content_type or content_type in HTML_CONTENT_TYPES):
+                        self._soft_404_baselines[name] = PageFingerprint.from_html(response.text)
+            return self._soft_404_baselines
+    
+    def _count_unread_bytes(self, response: requests.Response, bytes_read: int):
+        """Record body bytes we skipped, when the server told us the size"""
+        content_length = response.headers.get('Content-Length', '')
+        if content_length.isdigit() and int(content_length) > bytes_read:
+            self.stats.add('bytes_saved', int(content_length) - bytes_read)
+    
+    def _check_link_limited(self, url: str) -> LinkCheck:
+        """Check a link while holding a slot from its host's concurrency limit"""
+        with self.host_limiter.slot(url):
+            return self.check_link(url)
+    
+    @staticmethod
+    def _interleave_by_host(links: List[str]) -> List[int]:
+        """Order link indexes round-robin across hosts so workers don't queue behind one host"""
+        by_host: Dict[str, List[int]] = {}
+        for i, link in enumerate(links):
+            by_host.setdefault(urlparse(link).netloc.lower(), []).append(i)
         
-        return LinkCheck(url, status_code, is_dead, None, is_internal)
+        order = []
+        queues = list(by_host.values())
+        depth = 0
+        while len(order) < len(links):
+            for queue in queues:
+                if depth < len(queue):
+                    order.append(queue[depth])
+            depth += 1
+        return order
     
     def check_all_links(self, max_links: int = 100):
-        """Check all extracted links"""
-        links_to_check = list(self.all_links)[:max_links]
-        total = len(links_to_check)
+        """Check all extracted links concurrently, respecting per-host limits"""
+        for _ in self.iter_link_checks(max_links):
+            pass
+    
+    @timed_phase('check_links')
+    def iter_link_checks(self, max_links: int = 100, deadline: Optional[float] = None) -> Iterator[LinkCheck]:
+        """
+        Check the extracted links concurrently, yielding each LinkCheck as it finishes
+        
+        Results reused by incremental runs come first. Every result is also
+        kept in self.link_checks (in link order; with --db each is stored as it
+        finishes, in completion order) and written to the sink, even when the
+        iteration ends early: after cancel(), once the deadline passes or when
+        the caller stops iterating. Queued checks are then dropped.
         
-        print(f"\n🔍 Checking {total} links...")
+        Args:
+            max_links: Maximum number of links checked
+            deadline: time.monotonic() value after which no further results are waited for
+        """
+        # Sorted so the max_links budget covers the same links on every run
+        incremental = self.state is not None and self.cache is not None
+        if self.store is None:
+            sorted_links: Iterable[str] = sorted(self.all_links)
+        else:
+            sorted_links = self.store.iter_links(by_url=True, limit=None if incremental else max_links)
+        reused: List[LinkCheck] = []
+        if incremental:
+            # Incremental runs merge every still-fresh result; max_links only limits new checks
+            links_to_check = []
+            for link in sorted_links:
+                entry = self.cache.get(link)
+                if entry is not None and self.cache.is_fresh(entry):
+                    reused.append(self.cache.to_link_check(link, entry))
+                elif len(links_to_check) < max_links:
+                    links_to_check.append(link)
+            self.stats.add('cache_hits', len(reused))
+            if reused:
+                self.log(f"\n♻️  Reusing {len(reused)} link results from previous runs")
+        else:
+            links_to_check = list(itertools.islice(sorted_links, max_links))
+        total = len(links_to_check)
         
-        for i, link in enumerate(links_to_check, 1):
-            print(f"  [{i}/{total}] Checking: {link[:60]}...", end='\r')
-            check = self.check_link(link)
-            self.link_checks.append(check)
-            time.sleep(0.2)  # Rate limiting
+        self.log(f"\n🔍 Checking {total} links ({self.max_workers} workers)...")
         
-        print()  # New line after progress
+        # In memory, results are kept until the end to store them in link order;
+        # a store takes (and batches) each one as it finishes
+        results: List[Optional[LinkCheck]] = [None] * total if self.store is None else []
+        done = 0
+        try:
+            for check in reused:
+                if self.sink is not None:
+                    self.sink.write_link_check(check)
+                if self.store is not None:
+                    self.link_checks.append(check)
+                yield check
+            
+            # Checks are submitted a window at a time, so stopping early leaves little to cancel
+            order = deque(self._interleave_by_host(links_to_check))
+            with self._fan_out() as executor:
+                in_flight: Dict[Future, int] = {}
+                while (order or in_flight) and not self._should_stop(deadline):
+                    while order and len(in_flight) < self.max_workers * 2:
+                        i = order.popleft()
+                        in_flight[executor.submit(self._check_link_limited, links_to_check[i])] = i
+                    finished, _ = wait(in_flight, timeout=STOP_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    checks = []
+                    for future in finished:
+                        i = in_flight.pop(future)
+                        check = future.result()
+                        done += 1
+                        if self.store is None:
+                            results[i] = check
+                        else:
+                            self.link_checks.append(check)
+                        if self.sink is not None:
+                            self.sink.write_link_check(check)
+                        self.log(f"  [{done}/{total}] Checked: {links_to_check[i][:60]}...", end='\r')
+                        checks.append(check)
+                    yield from checks
+        finally:
+            if self.store is None:
+                # Keep results in link order regardless of completion order
+                self.link_checks.extend(reused)
+                self.link_checks.extend(check for check in results if check is not None)
+            
+            self.log()  # New line after progress
+            if done < total:
+                self.log(f"⏹️  Stopped after {done} of {total} links")
+            self.log(f"📡 {self.stats['requests']} requests sent, {self.stats['requests_saved']} saved, "
+                     f"{self.stats['bytes_read'] / 1024:.0f} KB read, {self.stats['bytes_saved'] / 1024:.0f} KB skipped")
+            if self.stats['redirects_reused']:
+                self.log(f"🔀 {self.stats['redirects_reused']} redirected links reused an already checked target")
+            if self.stats['soft_404']:
+                self.log(f"👻 {self.stats['soft_404']} store links render the store's 404 page or empty cart")
+            if self.cache is not None:
+                self.cache.save()
+                self.log(f"🗄️  Link cache: {self.stats['cache_hits']} hits, {self.stats['cache_revalidated']} revalidated (304), "
+                         f"{self.stats['cache_misses']} checked ({len(self.cache)} entries in {self.cache.path})")
     
     def check_page_accessibility(self, page_handle: str) -> bool:
         """Check if a page is accessible (returns 200)"""
         page_url = f"{self.base_url}/pages/{page_handle}"
         try:
-            response = requests.head(page_url, timeout=10, allow_redirects=True)
+            response = self._request('HEAD', page_url, timeout=10, allow_redirects=True)
             return response.status_code == 200
         except:
             return False
     
+    def _check_page_accessibility_limited(self, page_handle: str) -> bool:
+        """Probe a page while holding a slot from the store's concurrency limit"""
+        with self.host_limiter.slot(self.base_url):
+            return self.check_page_accessibility(page_handle)
+    
     def analyze_pages(self):
         """Analyze all pages"""
-        print("🔍 Analyzing pages...")
+        for _ in self.iter_pages():
+            pass
+    
+    @timed_phase('analyze_pages')
+    def iter_pages(self, deadline: Optional[float] = None) -> Iterator[Page]:
+        """
+        Analyze all pages, yielding each Page as soon as its links are extracted
+        
+        Pages are also kept in self.pages and written to the sink. The iteration
+        ends early after cancel() or once the deadline passes.
+        
+        Args:
+            deadline: time.monotonic() value after which no further pages are analyzed
+        """
+        self.log("🔍 Analyzing pages...")
         
         pages_data = self.get_storefront_pages()
         
         if not pages_data:
-            print("\n❌ No pages found or unable to fetch pages.")
-            print("\n💡 Possible reasons:")
-            print("  1. Storefront API is disabled or restricted")
-            print("  2. No pages exist in the store")
-            print("  3. Pages are password protected")
-            print("\n💡 Solutions:")
-            print("  - Enable Storefront API in Shopify Admin: Settings > Apps and sales channels > Develop apps")
-            print("  - Or use Admin API with authentication (requires app setup)")
+            self.log("\n❌ No pages found or unable to fetch pages.")
+            self.log("\n💡 Possible reasons:")
+            self.log("  1. Storefront API is disabled or restricted")
+            self.log("  2. No pages exist in the store")
+            self.log("  3. Pages are password protected")
+            self.log("\n💡 Solutions:")
+            self.log("  - Enable Storefront API in Shopify Admin: Settings > Apps and sales channels > Develop apps")
+            self.log("  - Or use Admin API with authentication (requires app setup)")
             return
         
-        print(f"✅ Found {len(pages_data)} pages to analyze")
+        self.log(f"✅ Found {len(pages_data)} pages to analyze")
         
-        for page_data in pages_data:
-            # Extract links from page body
-            body = page_data.get('body', '') or page_data.get('bodySummary', '')
-            links = self.extract_links_from_text(body)
-            self.all_links.update(links)
-            
-            # Check if page is published and accessible
-            published = page_data.get('published', False)
-            page_handle = page_data.get('handle', '')
-            
-            # Check if page is actually accessible
-            is_accessible = False
-            if published and page_handle:
-                is_accessible = self.check_page_accessibility(page_handle)
-            
-            page = Page(
-                id=page_data['id'],
-                title=page_data['title'],
-                handle=page_handle,
-                url=f"{self.base_url}/pages/{page_handle}",
-                published=published,
-                published_at=page_data.get('publishedAt'),
-                links=links
-            )
-            
-            self.pages.append(page)
+        # Accessibility probes go to the pool up front, so link extraction of
+        # one page overlaps with the HEAD requests for the pages after it
+        unchanged = 0
+        stopped = False
+        try:
+            with self._fan_out() as executor:
+                probes = []
+                bodies = []
+                reused = []
+                for page_data in pages_data:
+                    # Pages whose updatedAt is unchanged since the last run are not fetched at all
+                    prior_links = self.state.unchanged_links(page_data) if self.state is not None else None
+                    reused.append(prior_links)
+                    page_handle = page_data.get('handle', '')
+                    if prior_links is None and page_data.get('published', False) and page_handle:
+                        probes.append(executor.submit(self._check_page_accessibility_limited, page_handle))
+                    else:
+                        probes.append(None)
+                    bodies.append(executor.submit(self.fetch_page_body, page_handle)
+                                  if prior_links is None and self._needs_body(page_data) else None)
+                
+                # Extraction runs ahead of the pages being recorded, at most analysis_queue documents deep
+                pending = deque()
+                for page_data, probe, body_future, links in zip(pages_data, probes, bodies, reused):
+                    if self._should_stop(deadline):
+                        stopped = True
+                        break
+                    if body_future is not None:
+                        page_data['body'] = body_future.result()
+                    
+                    body_hash = None
+                    analysis = None
+                    if links is None:
+                        body = page_data.get('body') or page_data.get('bodySummary') or ''
+                        if self.state is not None:
+                            body_hash = self.state.content_hash(body)
+                            links = self.state.unchanged_links(page_data, body_hash)
+                        if links is None:
+                            # Extract links from page body
+                            analysis = self._submit_analysis(body, None, f"{self.base_url}/pages/{page_data.get('handle', '')}")
+                        else:
+                            unchanged += 1
+                    else:
+                        unchanged += 1
+                    pending.append((page_data, probe, links, analysis, body_hash))
+                    while len(pending) > self.analysis_queue:
+                        yield self._record_analyzed_page(*pending.popleft())
+                while pending and not stopped:
+                    yield self._record_analyzed_page(*pending.popleft())
+        finally:
+            if stopped:
+                self.log(f"⏹️  Stopped after {len(self.pages)} of {len(pages_data)} pages")
+            if self.state is not None:
+                self.state.save()
+                self.log(f"♻️  Incremental scan: {unchanged} unchanged pages reused, "
+                         f"{len(pages_data) - unchanged} new or changed")
+    
+    def _record_analyzed_page(self, page_data: Dict, probe: Optional[Future], links: Optional[List[str]],
+                              analysis: Optional[Future], body_hash: Optional[str]) -> Page:
+        """Add a page of analyze_pages once its links are known (reused, or extracted by analysis)"""
+        if analysis is not None:
+            links = self._analysis_result(analysis).links
+        self.all_links.update(links)
+        if self.state is not None:
+            self.state.record(page_data['id'], page_data.get('updatedAt'), body_hash, links)
+        
+        # Check if page is published and accessible
+        published = page_data.get('published', False)
+        page_handle = page_data.get('handle', '')
+        
+        # Check if page is actually accessible
+        is_accessible = probe.result() if probe is not None else False
+        
+        page = Page(
+            id=page_data['id'],
+            title=page_data['title'],
+            handle=page_handle,
+            url=f"{self.base_url}/pages/{page_handle}",
+            published=published,
+            published_at=page_data.get('publishedAt'),
+            links=links
+        )
+        
+        self.pages.append(page)
+        if self.sink is not None:
+            self.sink.write_page(page)
+        return page
+    
+    def _crawl_key(self, url: str) -> Optional[str]:
+        """Canonical URL to crawl for a link, or None if it is external, non-HTML or skipped"""
+        parsed = urlsplit(url)
+        if parsed.scheme not in ('http', 'https') or (parsed.hostname or '').lower() != self.store_hostname:
+            return None
+        path = parsed.path or '/'
+        lowered = path.lower()
+        if lowered.endswith(NON_HTML_EXTENSIONS):
+            return None
+        if any(lowered == skip or lowered.startswith(skip + '/') for skip in CRAWL_SKIP_PATHS):
+            return None
+        query = urlencode([(key, value) for key, value in parse_qsl(parsed.query) if key in CRAWL_QUERY_PARAMS])
+        return urlunsplit((parsed.scheme.lower(), parsed.netloc.lower(), path, query, ''))
+    
+    def _fetch_crawl_page(self, url: str) -> Optional[Tuple[str, bytes, Optional[str]]]:
+        """GET a page for the crawl; returns (final URL, body bytes, encoding), or None for errors and non-HTML responses"""
+        try:
+            with self.host_limiter.slot(url):
+                with self._request('GET', url, timeout=15, stream=True) as response:
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    if response.status_code != 200 or content_type not in HTML_CONTENT_TYPES:
+                        return None
+                    # Redirects off the store (e.g. to a checkout domain) end the crawl there
+                    if (urlsplit(response.url).hostname or '').lower() != self.store_hostname:
+                        return None
+                    chunks = []
+                    size = 0
+                    for chunk in response.iter_content(65536):
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size >= self.max_crawl_bytes:
+                            break
+                    self.stats.add('bytes_read', size)
+                    # Decoded by the analysis stage, so the bytes cross to a worker process as they are
+                    return response.url, b''.join(chunks), response.encoding
+        except requests.exceptions.RequestException:
+            return None
+    
+    def crawl_site(self, max_depth: int = 3, max_pages: int = 5000, seen_capacity: int = 1000000):
+        """Breadth-first crawl of the storefront from base_url (see iter_crawl_pages)"""
+        for _ in self.iter_crawl_pages(max_depth, max_pages, seen_capacity):
+            pass
+    
+    @timed_phase('crawl')
+    def iter_crawl_pages(self, max_depth: int = 3, max_pages: int = 5000, seen_capacity: int = 1000000,
+                         deadline: Optional[float] = None) -> Iterator[Page]:
+        """
+        Breadth-first crawl of the storefront from base_url, yielding each Page as it is analysed
+        
+        Every fetched page becomes a Page whose links (internal and external)
+        are checked like page body links. Fetches run through the worker pool;
+        the frontier never holds more URLs than the page budget can still
+        fetch, and seen URLs live in a fixed-size Bloom filter. The crawl
+        ends early after cancel() or once the deadline passes.
+        
+        Args:
+            max_depth: Link hops from the home page
+            max_pages: Maximum number of URLs fetched
+            seen_capacity: Expected number of distinct URLs (sizes the Bloom filter)
+            deadline: time.monotonic() value after which nothing more is fetched
+        """
+        self.log(f"🕷️  Crawling {self.base_url} (depth {max_depth}, up to {max_pages} pages)...")
+        seen = BloomFilter(seen_capacity)
+        start = self._crawl_key(f"{self.base_url}/")
+        seen.add(start)
+        frontier = deque([(start, 0)])
+        fetched = 0
+        
+        analyzing = {}
+        try:
+            with self._fan_out() as executor:
+                in_flight = {}
+                while (frontier or in_flight or analyzing) and not self._should_stop(deadline):
+                    # Keep the pool busy without queueing more than it can work on; fetching
+                    # pauses while the analysis stage has analysis_queue pages waiting
+                    while (frontier and len(in_flight) < self.max_workers * 2 and fetched + len(in_flight) < max_pages
+                           and len(analyzing) < self.analysis_queue):
+                        url, depth = frontier.popleft()
+                        in_flight[executor.submit(self._fetch_crawl_page, url)] = (url, depth)
+                    if not in_flight and not analyzing:
+                        break
+                    
+                    done, _ = wait(list(in_flight) + list(analyzing), timeout=STOP_POLL_INTERVAL,
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in in_flight:
+                            url, depth = in_flight.pop(future)
+                            fetched += 1
+                            result = future.result()
+                            if result is None:
+                                continue
+                            final_url, body, encoding = result
+                            final_key = self._crawl_key(final_url)
+                            if final_key and final_key != url:
+                                seen.add(final_key)
+                            try:
+                                analyzing[self._submit_analysis(body, encoding, final_url)] = (final_url, depth)
+                            except Exception as e:
+                                self.log(f"⚠️  Could not analyse {final_url}: {e}")
+                            continue
+                        
+                        final_url, depth = analyzing.pop(future)
+                        try:
+                            analysis = self._analysis_result(future)
+                        except Exception as e:
+                            # One bad page (or a crashed analysis process) skips that page, not the crawl
+                            self.log(f"⚠️  Could not analyse {final_url}: {e}")
+                            continue
+                        self.all_links.update(analysis.links)
+                        
+                        path = urlsplit(final_url).path or '/'
+                        page = Page(
+                            id=f"crawl_{path}",
+                            title=analysis.title or path,
+                            handle=path,
+                            url=final_url,
+                            published=True,
+                            published_at=None,
+                            links=analysis.links
+                        )
+                        self.pages.append(page)
+                        if self.sink is not None:
+                            self.sink.write_page(page)
+                        
+                        if depth < max_depth:
+                            # Only page links are followed, whichever kinds are checked
+                            for link in analysis.followed:
+                                key = self._crawl_key(link)
+                                if key and len(frontier) < max_pages - fetched and seen.add(key):
+                                    frontier.append((key, depth + 1))
+                        yield page
+                    
+                    self.log(f"  🕷️  {fetched} fetched, {len(self.pages)} pages, {len(frontier)} queued", end='\r')
+        finally:
+            for future in analyzing:
+                future.cancel()  # Left over when the crawl stopped early
+            self.log()
+            self.log(f"✅ Crawled {len(self.pages)} pages ({fetched} URLs fetched)")
+    
+    def _link_checks_where(self, dead: Optional[bool] = None, internal: Optional[bool] = None,
+                           redirected: Optional[bool] = None) -> Union[List[LinkCheck], StoredLinkChecks]:
+        """
+        Link checks matching the given flags, redirected ones longest chain first
+        
+        With --db this is a view that counts and streams them with queries.
+        """
+        if self.store is not None:
+            return self.link_checks.where(dead=dead, internal=internal, redirected=redirected)
+        checks = [lc for lc in self.link_checks
+                  if (dead is None or lc.is_dead == dead)
+                  and (internal is None or lc.is_internal == internal)
+                  and (redirected is None or bool(lc.redirect_chain) == redirected)]
+        if redirected:
+            checks.sort(key=lambda lc: len(lc.redirect_chain), reverse=True)
+        return checks
     
-    def generate_report(self):
-        """Generate a comprehensive report"""
-        print("\n" + "="*80)
-        print("📊 SHOPIFY PAGE & LINK CHECKER REPORT")
-        print("="*80)
+    @timed_phase('report')
+    def generate_report(self) -> str:
+        """Generate a comprehensive report; returns the report file written"""
+        self.log("\n" + "="*80)
+        self.log("📊 SHOPIFY PAGE & LINK CHECKER REPORT")
+        self.log("="*80)
         
         # Page Summary
         total = len(self.pages)
         published = sum(1 for p in self.pages if p.published)
         unpublished = total - published
         
-        print(f"\n📄 PAGE SUMMARY")
-        print(f"  Total Pages: {total}")
-        print(f"  ✅ Published (Live): {published}")
-        print(f"  ❌ Unpublished/Draft: {unpublished}")
+        self.log(f"\n📄 PAGE SUMMARY")
+        self.log(f"  Total Pages: {total}")
+        self.log(f"  ✅ Published (Live): {published}")
+        self.log(f"  ❌ Unpublished/Draft: {unpublished}")
         
         # Link Summary
         total_links = len(self.all_links)
         checked_links = len(self.link_checks)
-        dead_links = [lc for lc in self.link_checks if lc.is_dead]
-        internal_links = [lc for lc in self.link_checks if lc.is_internal]
-        external_links = [lc for lc in self.link_checks if not lc.is_internal]
-        
-        print(f"\n🔗 LINK SUMMARY")
-        print(f"  Total Links Found: {total_links}")
-        print(f"  Links Checked: {checked_links}")
-        print(f"  ✅ Working Links: {checked_links - len(dead_links)}")
-        print(f"  ❌ Dead Links: {len(dead_links)}")
-        print(f"  🏠 Internal Links: {len(internal_links)}")
-        print(f"  🌐 External Links: {len(external_links)}")
+        dead_links = self._link_checks_where(dead=True)
+        internal_count = len(self._link_checks_where(internal=True))
+        redirected = self._link_checks_where(redirected=True)
+        
+        self.log(f"\n🔗 LINK SUMMARY")
+        self.log(f"  Total Links Found: {total_links}")
+        self.log(f"  Links Checked: {checked_links}")
+        self.log(f"  ✅ Working Links: {checked_links - len(dead_links)}")
+        self.log(f"  ❌ Dead Links: {len(dead_links)}")
+        self.log(f"  🏠 Internal Links: {internal_count}")
+        self.log(f"  🌐 External Links: {checked_links - internal_count}")
+        self.log(f"  🔀 Redirected Links: {len(redirected)}")
+        
+        # Changes since the previous stored run
+        previous_run = self.store.previous_run_id() if self.store is not None and checked_links else None
+        if previous_run is not None:
+            changes = self.store.link_changes(previous_run)
+            self.log(f"\n🕘 SINCE RUN #{previous_run}")
+            self.log(f"  ❌ Newly dead: {len(changes['newly_dead'])}")
+            for url in changes['newly_dead'][:10]:
+                self.log(f"    - {url}")
+            self.log(f"  ✅ Recovered: {len(changes['recovered'])}")
+            for url in changes['recovered'][:10]:
+                self.log(f"    - {url}")
         
         # Dead Links Details
         if dead_links:
-            print(f"\n❌ DEAD LINKS ({len(dead_links)})")
-            for link_check in dead_links[:20]:  # Show first 20
+            self.log(f"\n❌ DEAD LINKS ({len(dead_links)})")
+            for link_check in itertools.islice(dead_links, 20):  # Show first 20
                 status_info = f"Status: {link_check.status_code}" if link_check.status_code else f"Error: {link_check.error}"
-                print(f"  • {link_check.url}")
-                print(f"    {status_info}")
+                self.log(f"  • {link_check.url}")
+                self.log(f"    {status_info}")
             if len(dead_links) > 20:
-                print(f"  ... and {len(dead_links) - 20} more")
+                self.log(f"  ... and {len(dead_links) - 20} more")
+        
+        # Redirect chains, longest first so the worst offenders get fixed first
+        if redirected:
+            self.log(f"\n🔀 REDIRECTED LINKS ({len(redirected)})")
+            for link_check in itertools.islice(redirected, 20):  # Show first 20
+                hops = len(link_check.redirect_chain)
+                self.log(f"  • {link_check.url} ({hops} hop{'s' if hops != 1 else ''})")
+                self.log(f"    → {' → '.join(link_check.redirect_chain)}")
+            if len(redirected) > 20:
+                self.log(f"  ... and {len(redirected) - 20} more")
         
         # Pages with Links
         pages_with_links = [p for p in self.pages if p.links]
         if pages_with_links:
-            print(f"\n📎 PAGES WITH LINKS ({len(pages_with_links)})")
+            self.log(f"\n📎 PAGES WITH LINKS ({len(pages_with_links)})")
             for page in pages_with_links[:10]:  # Show first 10
                 status_icon = "✅" if page.published else "❌"
-                print(f"  {status_icon} {page.title}")
-                print(f"    URL: {page.url}")
-                print(f"    Status: {'Published' if page.published else 'Unpublished'}")
-                print(f"    Links: {len(page.links)}")
+                self.log(f"  {status_icon} {page.title}")
+                self.log(f"    URL: {page.url}")
+                self.log(f"    Status: {'Published' if page.published else 'Unpublished'}")
+                self.log(f"    Links: {len(page.links)}")
                 for link in page.links[:3]:  # Show first 3 links
-                    print(f"      - {link}")
+                    self.log(f"      - {link}")
                 if len(page.links) > 3:
-                    print(f"      ... and {len(page.links) - 3} more")
+                    self.log(f"      ... and {len(page.links) - 3} more")
             if len(pages_with_links) > 10:
-                print(f"  ... and {len(pages_with_links) - 10} more pages")
+                self.log(f"  ... and {len(pages_with_links) - 10} more pages")
         
         # Published Pages
         if published > 0:
-            print(f"\n✅ PUBLISHED (LIVE) PAGES ({published})")
+            self.log(f"\n✅ PUBLISHED (LIVE) PAGES ({published})")
             for page in self.pages:
                 if page.published:
-                    print(f"  • {page.title}")
-                    print(f"    URL: {page.url}")
+                    self.log(f"  • {page.title}")
+                    self.log(f"    URL: {page.url}")
                     if page.published_at:
-                        print(f"    Published: {page.published_at}")
+                        self.log(f"    Published: {page.published_at}")
         
         # Unpublished Pages
         if unpublished > 0:
-            print(f"\n❌ UNPUBLISHED/DRAFT PAGES ({unpublished})")
+            self.log(f"\n❌ UNPUBLISHED/DRAFT PAGES ({unpublished})")
             for page in self.pages:
                 if not page.published:
-                    print(f"  • {page.title}")
-                    print(f"    Handle: {page.handle}")
+                    self.log(f"  • {page.title}")
+                    self.log(f"    Handle: {page.handle}")
+        
+        # Where the run's time went
+        if self.stats['requests']:
+            self.print_performance()
         
         # Save report to Excel file with website name
         domain_name = self.store_domain.replace('.myshopify.com', '').replace('.com', '').replace('.', '_')
@@ -674,14 +3572,53 @@ class ShopifyPageChecker:
         domain_name = re.sub(r'[<>:"/\\|?*]', '_', domain_name)
         timestamp = int(time.time())
         report_file = f"shopify_pages_report_{domain_name}_{timestamp}.xlsx"
-        self.generate_excel_report(report_file, total, published, unpublished, total_links, dead_links)
+        report_file = self.generate_excel_report(report_file, total, published, unpublished, total_links, dead_links)
+        
+        self.log(f"\n💾 Excel report saved to: {report_file}")
+        self.log("="*80)
+        return report_file
+    
+    def print_performance(self):
+        """Print phase wall times, request totals, content-analysis CPU and the slowest hosts"""
+        summary = self.stats.summary()
+        counters = summary['counters']
+        self.log("\n⏱️  PERFORMANCE")
+        self.log(f"  Elapsed: {summary['wall_seconds']:.1f}s wall, {summary['cpu_seconds']:.1f}s CPU")
+        for name, seconds in summary['phases'].items():
+            self.log(f"  {name:<22} {seconds:8.2f}s")
+        self.log(f"  Requests: {counters.get('requests', 0)} ({counters.get('retries', 0)} transport retries, "
+                 f"{counters.get('throttled', 0)} throttled), {counters.get('bytes_read', 0) / 1024:.0f} KB read")
+        if summary['analysis_cpu_seconds']:
+            self.log("  Content analysis CPU: " + ", ".join(
+                f"{name} {seconds:.2f}s" for name, seconds in summary['analysis_cpu_seconds'].items()))
+        self.log("  Slowest hosts (total request time)    requests    p50    p95    p99 (ms)")
+        for host, latency in list(summary['hosts'].items())[:10]:
+            self.log(f"    {host[:36]:<36} {latency['requests']:8} {latency['p50_ms']:6.0f} "
+                     f"{latency['p95_ms']:6.0f} {latency['p99_ms']:6.0f}")
+    
+    def write_trace(self, path: str):
+        """
+        Write the run's timings as JSON
         
-        print(f"\n💾 Excel report saved to: {report_file}")
-        print("="*80)
+        The file is in Chrome trace format (phases as events, open it in
+        chrome://tracing or Perfetto); the full summary from RunStats.summary()
+        is under "otherData".
+        """
+        trace = {
+            'traceEvents': self.stats.trace_events(),
+            'displayTimeUnit': 'ms',
+            'otherData': {'store_url': self.base_url, 'started_at': self.stats.started, **self.stats.summary()},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, indent=2)
+        self.log(f"🧭 Timing trace saved to: {path}")
     
+    @timed_phase('excel_report')
     def generate_excel_report(self, filename: str, total: int, published: int, unpublished: int, 
-                              total_links: int, dead_links: List[LinkCheck]):
-        """Generate Excel report with formatted sheets"""
+                              total_links: int, dead_links: Union[List[LinkCheck], StoredLinkChecks]) -> str:
+        """Generate Excel report with formatted sheets; returns the file written"""
+        redirected = self._link_checks_where(redirected=True)
+        
         if not OPENPYXL_AVAILABLE:
             # Fallback to JSON if openpyxl not available
             report_file = filename.replace('.xlsx', '.json')
@@ -694,7 +3631,9 @@ class ShopifyPageChecker:
                     'unpublished_pages': unpublished,
                     'total_links': total_links,
                     'dead_links': len(dead_links),
+                    'redirected_links': len(redirected),
                 },
+                'performance': self.stats.summary(),
                 'pages': [
                     {
                         'title': p.title,
@@ -714,54 +3653,59 @@ class ShopifyPageChecker:
                         'is_internal': lc.is_internal
                     }
                     for lc in dead_links
+                ],
+                'redirects': [
+                    {
+                        'url': lc.url,
+                        'hops': len(lc.redirect_chain),
+                        'final_url': lc.redirect_chain[-1],
+                        'chain': lc.redirect_chain,
+                        'status_code': lc.status_code
+                    }
+                    for lc in redirected
                 ]
             }
             with open(report_file, 'w', encoding='utf-8') as f:
                 json.dump(report_data, f, indent=2, ensure_ascii=False)
-            print(f"⚠️  openpyxl not available. Saved JSON report instead: {report_file}")
-            return
-        
-        wb = Workbook()
+            self.log(f"⚠️  openpyxl not available. Saved JSON report instead: {report_file}")
+            return report_file
         
-        # Remove default sheet
-        if 'Sheet' in wb.sheetnames:
-            wb.remove(wb['Sheet'])
-        
-        # Define styles
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
+        # Write-only workbook: rows go to disk as they are appended, and every
+        # cell points at one of these named styles instead of carrying its own
+        wb = Workbook(write_only=True)
         border = Border(
             left=Side(style='thin'),
             right=Side(style='thin'),
             top=Side(style='thin'),
             bottom=Side(style='thin')
         )
-        center_align = Alignment(horizontal='center', vertical='center')
+        wb.add_named_style(NamedStyle(
+            name='report_header',
+            fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+            font=Font(bold=True, color="FFFFFF", size=11),
+            border=border,
+            alignment=Alignment(horizontal='center', vertical='center'),
+        ))
+        wb.add_named_style(NamedStyle(name='report_cell', border=border))
+        wb.add_named_style(NamedStyle(name='report_link', border=border, font=Font(color="0563C1", underline="single")))
+        wb.add_named_style(NamedStyle(name='report_title', font=Font(bold=True, size=14)))
+        
+        def styled(ws, value, style='report_cell', hyperlink=None):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style
+            if hyperlink:
+                # Make URL clickable
+                cell.hyperlink = hyperlink
+            return cell
+        
+        def link(ws, url):
+            return styled(ws, url, 'report_link', url)
         
         # Sheet 1: Summary
-        ws_summary = wb.create_sheet("Summary", 0)
+        ws_summary = wb.create_sheet("Summary")
         ws_summary.column_dimensions['A'].width = 30
         ws_summary.column_dimensions['B'].width = 20
         
-        ws_summary['A1'] = 'Shopify Page & Link Checker Report'
-        ws_summary['A1'].font = Font(bold=True, size=14)
-        ws_summary.merge_cells('A1:B1')
-        
-        ws_summary['A3'] = 'Store URL'
-        ws_summary['B3'] = self.base_url
-        ws_summary['A4'] = 'Report Date'
-        ws_summary['B4'] = time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        row = 6
-        ws_summary[f'A{row}'] = 'Metric'
-        ws_summary[f'B{row}'] = 'Value'
-        ws_summary[f'A{row}'].fill = header_fill
-        ws_summary[f'A{row}'].font = header_font
-        ws_summary[f'B{row}'].fill = header_fill
-        ws_summary[f'B{row}'].font = header_font
-        ws_summary[f'A{row}'].border = border
-        ws_summary[f'B{row}'].border = border
-        
         summary_data = [
             ('Total Pages', total),
             ('Published (Live)', published),
@@ -769,95 +3713,81 @@ class ShopifyPageChecker:
             ('Total Links Found', total_links),
             ('Dead Links', len(dead_links)),
             ('Working Links', total_links - len(dead_links)),
+            ('Redirected Links', len(redirected)),
         ]
         
-        for i, (label, value) in enumerate(summary_data, start=row+1):
-            ws_summary[f'A{i}'] = label
-            ws_summary[f'B{i}'] = value
-            ws_summary[f'A{i}'].border = border
-            ws_summary[f'B{i}'].border = border
+        ws_summary.append([styled(ws_summary, 'Shopify Page & Link Checker Report', 'report_title')])
+        ws_summary.append([])
+        ws_summary.append(['Store URL', self.base_url])
+        ws_summary.append(['Report Date', time.strftime('%Y-%m-%d %H:%M:%S')])
+        ws_summary.append([])
+        ws_summary.append([styled(ws_summary, 'Metric', 'report_header'), styled(ws_summary, 'Value', 'report_header')])
+        for label, value in summary_data:
+            ws_summary.append([styled(ws_summary, label), styled(ws_summary, value)])
         
         # Helper function to create a sheet with headers
         def create_sheet_with_headers(sheet_name, headers_list, col_widths):
-            ws = wb.create_sheet(sheet_name)
-            for col, header in enumerate(headers_list, start=1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.border = border
-                cell.alignment = center_align
+            # Excel rejects these characters in sheet titles
+            ws = wb.create_sheet(re.sub(r'[\\/?*\[\]:]', '-', sheet_name)[:31])
             for col, width in enumerate(col_widths, start=1):
                 ws.column_dimensions[get_column_letter(col)].width = width
             ws.freeze_panes = 'A2'
+            ws.append([styled(ws, header, 'report_header') for header in headers_list])
             return ws
         
+        # Sheets 2-4 are filled in one pass over the pages
+        ws_active = ws_unpublished = ws_links = None
+        
         # Sheet 2: Published (Live) Pages
-        active_pages = [p for p in self.pages if p.published]
-        if active_pages:
+        if published:
             ws_active = create_sheet_with_headers(
                 f"Published (Live) - {published}",
                 ['Page Title', 'Page URL', 'Published Date', 'Links Count'],
                 [35, 60, 20, 15]
             )
-            
-            for row_idx, page in enumerate(active_pages, start=2):
-                published_date = page.published_at[:10] if page.published_at else "N/A"
-                
-                ws_active.cell(row=row_idx, column=1, value=page.title).border = border
-                ws_active.cell(row=row_idx, column=2, value=page.url).border = border
-                ws_active.cell(row=row_idx, column=3, value=published_date).border = border
-                ws_active.cell(row=row_idx, column=4, value=len(page.links)).border = border
-                
-                # Make URL clickable
-                ws_active.cell(row=row_idx, column=2).hyperlink = page.url
-                ws_active.cell(row=row_idx, column=2).font = Font(color="0563C1", underline="single")
         
         # Sheet 3: Unpublished/Draft Pages
-        unpublished_pages = [p for p in self.pages if not p.published]
-        if unpublished_pages:
+        if unpublished:
             ws_unpublished = create_sheet_with_headers(
                 f"Unpublished/Draft - {unpublished}",
                 ['Page Title', 'Handle', 'Links Count'],
                 [35, 30, 15]
             )
-            
-            for row_idx, page in enumerate(unpublished_pages, start=2):
-                ws_unpublished.cell(row=row_idx, column=1, value=page.title).border = border
-                ws_unpublished.cell(row=row_idx, column=2, value=page.handle).border = border
-                ws_unpublished.cell(row=row_idx, column=3, value=len(page.links)).border = border
         
         # Sheet 4: Total Links Found
-        all_extracted_links = []
-        for page in self.pages:
-            for link in page.links:
-                all_extracted_links.append({
-                    'url': link,
-                    'page_title': page.title,
-                    'page_url': page.url
-                })
-        
-        if all_extracted_links:
+        if total_links:
             ws_links = create_sheet_with_headers(
                 f"Total Links Found - {total_links}",
                 ['Link URL', 'Found In Page', 'Page URL', 'Type'],
                 [60, 30, 50, 15]
             )
+        
+        for page in self.pages:
+            if page.published and ws_active is not None:
+                published_date = page.published_at[:10] if page.published_at else "N/A"
+                ws_active.append([
+                    styled(ws_active, page.title),
+                    link(ws_active, page.url),
+                    styled(ws_active, published_date),
+                    styled(ws_active, len(page.links)),
+                ])
+            elif not page.published and ws_unpublished is not None:
+                ws_unpublished.append([
+                    styled(ws_unpublished, page.title),
+                    styled(ws_unpublished, page.handle),
+                    styled(ws_unpublished, len(page.links)),
+                ])
             
-            for row_idx, link_data in enumerate(all_extracted_links, start=2):
-                link_url = link_data['url']
-                is_internal = self.store_domain in link_url or link_url.startswith(self.base_url)
-                link_type = "Internal" if is_internal else "External"
-                
-                ws_links.cell(row=row_idx, column=1, value=link_url).border = border
-                ws_links.cell(row=row_idx, column=2, value=link_data['page_title']).border = border
-                ws_links.cell(row=row_idx, column=3, value=link_data['page_url']).border = border
-                ws_links.cell(row=row_idx, column=4, value=link_type).border = border
-                
-                # Make URLs clickable
-                ws_links.cell(row=row_idx, column=1).hyperlink = link_url
-                ws_links.cell(row=row_idx, column=1).font = Font(color="0563C1", underline="single")
-                ws_links.cell(row=row_idx, column=3).hyperlink = link_data['page_url']
-                ws_links.cell(row=row_idx, column=3).font = Font(color="0563C1", underline="single")
+            if ws_links is not None:
+                for link_url in page.links:
+                    is_internal = self.store_domain in link_url or link_url.startswith(self.base_url)
+                    link_type = "Internal" if is_internal else "External"
+                    ws_links.append([
+                        link(ws_links, link_url),
+                        styled(ws_links, page.title),
+                        link(ws_links, page.url),
+                        styled(ws_links, link_type),
+                    ])
         
         # Sheet 5: Dead Links
         if dead_links:
@@ -867,42 +3797,291 @@ class ShopifyPageChecker:
                 [60, 15, 30, 15]
             )
             
-            for row_idx, link_check in enumerate(dead_links, start=2):
+            for link_check in dead_links:
                 link_type = "Internal" if link_check.is_internal else "External"
                 status_code = str(link_check.status_code) if link_check.status_code else "N/A"
                 error = link_check.error or "N/A"
-                
-                ws_dead.cell(row=row_idx, column=1, value=link_check.url).border = border
-                ws_dead.cell(row=row_idx, column=2, value=status_code).border = border
-                ws_dead.cell(row=row_idx, column=3, value=error).border = border
-                ws_dead.cell(row=row_idx, column=4, value=link_type).border = border
-                
-                # Make URL clickable
-                ws_dead.cell(row=row_idx, column=1).hyperlink = link_check.url
-                ws_dead.cell(row=row_idx, column=1).font = Font(color="0563C1", underline="single")
+                ws_dead.append([
+                    link(ws_dead, link_check.url),
+                    styled(ws_dead, status_code),
+                    styled(ws_dead, error),
+                    styled(ws_dead, link_type),
+                ])
         
         # Sheet 6: Working Links
-        working_links = [lc for lc in self.link_checks if not lc.is_dead]
-        if working_links:
+        working_count = len(self.link_checks) - len(dead_links)
+        if working_count:
             ws_working = create_sheet_with_headers(
-                f"Working Links - {len(working_links)}",
+                f"Working Links - {working_count}",
                 ['URL', 'Status Code', 'Type'],
                 [60, 15, 15]
             )
             
-            for row_idx, link_check in enumerate(working_links, start=2):
+            for link_check in self.link_checks:
+                if link_check.is_dead:
+                    continue
                 link_type = "Internal" if link_check.is_internal else "External"
                 status_code = str(link_check.status_code) if link_check.status_code else "N/A"
-                
-                ws_working.cell(row=row_idx, column=1, value=link_check.url).border = border
-                ws_working.cell(row=row_idx, column=2, value=status_code).border = border
-                ws_working.cell(row=row_idx, column=3, value=link_type).border = border
-                
-                # Make URL clickable
-                ws_working.cell(row=row_idx, column=1).hyperlink = link_check.url
-                ws_working.cell(row=row_idx, column=1).font = Font(color="0563C1", underline="single")
+                ws_working.append([
+                    link(ws_working, link_check.url),
+                    styled(ws_working, status_code),
+                    styled(ws_working, link_type),
+                ])
+        
+        # Sheet 7: Redirects
+        if redirected:
+            ws_redirects = create_sheet_with_headers(
+                f"Redirects - {len(redirected)}",
+                ['URL', 'Hops', 'Final URL', 'Redirect Chain', 'Status Code'],
+                [60, 10, 60, 100, 15]
+            )
+            
+            for link_check in redirected:
+                status_code = str(link_check.status_code) if link_check.status_code else "N/A"
+                ws_redirects.append([
+                    link(ws_redirects, link_check.url),
+                    styled(ws_redirects, len(link_check.redirect_chain)),
+                    link(ws_redirects, link_check.redirect_chain[-1]),
+                    styled(ws_redirects, ' → '.join(link_check.redirect_chain)),
+                    styled(ws_redirects, status_code),
+                ])
+        
+        # Sheet 8: Performance
+        if self.stats['requests']:
+            performance = self.stats.summary()
+            ws_perf = create_sheet_with_headers(
+                "Performance",
+                ['Metric / Host', 'Value / Requests', 'Mean (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Max (ms)'],
+                [40, 18, 12, 12, 12, 12, 12]
+            )
+            rows = [('Wall time (s)', performance['wall_seconds']), ('CPU time (s)', performance['cpu_seconds'])]
+            rows += [(f"Phase: {name} (s)", seconds) for name, seconds in performance['phases'].items()]
+            rows += [(f"Analysis CPU: {name} (s)", seconds)
+                     for name, seconds in performance['analysis_cpu_seconds'].items()]
+            rows += [(name, value) for name, value in performance['counters'].items()]
+            for label, value in rows:
+                ws_perf.append([styled(ws_perf, label), styled(ws_perf, value)])
+            ws_perf.append([])
+            ws_perf.append([styled(ws_perf, header, 'report_header') for header in
+                            ['Host', 'Requests', 'Mean (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'Max (ms)']])
+            for host, latency in performance['hosts'].items():
+                ws_perf.append([styled(ws_perf, host)] + [
+                    styled(ws_perf, latency[key])
+                    for key in ('requests', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+                ])
         
         wb.save(filename)
+        return filename
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Check a Shopify store for active pages and dead links.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument('store_url', nargs='?', default=None, help="Shopify store URL")
+    parser.add_argument('access_token', nargs='?', default=None, help="Optional Admin API access token")
+    parser.add_argument('--workers', type=int, default=16, help="Total concurrent link checks")
+    parser.add_argument('--per-host', type=int, default=4, help="Concurrent checks per external host")
+    parser.add_argument('--store-per-host', type=int, default=8, help="Concurrent checks against the store domain")
+    parser.add_argument('--max-links', type=int, default=100, help="Maximum number of links to check")
+    parser.add_argument('--pool-size', type=int, default=None, help="Keep-alive connections per host")
+    parser.add_argument('--retries', type=int, default=2, help="Retries for connection errors and 500/502/504 responses")
+    parser.add_argument('--cache', metavar='FILE', default=None, help="Persist link check results in this JSON file")
+    parser.add_argument('--cache-ttl', type=float, default=7, help="Days a cached link result is reused before revalidation")
+    parser.add_argument('--cache-size', type=int, default=50000, help="Maximum number of cached link results")
+    parser.add_argument('--exclude-file', metavar='FILE', default=None,
+                        help="Replace the default excluded domains with the entries in FILE")
+    parser.add_argument('--check-mode', choices=['stream', 'head-get'], default='stream',
+                        help="One streamed GET per link, or the legacy HEAD followed by GET")
+    parser.add_argument('--no-soft-404', action='store_true',
+                        help="Don't compare store pages against the store's 404 page and empty cart")
+    parser.add_argument('--link-types', metavar='LIST', default=','.join(DEFAULT_REFERENCE_KINDS),
+                        help=f"Reference kinds checked as links, comma-separated, or 'all' ({', '.join(REFERENCE_KINDS)})")
+    parser.add_argument('--analysis-processes', type=int, default=0,
+                        help="Worker processes that extract links from fetched pages (0 = in the main process)")
+    parser.add_argument('--admin-api-url', metavar='URL', default=None,
+                        help="Admin API base URL (default: https://<store>.myshopify.com/admin/api/2024-10)")
+    parser.add_argument('--incremental', metavar='FILE', default=None,
+                        help="Skip pages unchanged since the run that wrote FILE and reuse their link results")
+    parser.add_argument('--db', metavar='FILE', default=None,
+                        help="Keep pages, links and results in this SQLite database instead of memory")
+    parser.add_argument('--results', metavar='FILE', default=None,
+                        help="Stream every page and link result to FILE (.jsonl, or .csv) as it finishes")
+    parser.add_argument('--report-from', metavar='FILE', default=None,
+                        help="Build the report from a --results file instead of checking the store")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="Requests per second to any single external host (0 = unlimited)")
+    parser.add_argument('--store-rate', type=float, default=0,
+                        help="Requests per second to the store's own domain (0 = unlimited)")
+    parser.add_argument('--crawl', action='store_true',
+                        help="Crawl the whole storefront from the home page instead of listing /pages/")
+    parser.add_argument('--crawl-depth', type=int, default=3, help="Link hops from the home page when crawling")
+    parser.add_argument('--crawl-pages', type=int, default=5000, help="Maximum URLs fetched when crawling")
+    parser.add_argument('--metadata-only', action='store_true',
+                        help="List pages without bodies and fetch each body separately when needed")
+    parser.add_argument('--yes', '-y', action='store_true',
+                        help="Check the extracted links without asking (for scripts and cron jobs)")
+    parser.add_argument('--batch', metavar='FILE', default=None,
+                        help="Check every store listed in FILE (one 'store_url [access_token]' per line)")
+    parser.add_argument('--trace', metavar='FILE', default=None,
+                        help="Write phase timings, per-host latency percentiles and counters to FILE as JSON")
+    parser.add_argument('--batch-stores', type=int, default=4, help="Stores checked at the same time in batch mode")
+    args = parser.parse_args(argv)
+    if not args.store_url and not args.report_from and not args.batch:
+        parser.error("store_url is required")
+    if args.link_types.strip().lower() == 'all':
+        args.link_types = list(REFERENCE_KINDS)
+    else:
+        args.link_types = [kind.strip().lower() for kind in args.link_types.split(',') if kind.strip()]
+        unknown = [kind for kind in args.link_types if kind not in REFERENCE_KINDS]
+        if unknown or not args.link_types:
+            parser.error(f"--link-types: unknown kind(s) {', '.join(unknown) or '(none given)'}; "
+                         f"choose from {', '.join(REFERENCE_KINDS)}")
+    return args
+
+def load_batch_file(path: str) -> List[Tuple[str, Optional[str]]]:
+    """Read (store_url, access_token) pairs: one store per line, token optional, '#' starts a comment"""
+    stores = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split('#', 1)[0].split()
+            if parts:
+                stores.append((parts[0], parts[1] if len(parts) > 1 else None))
+    return stores
+
+def per_store_path(path: Optional[str], store_url: str) -> Optional[str]:
+    """Give each store of a batch its own copy of a file option: cache.json -> cache.mystore.com.json"""
+    if not path:
+        return path
+    stem, ext = os.path.splitext(path)
+    host = re.sub(r'[<>:"/\\|?*]', '_', urlparse(store_url).netloc)
+    return f"{stem}.{host}{ext}"
+
+def checker_from_args(args: argparse.Namespace, store_url: str, access_token: Optional[str] = None,
+                      per_store_files: bool = False, **kwargs) -> 'ShopifyPageChecker':
+    """
+    Build a checker from command-line options
+    
+    Args:
+        per_store_files: Suffix file options with the store's host (batch runs)
+        **kwargs: Extra constructor arguments (e.g. a shared session and scheduler)
+    """
+    def path(option: Optional[str]) -> Optional[str]:
+        return per_store_path(option, store_url) if per_store_files else option
+    
+    results_path = path(args.results)
+    return ShopifyPageChecker(
+        store_url,
+        access_token,
+        max_workers=args.workers,
+        per_host_limit=args.per_host,
+        store_host_limit=args.store_per_host,
+        check_mode=args.check_mode,
+        pool_size=args.pool_size,
+        retries=args.retries,
+        cache_path=path(args.cache),
+        cache_ttl=args.cache_ttl * 86400,
+        cache_max_entries=args.cache_size,
+        excluded_domains=load_excluded_domains(args.exclude_file) if args.exclude_file else None,
+        metadata_only=args.metadata_only,
+        admin_api_url=args.admin_api_url,
+        state_path=path(args.incremental),
+        db_path=path(args.db),
+        result_sink=open_result_sink(results_path) if results_path else None,
+        store_rate=args.store_rate,
+        host_rate=args.rate,
+        soft_404=not args.no_soft_404,
+        reference_kinds=args.link_types,
+        analysis_processes=args.analysis_processes,
+        **kwargs,
+    )
+
+def run_store(args: argparse.Namespace, store_url: str, access_token: Optional[str],
+              report_lock: threading.Lock, **kwargs) -> Dict:
+    """Check one store of a batch end to end; returns its row of the combined summary"""
+    summary = {'store_url': store_url, 'pages': 0, 'published': 0, 'links_found': 0, 'links_checked': 0,
+               'dead_links': 0, 'report': '', 'seconds': 0.0, 'error': ''}
+    started = time.time()
+    try:
+        checker = checker_from_args(args, store_url, access_token, per_store_files=True, **kwargs)
+    except Exception as e:
+        summary['error'] = str(e)
+        print(f"❌ {store_url}: {e}")
+        return summary
+    
+    try:
+        print(f"📍 Store: {store_url}")
+        if args.crawl:
+            checker.crawl_site(max_depth=args.crawl_depth, max_pages=args.crawl_pages)
+        else:
+            checker.analyze_pages()
+        if checker.all_links:
+            checker.check_all_links(max_links=args.max_links)
+        # One report at a time, so reports of stores finishing together don't interleave
+        with report_lock:
+            summary['report'] = checker.generate_report()
+        if args.trace:
+            checker.write_trace(per_store_path(args.trace, store_url))
+        summary.update(
+            pages=len(checker.pages),
+            published=sum(1 for page in checker.pages if page.published),
+            links_found=len(checker.all_links),
+            links_checked=len(checker.link_checks),
+            dead_links=sum(1 for check in checker.link_checks if check.is_dead),
+        )
+    except Exception as e:
+        summary['error'] = str(e)
+        print(f"❌ {store_url}: {e}")
+    finally:
+        checker.close()
+        summary['seconds'] = round(time.time() - started, 1)
+    return summary
+
+def run_batch(args: argparse.Namespace, stores: List[Tuple[str, Optional[str]]]) -> List[Dict]:
+    """
+    Check several stores in one process
+    
+    Stores share one connection pool, one FairScheduler of args.workers
+    threads and, with --analysis-processes, one pool of analysis processes;
+    up to args.batch_stores stores run at once. Writes one report per store
+    and a combined CSV summary.
+    """
+    print(f"🚀 Checking {len(stores)} stores ({args.batch_stores} at a time, {args.workers} shared workers)")
+    session = build_session(pool_size=args.pool_size or max(args.store_per_host, args.per_host), retries=args.retries)
+    scheduler = FairScheduler(args.workers)
+    analysis_pool = (ProcessPoolExecutor(max_workers=args.analysis_processes, mp_context=multiprocessing.get_context('spawn'))
+                     if args.analysis_processes > 0 else None)
+    report_lock = threading.Lock()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.batch_stores)) as stores_pool:
+            summaries = list(stores_pool.map(
+                lambda store: run_store(args, store[0], store[1], report_lock, session=session, scheduler=scheduler,
+                                        analysis_pool=analysis_pool),
+                stores))
+    finally:
+        session.close()
+        if analysis_pool is not None:
+            analysis_pool.shutdown()
+    
+    print("\n" + "="*80)
+    print(f"📊 BATCH SUMMARY ({len(summaries)} stores)")
+    print("="*80)
+    for summary in summaries:
+        if summary['error']:
+            print(f"  ❌ {summary['store_url']}: {summary['error']}")
+        else:
+            print(f"  ✅ {summary['store_url']}: {summary['pages']} pages ({summary['published']} live), "
+                  f"{summary['links_checked']} links checked, {summary['dead_links']} dead ({summary['seconds']}s)")
+    
+    summary_file = f"shopify_batch_summary_{int(time.time())}.csv"
+    with open(summary_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summaries[0]) if summaries else ['store_url'])
+        writer.writeheader()
+        writer.writerows(summaries)
+    print(f"\n💾 Batch summary saved to: {summary_file}")
+    return summaries
 
 def main():
     """Main entry point"""
@@ -916,27 +4095,53 @@ def main():
         print("  python shopify_product_checker.py https://mystore.com")
         sys.exit(1)
     
-    store_url = sys.argv[1]
-    access_token = sys.argv[2] if len(sys.argv) > 2 else None
+    args = parse_args(sys.argv[1:])
+    
+    if args.report_from:
+        # Rebuild the report from an earlier run's result stream; nothing is re-checked
+        checker = ShopifyPageChecker.from_results(args.report_from)
+        try:
+            print(f"📂 Loaded {len(checker.pages)} pages and {len(checker.link_checks)} link results "
+                  f"from {args.report_from}")
+            checker.generate_report()
+        finally:
+            checker.close()
+        return
+    
+    if args.batch:
+        try:
+            summaries = run_batch(args, load_batch_file(args.batch))
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Interrupted by user")
+            sys.exit(1)
+        sys.exit(1 if any(summary['error'] for summary in summaries) else 0)
     
     print(f"🚀 Starting Shopify Page & Link Checker")
-    print(f"📍 Store: {store_url}")
+    print(f"📍 Store: {args.store_url}")
     print()
     
-    checker = ShopifyPageChecker(store_url, access_token)
+    checker = checker_from_args(args, args.store_url, args.access_token)
     
     try:
-        # Analyze pages
-        checker.analyze_pages()
+        # Analyze pages (or crawl the whole storefront)
+        if args.crawl:
+            checker.crawl_site(max_depth=args.crawl_depth, max_pages=args.crawl_pages)
+        else:
+            checker.analyze_pages()
         
         # Check links (optional - can be slow)
         if checker.all_links:
-            response = input(f"\n🔍 Found {len(checker.all_links)} links. Check them for dead links? (y/n): ")
-            if response.lower() == 'y':
-                checker.check_all_links()
+            if args.yes:
+                checker.check_all_links(max_links=args.max_links)
+            else:
+                response = input(f"\n🔍 Found {len(checker.all_links)} links. Check them for dead links? (y/n): ")
+                if response.lower() == 'y':
+                    checker.check_all_links(max_links=args.max_links)
         
         # Generate report
         checker.generate_report()
+        if args.trace:
+            checker.write_trace(args.trace)
         
     except KeyboardInterrupt:
         print("\n\n⚠️  Interrupted by user")
@@ -946,6 +4151,8 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        checker.close()
 
 if __name__ == "__main__":
     main()
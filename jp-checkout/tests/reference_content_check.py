@@ -0,0 +1,136 @@
+"""
+Reference implementation of the page content check
+
+This is ShopifyPageChecker.has_meaningful_content as it was before the
+streaming ContentClassifier replaced it: sequential regex strip passes over
+the whole document. The parity tests compare the classifier's verdicts
+against it; keep it unchanged.
+"""
+
+import re
+
+def has_meaningful_content(html_content: str) -> bool:
+    """Check if HTML has meaningful content (not just navigation/footer/cart)"""
+    if not html_content:
+        return False
+    
+    html_lower = html_content.lower()
+    
+    # Common indicators of empty/no-content pages
+    empty_indicators = [
+        'your cart is empty',
+        'skip to content',
+        'loading...',
+        'estimated total',
+        '₱0.00',
+        '$0.00',
+        'no content',
+        'page not found',
+        '404',
+        'this page does not exist',
+        'continue shopping',
+        'check out',
+        'log in to check out faster'
+    ]
+    
+    # Check if page is mostly empty indicators (especially cart-related)
+    empty_count = sum(1 for indicator in empty_indicators if indicator in html_lower)
+    if empty_count >= 3:  # Multiple empty indicators suggest no content
+        # But check if there's actual content beyond navigation
+        pass
+    
+    # Extract text content (rough estimate)
+    # Remove script and style tags
+    text_content = re.sub(r'<script[^>]*>.*?</script>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
+    text_content = re.sub(r'<style[^>]*>.*?</style>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
+    # Remove common navigation/footer elements
+    text_content = re.sub(r'<nav[^>]*>.*?</nav>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
+    text_content = re.sub(r'<footer[^>]*>.*?</footer>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
+    text_content = re.sub(r'<header[^>]*>.*?</header>', '', text_content, flags=re.DOTALL | re.IGNORECASE)
+    
+    # Extract text between tags
+    text_only = re.sub(r'<[^>]+>', ' ', text_content)
+    text_only = ' '.join(text_only.split())  # Normalize whitespace
+    
+    # Remove common navigation/footer text patterns
+    navigation_patterns = [
+        r'\bhome\b', r'\bshop\b', r'\bcart\b', r'\blogin\b', r'\bsearch\b', 
+        r'\bmenu\b', r'\bfooter\b', r'\bheader\b', r'\bfacebook\b', 
+        r'\binstagram\b', r'\btwitter\b', r'\byoutube\b', r'\btiktok\b',
+        r'\babout\b', r'\bcontact\b', r'\bvisit our stores\b', r'\bstore hours\b',
+        r'\bphone number\b', r'\bcustomer service\b', r'\bjoin our\b',
+        r'\bpowered by shopify\b', r'\brefund policy\b', r'\bprivacy policy\b',
+        r'\bterms of service\b', r'\bshipping policy\b', r'\b©\s*\d{4}',
+        r'\bhave an account\b', r'\blog in\b', r'\bcontinue shopping\b',
+        r'\bcheck out\b', r'\bestimated total\b', r'\btaxes.*calculated\b'
+    ]
+    
+    meaningful_text = text_only
+    for pattern in navigation_patterns:
+        meaningful_text = re.sub(pattern, '', meaningful_text, flags=re.IGNORECASE)
+    
+    # Clean up extra whitespace
+    meaningful_text = ' '.join(meaningful_text.split())
+    
+    # Look for meaningful content indicators
+    content_indicators = [
+        '<article',
+        '<main',
+        '<section',
+        'class="content"',
+        'class="post"',
+        'class="article"',
+        'class="blog-post"',
+        'class="page-content"',
+        'id="content"',
+        'id="main-content"',
+        'class="blog-content"',
+        'class="post-content"',
+    ]
+    
+    # Count content indicators
+    content_count = sum(1 for indicator in content_indicators if indicator in html_lower)
+    
+    # Check for headings and paragraphs with actual text
+    has_headings = bool(re.search(r'<h[1-6][^>]*>.*?</h[1-6]>', html_content, flags=re.DOTALL | re.IGNORECASE))
+    has_paragraphs = bool(re.search(r'<p[^>]*>.*?</p>', html_content, flags=re.DOTALL | re.IGNORECASE))
+    
+    # Extract heading and paragraph text to verify they have content
+    heading_text = ' '.join(re.findall(r'<h[1-6][^>]*>(.*?)</h[1-6]>', html_content, flags=re.DOTALL | re.IGNORECASE))
+    paragraph_text = ' '.join(re.findall(r'<p[^>]*>(.*?)</p>', html_content, flags=re.DOTALL | re.IGNORECASE))
+    
+    # Clean extracted text
+    heading_text = re.sub(r'<[^>]+>', ' ', heading_text)
+    paragraph_text = re.sub(r'<[^>]+>', ' ', paragraph_text)
+    heading_text = ' '.join(heading_text.split())
+    paragraph_text = ' '.join(paragraph_text.split())
+    
+    # If we have content indicators and substantial text, it's meaningful
+    if content_count >= 2 and len(meaningful_text.strip()) > 200:
+        return True
+    
+    # If we have headings with actual text and paragraphs
+    if has_headings and has_paragraphs:
+        combined_content = heading_text + ' ' + paragraph_text
+        # Remove navigation words from combined content
+        for pattern in navigation_patterns:
+            combined_content = re.sub(pattern, '', combined_content, flags=re.IGNORECASE)
+        combined_content = ' '.join(combined_content.split())
+        if len(combined_content.strip()) > 150:  # At least 150 chars of actual content
+            return True
+    
+    # If we have substantial text even without specific content tags
+    if len(meaningful_text.strip()) > 500:
+        return True
+    
+    # Special case: Blog pages should have article/blog content
+    is_blog_page = '/blog' in html_lower or 'blog' in html_lower
+    if is_blog_page:
+        # Blog pages need actual article content, not just navigation
+        if len(meaningful_text.strip()) < 200:
+            return False
+        # Should have at least some headings or paragraphs with content
+        if not has_headings and not has_paragraphs:
+            return False
+    
+    return False
@@ -0,0 +1,30 @@
+"""Admin API bulk page export (--admin-api-url) against the mock storefront's Admin API"""
+
+import pytest
+
+import shopify_product_checker
+from shopify_product_checker import ShopifyPageChecker
+from mock_storefront import MockConfig, MockStorefront
+
+@pytest.fixture
+def storefront(monkeypatch):
+    # The checker waits between status polls; the mock has nothing to wait for
+    monkeypatch.setattr(shopify_product_checker.time, 'sleep', lambda seconds: None)
+    with MockStorefront(MockConfig(pages=30, links_per_page=3, latency_ms=0)) as store:
+        store.bulk_running_polls = 2
+        yield store
+
+def test_pages_come_from_the_bulk_export(storefront):
+    with ShopifyPageChecker(storefront.base_url, access_token='mock-token', admin_api_url=storefront.admin_api_url,
+                            logger=lambda message: None) as checker:
+        pages = checker.get_storefront_pages()
+    assert [page['handle'] for page in pages] == [f"page-{i}" for i in range(30)]
+    assert [page['published'] for page in pages] == [i % 10 != 0 for i in range(30)]
+    assert pages[1]['body'] == storefront.page_body(1)
+    assert pages[1]['updatedAt'] == '2024-06-01T00:00:00Z'
+
+def test_rejected_token_exports_nothing(storefront):
+    with ShopifyPageChecker(storefront.base_url, access_token='mock-token', admin_api_url=storefront.admin_api_url,
+                            logger=lambda message: None) as checker:
+        checker.access_token = ''
+        assert checker.get_pages_from_admin_bulk() == []
@@ -0,0 +1,65 @@
+"""Link canonicalization (canonicalize_url) used to deduplicate links before checking"""
+
+import pytest
+
+from shopify_product_checker import LinkCheck, RedirectCache, canonicalize_url
+
+STORE = 'example.myshopify.com'
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://example.myshopify.com/pages/about/', 'https://example.myshopify.com/pages/about'),
+    ('https://EXAMPLE.myshopify.com/pages/about//', 'https://example.myshopify.com/pages/about'),
+    ('https://example.myshopify.com', 'https://example.myshopify.com/'),
+    ('https://example.myshopify.com/', 'https://example.myshopify.com/'),
+])
+def test_store_trailing_slash_is_dropped(url, expected):
+    assert canonicalize_url(url, store_host=STORE) == expected
+
+@pytest.mark.parametrize('url', [
+    'https://docs.example.com/guide/',
+    'https://example.com/a/b/',
+])
+def test_external_trailing_slash_is_kept(url):
+    assert canonicalize_url(url, store_host=STORE) == url
+    assert canonicalize_url(url) == url
+
+def test_without_store_host_nothing_is_stripped():
+    assert canonicalize_url('https://example.myshopify.com/pages/about/') == 'https://example.myshopify.com/pages/about/'
+
+def test_relative_links_resolve_against_base():
+    base = 'https://example.myshopify.com/pages/about'
+    assert canonicalize_url('contact/', base, STORE) == 'https://example.myshopify.com/pages/contact'
+    assert canonicalize_url('/', base, STORE) == 'https://example.myshopify.com/'
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://example.com:443/a', 'https://example.com/a'),
+    ('http://example.com:80/a', 'http://example.com/a'),
+    ('http://example.com:443/a', 'http://example.com:443/a'),
+    ('https://example.com:8443/a', 'https://example.com:8443/a'),
+    ('https://example.myshopify.com:443/pages/x/', 'https://example.myshopify.com/pages/x'),
+])
+def test_default_ports_are_dropped(url, expected):
+    assert canonicalize_url(url, store_host=STORE) == expected
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://example.com/a#section', 'https://example.com/a'),
+    ('https://example.myshopify.com/pages/x/#top', 'https://example.myshopify.com/pages/x'),
+    ('https://example.com/a?utm_source=mail&id=3#top', 'https://example.com/a?id=3'),
+    ('https://example.com/a?id=3&ref=x', 'https://example.com/a?id=3&ref=x'),
+])
+def test_fragments_and_tracking_parameters_are_dropped(url, expected):
+    assert canonicalize_url(url, store_host=STORE) == expected
+
+@pytest.mark.parametrize('url', ['mailto:shop@example.com', 'tel:+81312345678', 'javascript:void(0)'])
+def test_non_http_links_are_returned_as_given(url):
+    assert canonicalize_url(url, store_host=STORE) == url
+
+def test_redirect_cache_keys_follow_store_host():
+    cache = RedirectCache(STORE)
+    cache.remember(LinkCheck(url='https://example.myshopify.com/pages/x/', status_code=200, is_dead=False, error=None,
+                             is_internal=True))
+    cache.remember(LinkCheck(url='https://example.com/docs/', status_code=200, is_dead=False, error=None,
+                             is_internal=False))
+    assert cache.get('https://example.myshopify.com/pages/x') is not None
+    assert cache.get('https://example.com/docs/') is not None
+    assert cache.get('https://example.com/docs') is None
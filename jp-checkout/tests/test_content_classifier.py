@@ -0,0 +1,51 @@
+"""
+Parity of the streaming ContentClassifier with the old regex strip passes
+
+tests/data/content_corpus.jsonl holds handwritten pages plus generated ones
+(random mixes of dropped, content and plain tags, unclosed elements and
+navigation text), many of which earlier classifier versions got wrong.
+"""
+
+import os
+import json
+
+import pytest
+
+from shopify_product_checker import ContentClassifier
+from reference_content_check import has_meaningful_content
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'content_corpus.jsonl')
+
+def load_corpus():
+    with open(CORPUS, encoding='utf-8') as f:
+        return [json.loads(line)['html'] for line in f if line.strip()]
+
+def classify(html, chunk_size=None, early_stop=False):
+    classifier = ContentClassifier(early_stop=early_stop)
+    step = chunk_size or max(len(html), 1)
+    for start in range(0, len(html), step):
+        classifier.feed(html[start:start + step])
+        if classifier.decided:
+            break
+    return classifier.is_meaningful()
+
+@pytest.fixture(scope='module')
+def corpus():
+    return [(html, has_meaningful_content(html)) for html in load_corpus()]
+
+@pytest.mark.parametrize('chunk_size,early_stop', [
+    (None, False),
+    (7, False),
+    (7, True),
+    (1000, True),
+])
+def test_matches_reference(corpus, chunk_size, early_stop):
+    mismatches = [html for html, expected in corpus if classify(html, chunk_size, early_stop) != expected]
+    assert not mismatches, f"{len(mismatches)} of {len(corpus)} differ, e.g. {mismatches[0][:300]!r}"
+
+def test_unclosed_opener_inside_nav_keeps_nav_dropped():
+    lorem = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. '
+    html = 'class="content" ' + lorem * 2 + 'class="content"<nav> © 2024 ' + lorem * 2 + '><style><main>></nav>'
+    assert has_meaningful_content(html) is False
+    assert classify(html) is False
+    assert classify(html, 7, early_stop=True) is False
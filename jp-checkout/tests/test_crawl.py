@@ -0,0 +1,38 @@
+"""Storefront crawl (--crawl) against the mock storefront"""
+
+import pytest
+
+import shopify_product_checker
+from shopify_product_checker import ShopifyPageChecker, analyze_document
+from mock_storefront import MockConfig, MockStorefront
+
+@pytest.fixture
+def storefront():
+    with MockStorefront(MockConfig(pages=10, links_per_page=3, latency_ms=0, error_rate=0)) as store:
+        yield store
+
+def test_crawl_follows_page_links(storefront):
+    with ShopifyPageChecker(storefront.base_url, logger=lambda message: None) as checker:
+        handles = [page.handle for page in checker.iter_crawl_pages(max_depth=1)]
+    assert handles[0] == '/'
+    assert sorted(handles[1:]) == sorted(f"/pages/page-{i}" for i in range(10))
+
+def test_page_that_fails_analysis_is_skipped(storefront, monkeypatch):
+    def failing(analyzer, body, encoding, page_url=None):
+        if page_url.endswith('/pages/page-3'):
+            raise ValueError('unparseable')
+        return analyze_document(analyzer, body, encoding, page_url)
+    monkeypatch.setattr(shopify_product_checker, 'analyze_document', failing)
+    messages = []
+    with ShopifyPageChecker(storefront.base_url, logger=messages.append) as checker:
+        handles = [page.handle for page in checker.iter_crawl_pages(max_depth=1)]
+    assert '/pages/page-3' not in handles
+    assert len(handles) == 10
+    assert any('Could not analyse' in message and 'page-3' in message for message in messages)
+
+def test_unknown_charset_is_analysed_as_utf8():
+    with ShopifyPageChecker('https://example.myshopify.com', logger=lambda message: None) as checker:
+        body = '<title>Café</title><a href="/pages/x">x</a>'.encode()
+        analysis = analyze_document(checker.analyzer, body, 'utf8mb4', 'https://example.myshopify.com/')
+    assert analysis.title == 'Café'
+    assert analysis.links == ['https://example.myshopify.com/pages/x']
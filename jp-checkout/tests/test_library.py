@@ -0,0 +1,102 @@
+"""Library use: run()/arun() streaming, cancel() and the run budgets, against the mock storefront"""
+
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from shopify_product_checker import LinkCheck, Page, ShopifyPageChecker
+from mock_storefront import MockConfig, MockStorefront
+
+@pytest.fixture(scope='module')
+def storefront():
+    with MockStorefront(MockConfig(pages=20, links_per_page=5, link_targets=60, latency_ms=5, page_kb=2,
+                                   error_rate=0.2)) as store:
+        yield store
+
+@pytest.fixture
+def checker(storefront):
+    with ShopifyPageChecker(storefront.base_url, max_workers=4, logger=lambda message: None) as checker:
+        yield checker
+
+def split(items):
+    pages = [item for item in items if isinstance(item, Page)]
+    checks = [item for item in items if isinstance(item, LinkCheck)]
+    return pages, checks
+
+def test_run_yields_pages_then_link_checks(checker):
+    items = list(checker.run(max_links=None))
+    pages, checks = split(items)
+    assert pages and checks
+    assert items == pages + checks
+    assert pages == checker.pages
+    assert {check.url for check in checks} == set(checker.all_links)
+    assert sorted(check.url for check in checker.link_checks) == sorted(check.url for check in checks)
+    assert any(check.is_dead for check in checks)
+
+def test_max_links_budget(checker):
+    _, checks = split(list(checker.run(max_links=7)))
+    assert len(checks) == 7
+    assert len(checker.link_checks) == 7
+
+def test_max_seconds_budget_stops_the_run(checker):
+    assert list(checker.run(max_seconds=0)) == []
+
+def test_leaving_the_loop_keeps_results_so_far(checker):
+    seen = []
+    for item in checker.run(max_links=None):
+        if isinstance(item, LinkCheck):
+            seen.append(item)
+            if len(seen) == 3:
+                break
+    # Kept in link order, not completion order
+    assert sorted(check.url for check in checker.link_checks) == sorted(check.url for check in seen)
+
+def test_cancel_ends_the_run(checker):
+    checks = []
+    for item in checker.run(max_links=None):
+        if isinstance(item, LinkCheck):
+            checks.append(item)
+            checker.cancel()
+    assert checker.cancelled
+    assert 1 <= len(checks) < len(checker.all_links)
+    assert len(checker.link_checks) == len(checks)
+
+def test_arun_matches_run(storefront):
+    async def consume():
+        with ShopifyPageChecker(storefront.base_url, max_workers=4, logger=lambda message: None) as checker:
+            return [item async for item in checker.arun(max_links=10)]
+    pages, checks = split(asyncio.run(consume()))
+    assert len(pages) == storefront.config.pages
+    assert len(checks) == 10
+
+def test_arun_closed_with_aclosing_fills_link_checks(storefront):
+    async def consume():
+        with ShopifyPageChecker(storefront.base_url, max_workers=4, logger=lambda message: None) as checker:
+            async with aclosing(checker.arun(max_links=None)) as results:
+                async for item in results:
+                    if isinstance(item, LinkCheck):
+                        first = item
+                        break
+            # No await since the break: aclosing closed the run
+            return first, list(checker.link_checks)
+    first, link_checks = asyncio.run(consume())
+    assert [check.url for check in link_checks] == [first.url]
+
+def test_cancelling_the_task_cancels_the_run(storefront):
+    async def consume(checker, started):
+        async for item in checker.arun(max_links=None):
+            if isinstance(item, LinkCheck):
+                started.set()
+
+    async def main():
+        with ShopifyPageChecker(storefront.base_url, max_workers=4, logger=lambda message: None) as checker:
+            started = asyncio.Event()
+            task = asyncio.create_task(consume(checker, started))
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return len(checker.link_checks), len(checker.all_links)
+    checked, total = asyncio.run(main())
+    assert 1 <= checked < total
@@ -0,0 +1,125 @@
+"""On-disk link check cache (--cache): TTL, LRU eviction and ETag/Last-Modified validators"""
+
+import os
+import json
+
+import pytest
+
+import shopify_product_checker
+from shopify_product_checker import LinkCheck, LinkCheckCache
+
+DAY = 86400
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1700000000.0
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(shopify_product_checker.time, 'time', clock.time)
+    return clock
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'links.json')
+
+def ok(url: str) -> LinkCheck:
+    return LinkCheck(url, 200, False, None, False, [])
+
+def test_missing_url_is_a_miss(path):
+    assert LinkCheckCache(path).get('https://example.com/a') is None
+
+def test_entries_are_fresh_until_the_ttl(path, clock):
+    cache = LinkCheckCache(path, ttl=7 * DAY)
+    cache.put('https://example.com/a', ok('https://example.com/a'))
+    entry = cache.get('https://example.com/a')
+    assert cache.is_fresh(entry)
+    clock.now += 7 * DAY - 1
+    assert cache.is_fresh(entry)
+    clock.now += 1
+    assert not cache.is_fresh(entry)
+    # Expired entries stay available for revalidation
+    assert cache.get('https://example.com/a') is entry
+
+def test_keys_are_normalized(path):
+    cache = LinkCheckCache(path)
+    cache.put('HTTPS://Example.com:443/a#top', ok('https://example.com/a'))
+    assert cache.get('https://example.com/a') is not None
+    assert cache.get('https://example.com/a?x=1') is None
+
+def test_result_round_trips(path):
+    cache = LinkCheckCache(path)
+    check = LinkCheck('https://example.com/old', 404, True, 'HTTP 404', False, ['https://example.com/new'])
+    cache.put(check.url, check)
+    assert LinkCheckCache.to_link_check(check.url, cache.get(check.url)) == check
+
+def test_validators_are_stored_with_the_result(path):
+    cache = LinkCheckCache(path)
+    cache.remember_validators('https://example.com/a', {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+    cache.put('https://example.com/a', ok('https://example.com/a'))
+    assert LinkCheckCache.conditional_headers(cache.get('https://example.com/a')) == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT',
+    }
+
+def test_no_validators_no_conditional_headers(path):
+    cache = LinkCheckCache(path)
+    cache.put('https://example.com/a', ok('https://example.com/a'))
+    assert LinkCheckCache.conditional_headers(cache.get('https://example.com/a')) == {}
+
+def test_refresh_after_304_restarts_the_ttl(path, clock):
+    cache = LinkCheckCache(path, ttl=DAY)
+    cache.remember_validators('https://example.com/a', {'ETag': '"v1"'})
+    cache.put('https://example.com/a', ok('https://example.com/a'))
+    clock.now += 2 * DAY
+    assert not cache.is_fresh(cache.get('https://example.com/a'))
+    cache.refresh('https://example.com/a')
+    entry = cache.get('https://example.com/a')
+    assert cache.is_fresh(entry)
+    assert entry['etag'] == '"v1"'
+
+def test_least_recently_used_entries_are_evicted(path, clock):
+    cache = LinkCheckCache(path, max_entries=3)
+    for name in 'abc':
+        clock.now += 1
+        cache.put(f'https://example.com/{name}', ok(f'https://example.com/{name}'))
+    clock.now += 1
+    cache.get('https://example.com/a')  # Used again: b is now the least recently used
+    clock.now += 1
+    cache.put('https://example.com/d', ok('https://example.com/d'))
+    cache.save()
+    reloaded = LinkCheckCache(path, max_entries=3)
+    assert len(reloaded) == 3
+    assert reloaded.get('https://example.com/b') is None
+    assert reloaded.get('https://example.com/a') is not None
+
+def test_eviction_waits_for_the_slack(path):
+    cache = LinkCheckCache(path, max_entries=10)
+    for i in range(11):
+        cache.put(f'https://example.com/{i}', ok(f'https://example.com/{i}'))
+    assert len(cache) == 11  # Within 10% over max_entries until save()
+    cache.put('https://example.com/11', ok('https://example.com/11'))
+    assert len(cache) == 10
+
+def test_save_only_writes_changes(path):
+    cache = LinkCheckCache(path)
+    cache.save()
+    assert not os.path.exists(path)
+    cache.put('https://example.com/a', ok('https://example.com/a'))
+    cache.save()
+    with open(path, encoding='utf-8') as f:
+        assert list(json.load(f)['entries']) == ['https://example.com/a']
+
+def test_other_versions_and_corrupt_files_start_empty(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': LinkCheckCache.VERSION + 1, 'entries': {'https://example.com/a': {}}}, f)
+    assert len(LinkCheckCache(path)) == 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    messages = []
+    assert len(LinkCheckCache(path, log=messages.append)) == 0
+    assert messages and 'Could not read link cache' in messages[0]
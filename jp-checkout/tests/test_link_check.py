@@ -0,0 +1,89 @@
+"""Content verdicts of streamed link checks"""
+
+import io
+
+import pytest
+import requests
+
+from shopify_product_checker import PageFingerprint, ShopifyPageChecker
+from reference_content_check import has_meaningful_content
+
+EMPTY_CART = (
+    '<html><body><header><nav>Home Shop Cart</nav></header>'
+    '<div class="cart"><h1>Your cart is empty</h1><a href="/collections/all">Continue shopping</a></div>'
+)
+
+def make_response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    response.encoding = 'utf-8'
+    response.headers['Content-Length'] = str(len(body))
+    return response
+
+@pytest.fixture
+def checker():
+    with ShopifyPageChecker('https://example.myshopify.com', logger=lambda message: None) as checker:
+        yield checker
+
+def test_truncated_read_drops_unclosed_script(checker):
+    # The JSON blob runs past max_content_bytes, so its </script> is never read
+    blob = '{"products": [' + ', '.join(f'{{"id": {i}, "title": "Item {i}"}}' for i in range(50000)) + ']}'
+    html = EMPTY_CART + '<script type="application/json">' + blob + '</script></body></html>'
+    body = html.encode('utf-8')
+    assert len(body) > 1.4 * checker.max_content_bytes
+    assert has_meaningful_content(html) is False
+    assert checker._classify_stream(make_response(body)) == (False, None)
+
+def test_complete_read_keeps_unclosed_script_text(checker):
+    # Read to the end, an unclosed <script> is page text, as with the old strip passes
+    html = EMPTY_CART + '<script>' + 'Our handmade ceramic cups are glazed in Kyoto. ' * 20
+    assert has_meaningful_content(html) is True
+    assert checker._classify_stream(make_response(html.encode('utf-8'))) == (True, None)
+
+def themed(main: str) -> str:
+    return (
+        '<html><head><title>Kyoto Ceramics</title></head><body>'
+        '<header class="header"><nav><a href="/">Home</a><a href="/collections/all">Shop</a><a href="/cart">Cart</a></nav></header>'
+        f'<main id="MainContent" class="content-for-layout">{main}</main>'
+        '<footer class="footer"><p>© 2024 Kyoto Ceramics</p><a href="/policies/refund-policy">Refund policy</a></footer>'
+        '</body></html>'
+    )
+
+def empty_cart(section_id: int) -> str:
+    return themed(
+        f'<div id="shopify-section-template--{section_id}__cart-items" class="shopify-section">'
+        '<div class="page-width"><div class="cart__warnings"><h1 class="cart__empty-text">Your cart is empty</h1>'
+        '<a href="/collections/all" class="button">Continue shopping</a>'
+        '<h2 class="cart__login-title">Have an account?</h2>'
+        '<p class="cart__login-paragraph"><a href="/account/login">Log in</a> to check out faster.</p>'
+        '</div></div></div>'
+    )
+
+@pytest.fixture
+def baselines(checker):
+    checker._soft_404_baselines = {'the empty cart': PageFingerprint.from_html(empty_cart(1000))}
+    return checker
+
+def test_short_page_is_not_a_soft_404(baselines):
+    # A legitimate page with little content, in the same theme as the empty cart
+    html = themed(
+        '<div id="shopify-section-template--2000__main" class="shopify-section">'
+        '<div class="page-width"><h1 class="main-page-title">Contact</h1>'
+        '<div class="rte"><p>Email hello@kyoto-ceramics.example or call us on weekdays.</p></div></div></div>'
+    )
+    _, match = baselines._classify_stream(make_response(html.encode('utf-8')), PageFingerprint())
+    assert match is None
+
+def test_empty_cart_render_is_a_soft_404(baselines):
+    html = empty_cart(3456) + '<script>' + 'var x = 1;' * 5000 + '</script>'
+    meaningful, match = baselines._classify_stream(make_response(html.encode('utf-8')), PageFingerprint())
+    assert (meaningful, match) == (False, 'the empty cart')
+    # Decided at </main>: the rest of the page isn't read
+    assert baselines.stats['bytes_read'] < len(html)
+
+def test_unknown_charset_falls_back_to_utf8(checker):
+    html = EMPTY_CART + '<main class="content"><p>' + 'Our handmade ceramic cups are glazed in Kyoto. ' * 20 + '</p></main>'
+    response = make_response(html.encode('utf-8'))
+    response.encoding = 'utf8mb4'
+    assert checker._classify_stream(response) == (True, None)
@@ -0,0 +1,14 @@
+"""Output of a checker created with a logger"""
+
+from shopify_product_checker import ShopifyPageChecker
+
+def test_unreadable_state_and_cache_are_logged(tmp_path, capsys):
+    state_path = tmp_path / 'state.json'
+    state_path.write_text('{not json', encoding='utf-8')
+    (tmp_path / 'state.links.json').write_text('{not json', encoding='utf-8')
+    messages = []
+    with ShopifyPageChecker('https://example.myshopify.com', state_path=str(state_path), logger=messages.append):
+        pass
+    assert any(message.startswith('⚠️  Could not read scan state') for message in messages)
+    assert any(message.startswith('⚠️  Could not read link cache') for message in messages)
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,149 @@
+"""Request pacing: per-host token buckets, Retry-After and throttle backoff"""
+
+import datetime
+import email.utils
+from typing import List
+
+import pytest
+import requests
+
+import shopify_product_checker
+from shopify_product_checker import (MAX_RETRY_AFTER, HostRateLimiter, QueryCostThrottle, ShopifyPageChecker,
+                                     retry_after_seconds)
+
+STORE = 'example.myshopify.com'
+
+class FakeClock:
+    """time.monotonic/time.sleep stand-in: sleeping advances the clock and is recorded"""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: List[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(shopify_product_checker.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(shopify_product_checker.time, 'sleep', clock.sleep)
+    return clock
+
+def make_response(status: int, headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.elapsed = datetime.timedelta(milliseconds=5)
+    response._content = b'{}'
+    response._content_consumed = True
+    return response
+
+class ScriptedSession:
+    """Session stand-in answering requests with the given responses in turn"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        return self.responses.pop(0)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        pass
+
+def test_store_rate_spaces_requests(clock):
+    limiter = HostRateLimiter(STORE, store_rate=4)
+    for _ in range(3):
+        limiter.wait(f'https://{STORE}/pages/a')
+    # The first request spends the burst; the next ones wait 1/rate each
+    assert clock.sleeps == [0.25, 0.25]
+
+def test_external_rate_is_per_host(clock):
+    limiter = HostRateLimiter(STORE, external_rate=2)
+    limiter.wait('https://a.example.com/')
+    limiter.wait('https://b.example.com/')
+    assert clock.sleeps == []
+    limiter.wait('https://a.example.com/x')
+    assert clock.sleeps == [0.5]
+
+def test_unlimited_hosts_never_wait(clock):
+    limiter = HostRateLimiter(STORE, external_rate=2)
+    for _ in range(5):
+        limiter.wait(f'https://{STORE}/')
+    assert clock.sleeps == []
+
+def test_idle_time_refills_the_bucket(clock):
+    limiter = HostRateLimiter(STORE, store_rate=1)
+    limiter.wait(f'https://{STORE}/')
+    clock.now += 5
+    limiter.wait(f'https://{STORE}/')
+    assert clock.sleeps == []
+
+def test_pause_holds_back_the_whole_host(clock):
+    limiter = HostRateLimiter(STORE)
+    limiter.pause(f'https://{STORE}/pages/a', 3)
+    limiter.wait(f'https://{STORE}/pages/b')
+    limiter.wait('https://other.example.com/')
+    assert clock.sleeps == [3]
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(make_response(429, {'Retry-After': '2.5'})) == 2.5
+    assert retry_after_seconds(make_response(429, {'Retry-After': '-1'})) == 0.0
+    assert retry_after_seconds(make_response(429)) is None
+    assert retry_after_seconds(make_response(429, {'Retry-After': 'soon'})) is None
+    assert retry_after_seconds(None) is None
+
+def test_retry_after_http_date():
+    later = email.utils.formatdate(shopify_product_checker.time.time() + 30, usegmt=True)
+    assert 25 <= retry_after_seconds(make_response(503, {'Retry-After': later})) <= 30
+
+def test_throttle_backoff_prefers_retry_after():
+    throttle = QueryCostThrottle()
+    assert throttle.backoff(make_response(429, {'Retry-After': '4'}), attempt=0) == 4
+    assert throttle.backoff(make_response(429, {'Retry-After': '100000'}), attempt=0) == MAX_RETRY_AFTER
+
+def test_throttle_backoff_waits_for_the_budget():
+    throttle = QueryCostThrottle()
+    throttle.update({'extensions': {'cost': {
+        'requestedQueryCost': 50,
+        'throttleStatus': {'maximumAvailable': 1000, 'currentlyAvailable': 10, 'restoreRate': 20},
+    }}})
+    assert throttle.backoff(None, attempt=0) == pytest.approx(2.0, abs=0.01)
+
+def test_request_retries_after_retry_after(clock):
+    session = ScriptedSession([make_response(429, {'Retry-After': '7'}), make_response(200)])
+    with ShopifyPageChecker(f'https://{STORE}', session=session, logger=lambda message: None) as checker:
+        response = checker._request('GET', f'https://{STORE}/pages/a')
+        assert response.status_code == 200
+        assert checker.stats['throttled'] == 1
+    assert len(session.requests) == 2
+    assert clock.sleeps == [7]
+
+def test_request_gives_up_on_long_retry_after(clock):
+    session = ScriptedSession([make_response(429, {'Retry-After': str(MAX_RETRY_AFTER + 1)})])
+    with ShopifyPageChecker(f'https://{STORE}', session=session, logger=lambda message: None) as checker:
+        assert checker._request('GET', f'https://{STORE}/pages/a').status_code == 429
+    assert clock.sleeps == []
+
+def test_storefront_queries_follow_store_rate(clock):
+    session = ScriptedSession([make_response(200) for _ in range(3)])
+    with ShopifyPageChecker(f'https://{STORE}', session=session, store_rate=2,
+                            logger=lambda message: None) as checker:
+        for _ in range(3):
+            checker._storefront_query('{ shop { name } }', {})
+    assert clock.sleeps == [0.5, 0.5]
+
+def test_storefront_throttle_pauses_the_store(clock):
+    session = ScriptedSession([make_response(429, {'Retry-After': '3'}), make_response(200)])
+    with ShopifyPageChecker(f'https://{STORE}', session=session, logger=lambda message: None) as checker:
+        checker._storefront_query('{ shop { name } }', {})
+        # The Retry-After pause is the store host's, so a page fetch started meanwhile waits too
+        assert checker.rate_limiter._hosts[STORE]['paused_until'] == 1003
+    assert clock.sleeps == [3]
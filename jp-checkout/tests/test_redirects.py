@@ -0,0 +1,121 @@
+"""Redirect handling: RedirectCache and hop-by-hop redirect following against a local server"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shopify_product_checker import LinkCheck, RedirectCache, ShopifyPageChecker
+
+PAGE = b'<html><body><main><h1>Green tea</h1><p>' + b'Handmade ceramic cups from Kyoto. ' * 20 + b'</p></main></body></html>'
+
+# Path -> redirect target; '/gone' is a 404, any other path a 200 page
+REDIRECTS = {
+    '/old': '/new',
+    '/older': '/old',
+    '/oldest': '/older',
+    '/moved': '/gone',
+    '/loop-a': '/loop-b',
+    '/loop-b': '/loop-a',
+}
+
+class RedirectHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    hits = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: bool):
+        self.hits.append(self.path)
+        if self.path in REDIRECTS:
+            self.send_response(301)
+            self.send_header('Location', REDIRECTS[self.path])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        status = 404 if self.path == '/gone' else 200
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        if body:
+            self.wfile.write(PAGE)
+
+    def do_GET(self):
+        self._send(True)
+
+    def do_HEAD(self):
+        self._send(False)
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RedirectHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def checker(server):
+    RedirectHandler.hits.clear()
+    # A different store: these links are external, so no soft-404 fingerprints are fetched
+    with ShopifyPageChecker('https://example.myshopify.com', logger=lambda message: None) as checker:
+        yield checker
+
+def check(url: str, status_code: int = 200, chain=()) -> LinkCheck:
+    return LinkCheck(url, status_code, status_code >= 400, None, False, list(chain))
+
+def test_unknown_url_is_a_miss():
+    assert RedirectCache().get('https://example.com/a') is None
+
+def test_every_hop_is_remembered_with_the_rest_of_its_chain():
+    cache = RedirectCache()
+    cache.remember(check('https://example.com/a', 200, ['https://example.com/b', 'https://example.com/c']))
+    assert cache.get('https://example.com/a').redirect_chain == ['https://example.com/b', 'https://example.com/c']
+    hop = cache.get('https://example.com/b')
+    assert hop.url == 'https://example.com/b'
+    assert hop.redirect_chain == ['https://example.com/c']
+    final = cache.get('https://example.com/c')
+    assert final.redirect_chain == []
+    assert final.status_code == 200
+
+def test_lookups_are_canonical():
+    cache = RedirectCache()
+    cache.remember(check('https://Example.com:443/a?utm_source=x#top'))
+    assert cache.get('https://example.com/a') is not None
+
+def test_redirect_chain_is_followed(checker, server):
+    result = checker.check_link(f"{server}/oldest")
+    assert result.status_code == 200
+    assert not result.is_dead
+    assert result.redirect_chain == [f"{server}/older", f"{server}/old", f"{server}/new"]
+
+def test_redirect_to_a_dead_page_is_dead(checker, server):
+    result = checker.check_link(f"{server}/moved")
+    assert result.status_code == 404
+    assert result.is_dead
+    assert result.redirect_chain == [f"{server}/gone"]
+
+def test_redirect_loop_is_dead(checker, server):
+    result = checker.check_link(f"{server}/loop-a")
+    assert result.is_dead
+    assert 'loop' in result.error.lower()
+
+def test_link_into_a_checked_chain_reuses_its_result(checker, server):
+    checker.check_link(f"{server}/older")
+    RedirectHandler.hits.clear()
+    result = checker.check_link(f"{server}/oldest")
+    # Only the first hop is fetched: /older was already checked
+    assert RedirectHandler.hits == ['/oldest']
+    assert result.redirect_chain == [f"{server}/older", f"{server}/old", f"{server}/new"]
+    assert checker.stats['redirects_reused'] == 1
+
+def test_checked_hop_is_reused_without_a_request(checker, server):
+    checker.check_link(f"{server}/oldest")
+    RedirectHandler.hits.clear()
+    result = checker.check_link(f"{server}/old")
+    assert RedirectHandler.hits == []
+    assert result.url == f"{server}/old"
+    assert result.redirect_chain == [f"{server}/new"]
@@ -0,0 +1,47 @@
+"""Links picked from page references by kind"""
+
+import pytest
+
+from shopify_product_checker import ShopifyPageChecker, iter_references
+
+PAGE = (
+    '<a href="/pages/about">About</a>'
+    '<img src="https://images.other.org/pic.jpg" srcset="/small.jpg 1x, https://images.other.org/big.jpg 2x">'
+    '<script src="https://cdn.other.org/app.js"></script>'
+    '<link rel="stylesheet" href="https://fonts.other.org/a.css">'
+    '<img src="/files/local.jpg">'
+    '<p>See https://blog.other.org/post for more</p>'
+)
+
+def test_default_kinds_check_every_absolute_url():
+    with ShopifyPageChecker('https://example.myshopify.com', logger=lambda message: None) as checker:
+        links = checker.extract_links_from_text(PAGE)
+    assert links == [
+        'https://example.myshopify.com/pages/about',
+        'https://images.other.org/pic.jpg',
+        'https://images.other.org/big.jpg',
+        'https://cdn.other.org/app.js',
+        'https://fonts.other.org/a.css',
+        'https://blog.other.org/post',
+    ]
+
+def test_typed_absolute_urls_are_also_text():
+    kinds = {}
+    for ref in iter_references(PAGE):
+        kinds.setdefault(ref.url, []).append(ref.kind)
+    assert kinds['https://cdn.other.org/app.js'] == ['script', 'text']
+    assert kinds['/files/local.jpg'] == ['image']
+    assert kinds['/small.jpg'] == ['srcset']
+
+@pytest.mark.parametrize('html,link', [
+    ('<a title="a > b" href="/pages/x">x</a>', 'https://example.myshopify.com/pages/x'),
+    ('<a onclick="if(a>b)go()" href="/z">z</a>', 'https://example.myshopify.com/z'),
+    ("<a data-note='1 > 0' href='/pages/y'>y</a>", 'https://example.myshopify.com/pages/y'),
+])
+def test_quoted_gt_does_not_end_the_tag(html, link):
+    with ShopifyPageChecker('https://example.myshopify.com', logger=lambda message: None) as checker:
+        assert checker.extract_links_from_text(html) == [link]
+
+def test_script_src_after_quoted_gt():
+    refs = list(iter_references('<script data-if="a>b" src="/app.js"></script>'))
+    assert [(ref.url, ref.kind) for ref in refs] == [('/app.js', 'script')]
@@ -0,0 +1,64 @@
+"""Link checks kept in a ResultStore (--db), checked against the local mock storefront"""
+
+import sqlite3
+
+import pytest
+
+from shopify_product_checker import LinkCheck, ResultStore, ShopifyPageChecker, StoredLinkChecks
+from mock_storefront import MockConfig, MockStorefront
+
+@pytest.fixture(scope='module')
+def storefront():
+    with MockStorefront(MockConfig(pages=20, links_per_page=10, link_targets=80, latency_ms=0, page_kb=4)) as store:
+        yield store
+
+def new_checker(storefront, db_path):
+    return ShopifyPageChecker(storefront.base_url, db_path=str(db_path) if db_path else None, max_workers=4, soft_404=False,
+                              logger=lambda message: None)
+
+def stored_checks(db_path):
+    with sqlite3.connect(str(db_path)) as conn:
+        return conn.execute("SELECT COUNT(*) FROM link_checks").fetchone()[0]
+
+def test_checks_are_stored_as_they_finish(storefront, tmp_path):
+    db_path = tmp_path / 'run.db'
+    with new_checker(storefront, db_path) as checker:
+        checker.analyze_pages()
+        checks = checker.iter_link_checks(max_links=40)
+        yielded = [next(checks) for _ in range(10)]
+        # Written (and readable) while the run is still going
+        assert len(checker.link_checks) >= len(yielded)
+        assert {check.url for check in yielded} <= {check.url for check in checker.link_checks}
+        checks.close()
+    assert 10 <= stored_checks(db_path) < 40
+
+def test_max_links_takes_the_first_links_by_url(storefront, tmp_path):
+    with new_checker(storefront, tmp_path / 'run.db') as checker:
+        checker.analyze_pages()
+        checker.check_all_links(max_links=15)
+        expected = sorted(checker.all_links)[:15]
+        assert sorted(check.url for check in checker.link_checks) == expected
+
+def test_report_views_match_memory_run(storefront, tmp_path):
+    with new_checker(storefront, tmp_path / 'run.db') as stored, new_checker(storefront, None) as memory:
+        for checker in (stored, memory):
+            checker.analyze_pages()
+            checker.check_all_links(max_links=60)
+        for flags in ({'dead': True}, {'internal': True}, {'redirected': True}, {'dead': False, 'internal': False}):
+            in_store = stored._link_checks_where(**flags)
+            in_memory = memory._link_checks_where(**flags)
+            assert len(in_store) == len(in_memory)
+            assert sorted(check.url for check in in_store) == sorted(check.url for check in in_memory)
+
+def test_redirected_view_orders_longest_chain_first(tmp_path):
+    store = ResultStore(str(tmp_path / 'run.db'), 'https://example.com')
+    store.add_link_checks([
+        LinkCheck('https://example.com/a', 200, False, None, True, ['https://example.com/b']),
+        LinkCheck('https://example.com/c', 200, False, None, True),
+        LinkCheck('https://example.com/d', 404, True, None, True, ['https://example.com/e', 'https://example.com/f']),
+    ])
+    redirected = StoredLinkChecks(store).where(redirected=True)
+    assert len(redirected) == 2
+    assert [check.url for check in redirected] == ['https://example.com/d', 'https://example.com/a']
+    assert [check.url for check in redirected.where(dead=True)] == ['https://example.com/d']
+    store.close()
@@ -0,0 +1,44 @@
+"""Reading back result files of interrupted runs"""
+
+import pytest
+
+from shopify_product_checker import CsvSink, JsonLinesSink, LinkCheck, Page, ResultSink, read_results
+
+PAGE = Page('1', 'About', 'about', 'https://example.com/pages/about', True, None, ['https://example.com/a'])
+ALIVE = LinkCheck('https://example.com/a', 200, False, None, True)
+DEAD = LinkCheck('https://example.com/gone', 404, True, 'HTTP 404', True, ['https://example.com/missing'])
+
+def write(sink_class, path):
+    sink = sink_class(str(path))
+    sink.start('https://example.com')
+    sink.write_page(PAGE)
+    sink.write_link_check(ALIVE)
+    sink.write_link_check(DEAD)
+    sink.close()
+    return path.read_bytes()
+
+@pytest.mark.parametrize('sink_class,name', [(CsvSink, 'results.csv'), (JsonLinesSink, 'results.jsonl')])
+def test_complete_file(tmp_path, sink_class, name):
+    path = tmp_path / name
+    write(sink_class, path)
+    records = list(read_results(str(path)))
+    assert [record['type'] for record in records] == ['run', 'page', 'link_check', 'link_check']
+    assert records[1]['links'] == PAGE.links
+    assert records[3]['status_code'] == 404 and records[3]['is_dead'] is True
+    assert records[3]['redirect_chain'] == DEAD.redirect_chain
+
+@pytest.mark.parametrize('sink_class,name', [(CsvSink, 'results.csv'), (JsonLinesSink, 'results.jsonl')])
+def test_partial_last_record_is_dropped(tmp_path, sink_class, name):
+    path = tmp_path / name
+    data = write(sink_class, path)
+    last_record = data.rstrip(b'\r\n').rindex(b'\n') + 1
+    # Cut the dead link's record right after its status code, before is_dead was written
+    cut = data.index(b'404', last_record) + 3
+    path.write_bytes(data[:cut])
+    records = list(read_results(str(path)))
+    assert [record['type'] for record in records] == ['run', 'page', 'link_check']
+    assert records[-1]['url'] == ALIVE.url
+
+def test_sink_needs_an_encoding(tmp_path):
+    with pytest.raises(TypeError):
+        ResultSink(str(tmp_path / 'results.txt'))
@@ -0,0 +1,82 @@
+"""Shared worker pool for multi-store runs (FairScheduler and its lanes)"""
+
+import time
+import threading
+
+import pytest
+
+from shopify_product_checker import FairScheduler, LinkCheck, ShopifyPageChecker
+from mock_storefront import MockConfig, MockStorefront
+
+TIMEOUT = 5
+
+def hold_worker(scheduler: FairScheduler) -> threading.Event:
+    """Keep one worker busy until the returned event is set"""
+    release = threading.Event()
+    started = threading.Event()
+    lane = scheduler.lane()
+    lane.submit(lambda: (started.set(), release.wait(TIMEOUT)))
+    assert started.wait(TIMEOUT)
+    return release
+
+def test_results_and_exceptions_reach_the_futures():
+    lane = FairScheduler(2).lane()
+    assert lane.submit(pow, 2, 10).result(TIMEOUT) == 1024
+    with pytest.raises(ZeroDivisionError):
+        lane.submit(lambda: 1 / 0).result(TIMEOUT)
+
+def test_lanes_take_turns():
+    scheduler = FairScheduler(1)
+    release = hold_worker(scheduler)
+    order = []
+    big, small = scheduler.lane(), scheduler.lane()
+    futures = [big.submit(order.append, f"big-{i}") for i in range(5)]
+    futures += [small.submit(order.append, f"small-{i}") for i in range(2)]
+    release.set()
+    for future in futures:
+        future.result(TIMEOUT)
+    # The lane with 2 tasks doesn't wait behind all 5 of the other one
+    assert order == ['big-0', 'small-0', 'big-1', 'small-1', 'big-2', 'big-3', 'big-4']
+
+def test_a_lone_lane_gets_every_worker():
+    lane = FairScheduler(4).lane()
+    barrier = threading.Barrier(4, timeout=TIMEOUT)
+    futures = [lane.submit(barrier.wait) for _ in range(4)]
+    assert sorted(future.result(TIMEOUT) for future in futures) == [0, 1, 2, 3]
+
+def test_shutdown_waits_for_outstanding_tasks():
+    lane = FairScheduler(2).lane()
+    done = []
+    for i in range(4):
+        lane.submit(lambda i=i: (time.sleep(0.01), done.append(i)))
+    lane.shutdown(wait=True)
+    assert sorted(done) == [0, 1, 2, 3]
+    with pytest.raises(RuntimeError):
+        lane.submit(print)
+
+def test_shutdown_can_cancel_queued_tasks():
+    scheduler = FairScheduler(1)
+    release = hold_worker(scheduler)
+    lane = scheduler.lane()
+    futures = [lane.submit(lambda: None) for _ in range(3)]
+    lane.shutdown(wait=False, cancel_futures=True)
+    release.set()
+    assert all(future.cancelled() for future in futures)
+    # Other lanes keep working
+    assert scheduler.lane().submit(lambda: 'ok').result(TIMEOUT) == 'ok'
+
+def test_stores_sharing_a_scheduler_both_finish():
+    config = MockConfig(pages=6, links_per_page=4, link_targets=40, latency_ms=2, page_kb=2, error_rate=0)
+    scheduler = FairScheduler(4)
+    results = {}
+    with MockStorefront(config) as first, MockStorefront(config) as second:
+        def run(name, store):
+            with ShopifyPageChecker(store.base_url, scheduler=scheduler, logger=lambda message: None) as checker:
+                results[name] = [item for item in checker.run(max_links=None) if isinstance(item, LinkCheck)]
+        threads = [threading.Thread(target=run, args=args) for args in (('first', first), ('second', second))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(TIMEOUT * 6)
+    assert results['first'] and results['second']
+    assert len(results['first']) == len(results['second'])
@@ -0,0 +1,14 @@
+"""Shared keep-alive session (build_session) and its transport retries"""
+
+from shopify_product_checker import build_session
+
+def test_reads_are_retried_on_transient_errors():
+    retry = build_session().get_adapter('https://example.com').max_retries
+    for method in ('HEAD', 'GET'):
+        assert retry.is_retry(method, 502)
+    assert not retry.is_retry('GET', 429)  # Left to the checker's per-host backoff
+
+def test_posts_are_not_resent():
+    retry = build_session().get_adapter('https://example.com').max_retries
+    assert not retry.is_retry('POST', 502)
+    assert not retry.is_retry('POST', 500)